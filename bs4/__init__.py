@@ -34,11 +34,19 @@ __all__ = [
     "TemplateString",
     "ElementFilter",
     "UnicodeDammit",
+    "IncrementalUnicodeDammit",
+    "ParserSession",
     "CData",
     "Doctype",
+    "DiffOperation",
+    "diff",
     
     #SoupReplacer
-    "SoupReplacer"
+    "SoupReplacer",
+    "ReplacerPipeline",
+    "iterparse",
+    "parse_many",
+    "parse_split",
     # Exceptions
     "FeatureNotFound",
     "ParserRejectedMarkup",
@@ -53,6 +61,7 @@ __all__ = [
 ]
 
 from collections import Counter
+import importlib
 import sys
 import warnings
 
@@ -68,8 +77,7 @@ from .builder import (
     TreeBuilder,
 )
 from .builder._htmlparser import HTMLParserTreeBuilder
-from .dammit import UnicodeDammit
-from .css import CSS
+from .dammit import IncrementalUnicodeDammit, UnicodeDammit
 from ._deprecation import (
     _deprecated,
 )
@@ -82,6 +90,7 @@ from .element import (
     Doctype,
     NavigableString,
     PageElement,
+    PreformattedString,
     ProcessingInstruction,
     PYTHON_SPECIFIC_ENCODINGS,
     ResultSet,
@@ -89,13 +98,15 @@ from .element import (
     Stylesheet,
     Tag,
     TemplateString,
-    SoupReplacer
+    SoupReplacer,
+    ReplacerPipeline,
 ) 
 
 
 from .formatter import Formatter
 from .filter import (
     ElementFilter,
+    PruningStrainer,
     SoupStrainer,
 )
 from typing import (
@@ -103,13 +114,24 @@ from typing import (
     cast,
     Counter as CounterType,
     Dict,
+    Iterable,
     Iterator,
     List,
     Sequence,
     Optional,
+    Tuple,
     Type,
+    TYPE_CHECKING,
     Union,
 )
+from typing_extensions import Self
+
+if TYPE_CHECKING:
+    from bs4 import _binary
+    from bs4.css import CSS
+    from bs4.index import TreeIndex
+    from bs4.parallel import parse_many, parse_split
+    from bs4.treediff import DiffOperation, diff
 
 from bs4._typing import (
     _Encoding,
@@ -189,9 +211,12 @@ class BeautifulSoup(Tag):
     # FUTURE PYTHON:
     element_classes: Dict[Type[PageElement], Type[PageElement]]  #: :meta private:
     builder: TreeBuilder  #: :meta private:
+    replacer: Optional[SoupReplacer]  #: :meta private:
     is_xml: bool
     known_xml: Optional[bool]
     parse_only: Optional[SoupStrainer]  #: :meta private:
+    _indexed: bool  #: :meta private:
+    _index: Optional["TreeIndex"]  #: :meta private:
 
     # These members are only used while parsing markup.
     markup: Optional[_RawMarkup]  #: :meta private:
@@ -202,6 +227,16 @@ class BeautifulSoup(Tag):
     preserve_whitespace_tag_stack: List[Tag]  #: :meta private:
     string_container_stack: List[Tag]  #: :meta private:
     _most_recent_element: Optional[PageElement]  #: :meta private:
+    _skipped_tags: List[str]  #: :meta private:
+    _renamed: Dict[str, str]  #: :meta private:
+    _phantom_tags: List[Tuple[str, int]]  #: :meta private:
+
+    # These members are only used while markup is being passed in
+    # through feed().
+    _from_encoding: Optional[_Encoding]  #: :meta private:
+    _exclude_encodings: Optional[_Encodings]  #: :meta private:
+    _feeding: bool  #: :meta private:
+    _pending_chunks: Optional[List[_RawMarkup]]  #: :meta private:
 
     #: Beautiful Soup's best guess as to the character encoding of the
     #: original document.
@@ -227,6 +262,7 @@ class BeautifulSoup(Tag):
         from_encoding: Optional[_Encoding] = None,
         exclude_encodings: Optional[_Encodings] = None,
         element_classes: Optional[Dict[Type[PageElement], Type[PageElement]]] = None,
+        indexed: bool = False,
         **kwargs: Any,
     ):
         """Constructor.
@@ -267,6 +303,13 @@ class BeautifulSoup(Tag):
          built. This is useful for subclassing Tag or NavigableString
          to modify default behavior.
 
+        :param indexed: If this is True, Beautiful Soup will keep an
+         index of the tags in the document, keyed by tag name. Name
+         lookups like ``soup.find_all("a")`` and ``soup.title`` will
+         then use the index instead of searching the whole tree. This
+         costs some time during parsing, so it's worthwhile only if
+         you're going to run a lot of queries against the document.
+
         :param kwargs: For backwards compatibility purposes, the
          constructor accepts certain keyword arguments used in
          Beautiful Soup 3. None of these arguments do anything in
@@ -357,6 +400,7 @@ class BeautifulSoup(Tag):
             from_encoding = None
 
         self.element_classes = element_classes or dict()
+        self._indexed = indexed
 
         # We need this information to track whether or not the builder
         # was specified well enough that we can omit the 'you need to
@@ -389,7 +433,7 @@ class BeautifulSoup(Tag):
         if builder is None:
             replacer = kwargs.pop("replacer", None)
             builder = builder_class(replacer=replacer, **kwargs)
-            self.replacer = replacer  #
+            self.replacer = replacer
             if (
                 not original_builder
                 and not (
@@ -446,6 +490,7 @@ class BeautifulSoup(Tag):
                 warnings.warn(
                     "Keyword arguments to the BeautifulSoup constructor will be ignored. These would normally be passed into the TreeBuilder constructor, but a TreeBuilder instance was passed in as `builder`."
                 )
+            self.replacer = getattr(builder, "replacer", None)
         
         self.builder = builder
         self.is_xml = builder.is_xml
@@ -473,6 +518,18 @@ class BeautifulSoup(Tag):
         # it was a file-type object, we've read from it.
         markup = cast(_RawMarkup, markup)
 
+        # These are kept around so that markup pushed in later
+        # through feed() is decoded the same way.
+        self._from_encoding = from_encoding
+        self._exclude_encodings = exclude_encodings
+        self._feeding = False
+        self._pending_chunks = None
+        self._parse_markup(markup)
+
+    def _parse_markup(self, markup: _RawMarkup) -> None:
+        """Parse a complete document, trying each of the strategies
+        suggested by the TreeBuilder's prepare_markup() in turn.
+        """
         rejections = []
         success = False
         for (
@@ -481,7 +538,7 @@ class BeautifulSoup(Tag):
             self.declared_html_encoding,
             self.contains_replacement_characters,
         ) in self.builder.prepare_markup(
-            markup, from_encoding, exclude_encodings=exclude_encodings
+            markup, self._from_encoding, exclude_encodings=self._exclude_encodings
         ):
             self.reset()
             self.builder.initialize_soup(self)
@@ -511,30 +568,134 @@ class BeautifulSoup(Tag):
 
         This is the first step of the deepcopy process.
         """
-        clone = type(self)("", None, self.builder)
+        clone = type(self)("", None, self.builder, indexed=self._indexed)
 
         # Keep track of the encoding of the original document,
         # since we won't be parsing it again.
         clone.original_encoding = self.original_encoding
         return clone
 
+    def _new_document(self) -> "BeautifulSoup":
+        """Create a new BeautifulSoup object with the same TreeBuilder
+        and settings as this one, without going through the
+        constructor.
+
+        The new object isn't ready to use until some markup has been
+        passed into `BeautifulSoup._parse_markup`.
+        """
+        soup = object.__new__(type(self))
+        soup.element_classes = self.element_classes
+        soup._indexed = self._indexed
+        soup.replacer = self.replacer
+        soup.builder = self.builder
+        soup.is_xml = self.is_xml
+        soup.known_xml = self.is_xml
+        soup._namespaces = dict()
+        soup.parse_only = self.parse_only
+        soup._from_encoding = self._from_encoding
+        soup._exclude_encodings = self._exclude_encodings
+        soup._feeding = False
+        soup._pending_chunks = None
+        return soup
+
+    def __deepcopy__(self, memo: Dict[Any, Any], recursive: bool = True) -> Self:
+        """A deepcopy of a BeautifulSoup object is a new BeautifulSoup
+        object with a copy of the original's parse tree.
+
+        The tree is copied by way of the format used by `dumps`, which
+        is much faster than copying one element at a time.
+        """
+        from bs4 import _binary
+
+        clone = self.copy_self()
+        if recursive:
+            clone._load_tree(_binary.snapshot(self))
+        return cast(Self, clone)
+
+    def dumps(self) -> bytes:
+        """Encode this document in a compact binary format.
+
+        The result can be turned back into a `BeautifulSoup` object
+        with `BeautifulSoup.loads`, which is much faster than parsing
+        the document again. It records the structure of the tree, not
+        the original markup.
+
+        Only load the output with a compatible version of Beautiful
+        Soup, and only load data you trust.
+        """
+        from bs4 import _binary
+
+        return _binary.dumps(self)
+
+    @classmethod
+    def loads(
+        cls,
+        data: bytes,
+        features: Optional[Union[str, Sequence[str]]] = None,
+        builder: Optional[Union[TreeBuilder, Type[TreeBuilder]]] = None,
+        **kwargs: Any,
+    ) -> Self:
+        """Rebuild a document from the output of `BeautifulSoup.dumps`.
+
+        :param data: The output of `BeautifulSoup.dumps`.
+        :param features: The kind of parser to associate with the new
+            document. By default, it's the same kind of parser that
+            created the original document.
+        :param builder: A TreeBuilder subclass or instance to associate
+            with the new document, instead of looking one up.
+        :param kwargs: Passed into the `BeautifulSoup` constructor.
+        """
+        from bs4 import _binary
+
+        document = _binary.read(data)
+        if features is None and builder is None:
+            features = document.builder_name
+        soup = cls("", features, builder, **kwargs)
+        soup.original_encoding = document.original_encoding
+        soup.declared_html_encoding = document.declared_html_encoding
+        soup.contains_replacement_characters = (
+            document.contains_replacement_characters
+        )
+        soup._namespaces = document.namespaces
+        soup._load_tree(document.tree)
+        return soup
+
+    def _load_tree(self, tree: "_binary._Decoder") -> None:
+        """Rebuild an encoded tree as the contents of this (empty)
+        document.
+        """
+        self._most_recent_element = tree.decode_children(self, self, self.builder)
+        if self._index is not None:
+            # The tree was put together without going through
+            # Tag.insert().
+            self._index.invalidate()
+
     def __getstate__(self) -> Dict[str, Any]:
         # Frequently a tree builder can't be pickled.
         d = dict(self.__dict__)
         if "builder" in d and d["builder"] is not None and not self.builder.picklable:
             d["builder"] = type(self.builder)
-        # Store the contents as a Unicode string.
+        # Store the contents in the format used by dumps(), so they
+        # don't have to be parsed again.
         d["contents"] = []
-        d["markup"] = self.decode()
+        d["markup"] = None
+        d["_tree"] = self.dumps()
 
         # If _most_recent_element is present, it's a Tag object left
         # over from initial parse. It might not be picklable and we
         # don't need it.
         if "_most_recent_element" in d:
             del d["_most_recent_element"]
+
+        # The index refers to the Tag objects by identity, so it will
+        # be rebuilt on the other end.
+        if "_index" in d:
+            del d["_index"]
         return d
 
     def __setstate__(self, state: Dict[str, Any]) -> None:
+        tree = state.pop("_tree", None)
+        state.setdefault("_indexed", False)
         # If necessary, restore the TreeBuilder by looking it up.
         self.__dict__ = state
         if isinstance(self.builder, type):
@@ -545,7 +706,14 @@ class BeautifulSoup(Tag):
             self.builder = HTMLParserTreeBuilder()
         self.builder.soup = self
         self.reset()
-        self._feed()
+        if tree is None:
+            # This object was pickled by an older version of Beautiful
+            # Soup, which stored the document as markup.
+            self._feed()
+        else:
+            from bs4 import _binary
+
+            self._load_tree(_binary.read(tree).tree)
 
     @classmethod
     @_deprecated(
@@ -672,19 +840,101 @@ class BeautifulSoup(Tag):
 
         if self.markup is not None:
             self.builder.feed(self.markup)
-        # Close out any unfinished strings and close all the open tags.
+        self._close_open_tags()
+
+    def _close_open_tags(self) -> None:
+        """Close out any unfinished strings and close all the open tags."""
         self.endData()
         while (
             self.currentTag is not None and self.currentTag.name != self.ROOT_TAG_NAME
         ):
             self.popTag()
 
+    def feed(self, chunk: _RawMarkup) -> None:
+        """Parse another piece of a document.
+
+        This makes it possible to build a parse tree from markup that
+        arrives over time, such as data read from a socket or a large
+        file, without first holding the entire document in memory::
+
+         soup = BeautifulSoup(features="html.parser")
+         for chunk in iter(lambda: fh.read(65536), b""):
+             soup.feed(chunk)
+         soup.close()
+
+        The first call to feed() throws away any existing parse tree
+        and starts a new document. The tree can be inspected between
+        calls, but it won't be complete until `BeautifulSoup.close`
+        is called.
+
+        If the TreeBuilder can't parse a document incrementally (see
+        `TreeBuilder.FEEDS_INCREMENTALLY`), the chunks are held in
+        memory and parsed all at once when `BeautifulSoup.close` is
+        called.
+
+        :param chunk: A string or bytestring. All the chunks of a
+            given document must be of the same type.
+        """
+        if not self._feeding:
+            self._feeding = True
+            self.markup = None
+            self.original_encoding = None
+            self.declared_html_encoding = None
+            self.contains_replacement_characters = False
+            self.reset()
+            if not self.builder.FEEDS_INCREMENTALLY:
+                self._pending_chunks = []
+            else:
+                self.builder.initialize_soup(self)
+                self.builder.start_feed(self._from_encoding, self._exclude_encodings)
+
+        if self._pending_chunks is not None:
+            if self._pending_chunks and not isinstance(
+                chunk, type(self._pending_chunks[0])
+            ):
+                raise TypeError(
+                    "Can't mix strings and bytestrings when feeding a document in chunks."
+                )
+            self._pending_chunks.append(chunk)
+        else:
+            # The open tags are about to get new contents.
+            self._invalidate_open_tags()
+            self.builder.feed_chunk(chunk)
+
+    def close(self) -> None:
+        """Finish parsing a document that was passed in through
+        `BeautifulSoup.feed`.
+
+        Any tags that are still open will be closed. Calling close()
+        when no document is being fed in has no effect.
+        """
+        if not self._feeding:
+            return
+        self._feeding = False
+        if self._pending_chunks is not None:
+            chunks = self._pending_chunks
+            self._pending_chunks = None
+            markup: _RawMarkup = ""
+            if chunks:
+                markup = chunks[0][:0].join(chunks)
+            self._parse_markup(markup)
+            return
+
+        try:
+            self._invalidate_open_tags()
+            self.builder.finish_feed()
+            self._close_open_tags()
+        finally:
+            # Remove the builder's circular reference to this object.
+            self.builder.soup = None
+
     def reset(self) -> None:
         """Reset this object to a state as though it had never parsed any
         markup.
         """
         Tag.__init__(self, self, self.builder, self.ROOT_TAG_NAME)
         self.hidden = True
+        self._digest = self._structure_digest = None
         self.builder.reset()
         self.current_data = []
         self.currentTag = None
@@ -693,8 +943,135 @@ class BeautifulSoup(Tag):
         self.preserve_whitespace_tag_stack = []
         self.string_container_stack = []
         self._most_recent_element = None
+        # Names of open tags inside a subtree that parse_only
+        # decided to skip.
+        self._skipped_tags = []
+        # The new names the replacer gave to each start tag name.
+        self._renamed = {}
+        # Names of open tags that parse_only decided not to keep,
+        # along with the size of the tag stack when they were opened.
+        self._phantom_tags = []
+        if self._index is not None:
+            # Tags from the old tree stop reporting to the old index.
+            self._index.invalidate()
+        if self._indexed:
+            from bs4.index import TreeIndex
+
+            # The tree is empty, so the index starts out complete.
+            self._index = TreeIndex(self, built=True)
+        else:
+            self._index = None
         self.pushTag(self)
 
+    def _invalidate_open_tags(self) -> None:
+        """Clear the cached digests of the tags that are still open,
+        since the parser adds to them without going through
+        `Tag.insert`.
+        """
+        if self.currentTag is not None:
+            self.currentTag.invalidate_digest()
+
+    def reindex(self) -> None:
+        """Rebuild the tag index from scratch.
+
+        The index can't see changes made directly to `Tag.attrs`, so
+        call this after making them in an indexed document. This does
+        nothing if the document isn't indexed.
+        """
+        if self._index is not None:
+            self._index.invalidate()
+
+    def apply_replacer(
+        self, replacer: SoupReplacer, scope: Optional[Tag] = None
+    ) -> None:
+        """Apply a `SoupReplacer` to a tree that's already been built,
+        with the same results as passing it into the constructor.
+
+        This is useful for trees that didn't come from the parser, such
+        as copies, or tags made with `BeautifulSoup.new_tag`.
+
+        If the replacer only has rules for tags with particular names
+        (no functions), only the tags with those names are changed. If
+        it's being applied to the whole of an indexed document, those
+        tags are looked up in the index. Otherwise the subtree is
+        walked once.
+
+        The one thing that can come out differently is the shape of the
+        tree: the parser decides whether a tag is (for instance) an
+        empty-element tag based on its new name, but here the tree has
+        already been built using the old names.
+
+        :param replacer: The `SoupReplacer` to apply.
+        :param scope: Only apply the replacer to this `Tag` and the
+            elements beneath it. By default, it's applied to the
+            whole document (but not to the `BeautifulSoup` object
+            itself).
+        """
+        if scope is None:
+            scope = self
+        index = scope._tree_index()
+        names = replacer._affected_names()
+        if scope is self and index is not None and names is not None:
+            tags = []
+            for name in names:
+                tags.extend(self.find_all(name))
+            # The search results are gathered before anything changes,
+            # so a tag can show up under its old name and its new one.
+            seen = set()
+            for tag in tags:
+                if id(tag) in seen or tag.decomposed:
+                    continue
+                seen.add(id(tag))
+                self._apply_replacer_to_tag(replacer, tag, index)
+            return
+
+        transforms_strings = replacer._transforms_strings()
+        stack: List[PageElement]
+        if isinstance(scope, BeautifulSoup):
+            stack = list(reversed(scope.contents))
+        else:
+            stack = [scope]
+        while stack:
+            element = stack.pop()
+            if isinstance(element, Tag):
+                if names is not None and element.name not in names:
+                    stack.extend(reversed(element.contents))
+                elif self._apply_replacer_to_tag(replacer, element, index):
+                    stack.extend(reversed(element.contents))
+            elif transforms_strings and not isinstance(element, PreformattedString):
+                text = replacer.transform_string(str(element), element.parent)
+                if not text:
+                    element.extract()
+                elif text != element:
+                    element.replace_with(element.__class__(text))
+
+    def _apply_replacer_to_tag(
+        self, replacer: SoupReplacer, tag: Tag, index: Optional["TreeIndex"]
+    ) -> bool:
+        """Rename, drop or transform one tag, the way it would have
+        been if ``replacer`` had been used while parsing.
+
+        :return: False if the tag was dropped.
+        """
+        name = replacer.rename(tag.name)
+        if replacer._drops_anything():
+            # The parser sees attribute values before they're split up.
+            attrs = dict(
+                (key, " ".join(value) if isinstance(value, list) else value)
+                for key, value in tag.attrs.items()
+            )
+            if replacer.drops(name, attrs):
+                tag.decompose()
+                return False
+        if index is not None:
+            index.tag_changing(tag)
+        tag.name = name
+        replacer.replace(tag)
+        if index is not None:
+            index.tag_changed(tag)
+        tag.invalidate_digest()
+        return True
+
     def new_tag(
             self,
             name: str,
@@ -834,6 +1211,8 @@ class BeautifulSoup(Tag):
         # print("Push", tag.name)
         if self.currentTag is not None:
             self.currentTag.contents.append(tag)
+            if self._index is not None:
+                self._index.tag_added(tag)
         self.tagStack.append(tag)
         self.currentTag = self.tagStack[-1]
         if tag.name != self.ROOT_TAG_NAME:
@@ -853,6 +1232,10 @@ class BeautifulSoup(Tag):
         :meta private:
         """
         if self.current_data:
+            if self._skipped_tags:
+                # This string is inside a subtree that's being skipped.
+                self.current_data = []
+                return
             current_data = "".join(self.current_data)
             # If whitespace is not preserved, and this string contains
             # nothing but ASCII spaces, replace it with a single space
@@ -872,6 +1255,14 @@ class BeautifulSoup(Tag):
             # Reset the data collector.
             self.current_data = []
 
+            if self.replacer is not None and containerClass is None:
+                transformed = self.replacer.transform_string(
+                    current_data, self.currentTag
+                )
+                if not transformed:
+                    return
+                current_data = transformed
+
             # Should we add this string to the tree at all?
             if (
                 self.parse_only
@@ -918,6 +1309,10 @@ class BeautifulSoup(Tag):
 
         self._most_recent_element = o
         parent.contents.append(o)
+        if self._index is not None and isinstance(o, Tag):
+            # The tree builder is managing the tree itself, and the
+            # new tag may not be at the end of the document.
+            self._index.invalidate()
 
         # Check if we are inserting into an already parsed node.
         if fix:
@@ -1038,14 +1433,37 @@ class BeautifulSoup(Tag):
         """
         # print("Start tag %s: %s" % (name, attrs))
         self.endData()
+        if self.replacer is not None:
+            new_name = self.replacer.rename(name)
+            self._renamed[name] = new_name
+            name = new_name
+
+        if self._skipped_tags:
+            if not self._is_void_element(name):
+                self._skipped_tags.append(name)
+            return None
 
-        if (
-            self.parse_only
-            and len(self.tagStack) <= 1
-            and not self.parse_only.allow_tag_creation(nsprefix, name, attrs)
-        ):
+        if self.replacer is not None and self.replacer.drops(name, attrs):
+            # Leave out this tag and everything inside it.
+            if not self._is_void_element(name):
+                self._skipped_tags.append(name)
             return None
 
+        if self.parse_only:
+            if self.parse_only.applies_at_every_depth:
+                decision = self.parse_only.tag_decision(nsprefix, name, attrs)
+                if decision != ElementFilter.KEEP:
+                    if not self._is_void_element(name):
+                        if decision == ElementFilter.SKIP:
+                            self._skipped_tags.append(name)
+                        else:
+                            self._phantom_tags.append((name, len(self.tagStack)))
+                    return None
+            elif len(self.tagStack) <= 1 and not self.parse_only.allow_tag_creation(
+                nsprefix, name, attrs
+            ):
+                return None
+
         tag_class = self.element_classes.get(Tag, Tag)
         # Assume that this is either Tag or a subclass of Tag. If not,
         # the user brought type-unsafety upon themselves.
@@ -1082,8 +1500,63 @@ class BeautifulSoup(Tag):
         """
         # print("End tag: " + name)
         self.endData()
+        if self.replacer is not None:
+            # An end tag gets the same new name as the start tag it
+            # closes, without asking the replacer again.
+            new_name = self._renamed.get(name)
+            if new_name is None:
+                new_name = self.replacer.rename(name)
+            name = new_name
+        if self._skipped_tags:
+            # This closes a tag inside a skipped subtree; it may also
+            # close the subtree itself.
+            for i in range(len(self._skipped_tags) - 1, -1, -1):
+                if self._skipped_tags[i] == name:
+                    del self._skipped_tags[i:]
+                    break
+            return
+        if self._phantom_tags and self._close_phantom_tag(name):
+            return
         self._popToTag(name, nsprefix)
 
+    def _is_void_element(self, name: str) -> bool:
+        """Will a tag with this name never get an end tag?"""
+        empty_element_tags = self.builder.empty_element_tags
+        return empty_element_tags is not None and name in empty_element_tags
+
+    def _close_phantom_tag(self, name: str) -> bool:
+        """Handle an end tag that might close a tag that parse_only
+        decided not to keep.
+
+        :return: True if the end tag was dealt with; False if it
+           should close a real tag.
+        """
+        phantoms = self._phantom_tags
+
+        # Any phantom tag opened inside a real tag that has since
+        # been closed was implicitly closed along with it.
+        stack_size = len(self.tagStack)
+        while phantoms and phantoms[-1][1] > stack_size:
+            phantoms.pop()
+
+        for i in range(len(phantoms) - 1, -1, -1):
+            phantom_name, phantom_stack_size = phantoms[i]
+            if phantom_name != name:
+                continue
+            for tag in self.tagStack[phantom_stack_size:]:
+                if tag.name == name:
+                    # A real tag with this name was opened more
+                    # recently than the phantom tag. The end tag
+                    # belongs to the real tag.
+                    return False
+            # Closing the phantom tag implicitly closes everything
+            # opened inside it.
+            del phantoms[i:]
+            while len(self.tagStack) > phantom_stack_size:
+                self.popTag()
+            return True
+        return False
+
     def handle_data(self, data: str) -> None:
         """Called by the tree builder when a chunk of textual data is
         encountered.
@@ -1116,20 +1589,7 @@ class BeautifulSoup(Tag):
             parse tree. This is only used by `Tag.decode_contents` and
             you probably won't need to use it.
         """
-        if self.is_xml:
-            # Print the XML declaration
-            encoding_part = ""
-            declared_encoding: Optional[str] = eventual_encoding
-            if eventual_encoding in PYTHON_SPECIFIC_ENCODINGS:
-                # This is a special Python encoding; it can't actually
-                # go into an XML document because it means nothing
-                # outside of Python.
-                declared_encoding = None
-            if declared_encoding is not None:
-                encoding_part = ' encoding="%s"' % declared_encoding
-            prefix = '<?xml version="1.0"%s?>\n' % encoding_part
-        else:
-            prefix = ""
+        prefix = self._output_prefix(eventual_encoding)
 
         # Prior to 4.13.0, the first argument to this method was a
         # bool called pretty_print, which gave the method a different
@@ -1164,6 +1624,21 @@ class BeautifulSoup(Tag):
             indent_level, eventual_encoding, formatter, iterator
         )
 
+    def _output_prefix(self, eventual_encoding: _Encoding) -> str:
+        """An XML document starts with an XML declaration."""
+        if not self.is_xml:
+            return ""
+        encoding_part = ""
+        declared_encoding: Optional[str] = eventual_encoding
+        if eventual_encoding in PYTHON_SPECIFIC_ENCODINGS:
+            # This is a special Python encoding; it can't actually
+            # go into an XML document because it means nothing
+            # outside of Python.
+            declared_encoding = None
+        if declared_encoding is not None:
+            encoding_part = ' encoding="%s"' % declared_encoding
+        return '<?xml version="1.0"%s?>\n' % encoding_part
+
 
 # Aliases to make it easier to get started quickly, e.g. 'from bs4 import _soup'
 _s = BeautifulSoup
@@ -1184,6 +1659,244 @@ class BeautifulStoneSoup(BeautifulSoup):
         super(BeautifulStoneSoup, self).__init__(*args, **kwargs)
 
 
+class _IterParseSoup(BeautifulSoup):
+    """A `BeautifulSoup` that notices when a tag matching an
+    `ElementFilter` is closed, so that `iterparse` can hand it over
+    and then remove it from the tree.
+    """
+
+    _match: Optional[ElementFilter]
+    _completed: List[Tag]
+
+    def __init__(self, match: Optional[ElementFilter], *args: Any, **kwargs: Any):
+        # These have to be set before the superclass constructor
+        # parses the (empty) initial document.
+        self._match = match
+        self._completed = []
+        super(_IterParseSoup, self).__init__(*args, **kwargs)
+
+    def _is_match(self, tag: Tag) -> bool:
+        if self._match is None:
+            # With no filter, every top-level tag is a match.
+            return tag.parent is self
+        if not self._match.match(tag):
+            return False
+        # Only the outermost match is interesting: anything nested
+        # inside it will be delivered as part of it.
+        for ancestor in self.tagStack[1:]:
+            if self._match.match(ancestor):
+                return False
+        return True
+
+    def popTag(self) -> Optional[Tag]:
+        tag = self.tagStack[-1] if self.tagStack else None
+        current = super(_IterParseSoup, self).popTag()
+        if tag is not None and tag is not self and self._is_match(tag):
+            self._completed.append(tag)
+        return current
+
+    def reset(self) -> None:
+        super(_IterParseSoup, self).reset()
+        # If the document is being parsed again (e.g. with a
+        # different encoding), the tags found last time are gone.
+        self._completed = []
+
+    def _release(self, tag: Tag) -> None:
+        """Remove a completed tag from the tree, along with everything
+        that came before it.
+
+        Working up from the tag, each ancestor loses its earlier
+        children, and an ancestor that's been closed and has nothing
+        left in it is removed as well. So the tree stays small even
+        when each matching tag is wrapped in tags that don't match.
+
+        Apart from the tag itself, none of this was handed to the
+        caller, so it's decomposed rather than extracted. That way it
+        doesn't have to wait for the cyclic garbage collector.
+        """
+        element = tag
+        remove = True
+        while element.parent is not None:
+            parent = element.parent
+            if remove and self._most_recent_element is element._last_descendant():
+                # Nothing has been parsed since this element was
+                # closed. Whatever comes next will follow the parent.
+                self._most_recent_element = parent
+            index = parent.index(element)
+            if remove:
+                index += 1
+            for earlier in parent.contents[:index]:
+                if earlier is tag:
+                    earlier.extract(_self_index=0)
+                else:
+                    earlier.decompose()
+            remove = not parent.contents and not any(
+                parent is open_tag for open_tag in self.tagStack
+            )
+            element = parent
+
+
+class ParserSession(object):
+    """Parse a lot of documents with the same parser and settings.
+
+    The `BeautifulSoup` constructor looks up a tree builder, creates
+    it, and checks its arguments every time it's called. For a large
+    document that doesn't matter, but when parsing a lot of small
+    documents it adds up. A `ParserSession` does that work once, and
+    then `ParserSession.parse` does as little as possible for each
+    document::
+
+     session = ParserSession("html.parser")
+     for fragment in fragments:
+         soup = session.parse(fragment)
+
+    All the documents share a single `TreeBuilder`, so a session can
+    only parse one document at a time. Use a separate session in each
+    thread.
+
+    The arguments are the same as the arguments to the `BeautifulSoup`
+    constructor, apart from the markup. Any other keyword arguments
+    are passed into the `TreeBuilder` constructor.
+    """
+
+    #: The `TreeBuilder` used to parse every document in this session.
+    builder: TreeBuilder
+
+    # An empty document that the parsed documents are modeled on.
+    _template: BeautifulSoup
+
+    def __init__(
+        self,
+        features: Optional[Union[str, Sequence[str]]] = None,
+        builder: Optional[Union[TreeBuilder, Type[TreeBuilder]]] = None,
+        parse_only: Optional[SoupStrainer] = None,
+        from_encoding: Optional[_Encoding] = None,
+        exclude_encodings: Optional[_Encodings] = None,
+        element_classes: Optional[Dict[Type[PageElement], Type[PageElement]]] = None,
+        indexed: bool = False,
+        **builder_options: Any,
+    ):
+        self._template = BeautifulSoup(
+            "",
+            features,
+            builder,
+            parse_only=parse_only,
+            from_encoding=from_encoding,
+            exclude_encodings=exclude_encodings,
+            element_classes=element_classes,
+            indexed=indexed,
+            **builder_options,
+        )
+        self.builder = self._template.builder
+
+    def parse(self, markup: _IncomingMarkup) -> BeautifulSoup:
+        """Parse a document.
+
+        Unlike the `BeautifulSoup` constructor, this doesn't issue
+        warnings about markup that looks like a URL or a filename.
+
+        :param markup: A string or a file-like object representing
+         markup to be parsed.
+        :return: A new `BeautifulSoup` object.
+        """
+        if hasattr(markup, "read"):
+            markup = markup.read()
+        elif not isinstance(markup, (bytes, str)) and not hasattr(markup, "__len__"):
+            raise TypeError(
+                f"Incoming markup is of an invalid type: {markup!r}. Markup must be a string, a bytestring, or an open filehandle."
+            )
+        markup = cast(_RawMarkup, markup)
+        soup = self._template._new_document()
+        if isinstance(markup, str):
+            # There's nothing to decode.
+            soup._from_encoding = None
+        soup._parse_markup(markup)
+        return soup
+
+
+def iterparse(
+    source: Union[_IncomingMarkup, Iterable[_RawMarkup]],
+    features: Optional[Union[str, Sequence[str]]] = None,
+    match: Optional[ElementFilter] = None,
+    chunk_size: int = 64 * 1024,
+    **kwargs: Any,
+) -> Iterator[Tag]:
+    """Parse a document incrementally, yielding each matching tag
+    as soon as its end tag has been processed.
+
+    Once the caller asks for the next tag, the previous one is
+    removed from the parse tree. Everything that came before it,
+    including any tags around it that have been closed, is destroyed.
+    Unless the caller holds on to a tag, it can then be
+    garbage-collected. Memory use is proportional to the size of one
+    matching tag, not the size of the document::
+
+     for block in iterparse(fh, "html.parser", SoupStrainer("div", class_="test-block")):
+         print(block["id"])
+
+    :param source: A file-like object, a string or bytestring, or an
+        iterable of string or bytestring chunks.
+    :param features: Passed into the `BeautifulSoup` constructor.
+    :param match: An `ElementFilter` (such as a `SoupStrainer`). Only
+        tags that match it will be yielded. If a matching tag is
+        nested inside another matching tag, only the outer tag is
+        yielded. If this is None, every top-level tag is yielded.
+    :param chunk_size: How many characters or bytes to pass into the
+        parser at a time.
+    :param kwargs: Passed into the `BeautifulSoup` constructor.
+
+    If the tree builder can't parse a document incrementally (see
+    `TreeBuilder.FEEDS_INCREMENTALLY`), the whole document will be
+    parsed before the first tag is yielded.
+    """
+    chunks: Iterable[_RawMarkup]
+    if hasattr(source, "read"):
+        read = getattr(source, "read")
+        chunks = iter(lambda: read(chunk_size), read(0))
+    elif isinstance(source, (str, bytes)):
+        markup = source
+        chunks = (
+            markup[i : i + chunk_size] for i in range(0, len(markup), chunk_size)
+        )
+    else:
+        chunks = cast(Iterable[_RawMarkup], source)
+
+    soup = _IterParseSoup(match, "", features, **kwargs)
+
+    def completed() -> Iterator[Tag]:
+        while soup._completed:
+            tag = soup._completed.pop(0)
+            yield tag
+            soup._release(tag)
+
+    for chunk in chunks:
+        soup.feed(chunk)
+        yield from completed()
+    soup.close()
+    yield from completed()
+
+
+# These are imported the first time they're used, so that importing
+# bs4 doesn't also import soupsieve, or code that most programs never
+# call.
+_lazy_imports: Dict[str, str] = {
+    "CSS": "bs4.css",
+    "DiffOperation": "bs4.treediff",
+    "diff": "bs4.treediff",
+    "parse_many": "bs4.parallel",
+    "parse_split": "bs4.parallel",
+}
+
+
+def __getattr__(name: str) -> Any:
+    module_name = _lazy_imports.get(name)
+    if module_name is None:
+        raise AttributeError("module %r has no attribute %r" % (__name__, name))
+    obj = getattr(importlib.import_module(module_name), name)
+    globals()[name] = obj
+    return obj
+
+
 # If this file is run as a script, act as an HTML pretty-printer.
 if __name__ == "__main__":
     import sys
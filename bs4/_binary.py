@@ -0,0 +1,484 @@
+"""A compact binary format for parse trees.
+
+This is what `BeautifulSoup.dumps` and `BeautifulSoup.loads` use, and
+what makes pickling and deep-copying a `BeautifulSoup` object cheap.
+Rather than turning the tree into markup and parsing the markup again,
+the format records the structure of the tree directly: the class of
+each node, the name, namespace and attributes of each tag, the text of
+each string, and how many children each tag has. Decoding rebuilds
+the linked tree in a single pass, with no tokenizing.
+
+The format is versioned, but it's meant for caching and for moving
+trees between processes, not for long-term storage. As with pickle,
+only load data you trust: loading imports the modules that define the
+node classes.
+
+Layout, with all integers little-endian:
+
+* A header: the magic number, a format version, the size of the
+  integers in the instruction stream, the number of strings in the
+  string table, the size of the UTF-8 blob and the number of integers
+  in the instruction stream.
+* The length (in code points) of each string in the string table.
+* The strings, concatenated and encoded as UTF-8.
+* The instruction stream: signed integers (16-bit if possible,
+  otherwise 32-bit) describing the document, the namespace mappings
+  and node types it uses, and then every node in document order. Strings are referred to by their
+  position in the string table; -1 stands for None.
+"""
+
+from __future__ import annotations
+
+from array import array
+import importlib
+import struct
+import sys
+from typing import (
+    Any,
+    cast,
+    Dict,
+    List,
+    Optional,
+    Tuple,
+    Type,
+    TYPE_CHECKING,
+)
+
+from bs4.element import (
+    AttributeValueList,
+    HTMLAttributeDict,
+    PageElement,
+    Tag,
+)
+
+if TYPE_CHECKING:
+    from bs4 import BeautifulSoup
+    from bs4.builder import TreeBuilder
+
+MAGIC = b"BS4T"
+VERSION = 1
+
+# Magic number, version, size of each integer in the instruction
+# stream, number of strings, size of the UTF-8 blob, number of
+# integers in the instruction stream.
+_HEADER = struct.Struct("<4sBBIII")
+
+# Array typecodes for 16- and 32-bit signed integers. The instruction
+# stream uses 16-bit integers if they're big enough.
+_SHORT = "h"
+_INT = "i" if array("i").itemsize == 4 else "l"
+
+# Bits in a Tag shape's flags.
+_HIDDEN = 1
+_CAN_BE_EMPTY = 2
+_CANNOT_BE_EMPTY = 4
+_HAS_POSITION = 8
+
+# The kinds of entries in the node type table.
+_STRING_TYPE = 0
+_TAG_TYPE = 1
+
+
+class _Encoder(object):
+    """Turns a tree into a string table and an instruction stream.
+
+    Every node in the instruction stream starts with an index into a
+    table of node types. For a string, the type is just the string's
+    class. For a tag, the type is its 'shape': everything about it
+    except its position in the source, its attribute values and its
+    children. Most tags in a document share a shape with many others,
+    so this keeps the instruction stream short.
+    """
+
+    def __init__(self) -> None:
+        self.strings: List[str] = []
+        self._string_ids: Dict[str, int] = {}
+        self._type_ids: Dict[Tuple[Any, ...], int] = {}
+        self._types: List[Tuple[Any, ...]] = []
+        self._namespace_ids: Dict[int, int] = {}
+        self._namespaces: List[Dict[Any, str]] = []
+
+    def string(self, value: Optional[str]) -> int:
+        """Find or create the string table entry for ``value``."""
+        if value is None:
+            return -1
+        value = str(value)
+        string_id = self._string_ids.get(value)
+        if string_id is None:
+            string_id = self._string_ids[value] = len(self.strings)
+            self.strings.append(value)
+        return string_id
+
+    def _type(self, node_type: Tuple[Any, ...]) -> int:
+        type_id = self._type_ids.get(node_type)
+        if type_id is None:
+            type_id = self._type_ids[node_type] = len(self._types)
+            self._types.append(node_type)
+        return type_id
+
+    def _namespace_map(self, namespaces: Optional[Dict[Any, str]]) -> int:
+        if not namespaces:
+            return -1
+        namespace_id = self._namespace_ids.get(id(namespaces))
+        if namespace_id is None:
+            namespace_id = self._namespace_ids[id(namespaces)] = len(
+                self._namespaces
+            )
+            self._namespaces.append(namespaces)
+        return namespace_id
+
+    def encode_children(self, root: Tag) -> List[int]:
+        """Encode everything beneath ``root``.
+
+        :return: An instruction stream that begins with the namespace
+            table and the node type table, followed by the nodes.
+        """
+        ints: List[int] = [len(root.contents)]
+        string = self.string
+        pending: List[PageElement] = list(reversed(root.contents))
+        while pending:
+            element = pending.pop()
+            if not isinstance(element, Tag):
+                ints.append(self._type((_STRING_TYPE, element.__class__)))
+                ints.append(string(element))
+                continue
+
+            flags = _HIDDEN if element.hidden else 0
+            if element.can_be_empty_element is True:
+                flags |= _CAN_BE_EMPTY
+            elif element.can_be_empty_element is False:
+                flags |= _CANNOT_BE_EMPTY
+            has_position = element.sourceline is not None or element.sourcepos is not None
+            if has_position:
+                flags |= _HAS_POSITION
+            attrs = element.attrs
+            keys = tuple((key, isinstance(value, list)) for key, value in attrs.items())
+            ints.append(
+                self._type(
+                    (
+                        _TAG_TYPE,
+                        element.__class__,
+                        element.name,
+                        element.namespace,
+                        element.prefix,
+                        self._namespace_map(element._namespaces),
+                        flags,
+                        keys,
+                    )
+                )
+            )
+            if has_position:
+                ints.append(-1 if element.sourceline is None else element.sourceline)
+                ints.append(-1 if element.sourcepos is None else element.sourcepos)
+            for value in attrs.values():
+                if isinstance(value, list):
+                    ints.append(len(value))
+                    ints.extend([string(x) for x in value])
+                else:
+                    ints.append(string(value))
+            ints.append(len(element.contents))
+            pending.extend(reversed(element.contents))
+
+        tables: List[int] = [len(self._namespaces)]
+        for namespaces in self._namespaces:
+            tables.append(len(namespaces))
+            for prefix, uri in namespaces.items():
+                tables.append(string(prefix))
+                tables.append(string(uri))
+        tables.append(len(self._types))
+        for node_type in self._types:
+            kind, cls = node_type[:2]
+            tables.append(kind)
+            tables.append(string(f"{cls.__module__}:{cls.__qualname__}"))
+            if kind == _TAG_TYPE:
+                name, namespace, prefix, namespace_id, flags, keys = node_type[2:]
+                tables.extend(
+                    (string(name), string(namespace), string(prefix), namespace_id, flags)
+                )
+                tables.append(len(keys))
+                for key, is_list in keys:
+                    tables.append(string(key))
+                    tables.append(1 if is_list else 0)
+        return tables + ints
+
+
+class _Decoder(object):
+    """Rebuilds a tree from a string table and an instruction stream."""
+
+    def __init__(self, strings: List[str], ints: List[int]):
+        self.strings = strings
+        self.ints = ints
+        self.pos = 0
+
+    def next(self) -> int:
+        value = self.ints[self.pos]
+        self.pos += 1
+        return value
+
+    def string(self) -> Optional[str]:
+        string_id = self.next()
+        if string_id == -1:
+            return None
+        return self.strings[string_id]
+
+    def _resolve(self, name: Optional[str]) -> Type[PageElement]:
+        if name is None or ":" not in name:
+            raise ValueError(f"Invalid class name in encoded tree: {name!r}")
+        module_name, qualname = name.split(":", 1)
+        obj: Any = importlib.import_module(module_name)
+        for part in qualname.split("."):
+            obj = getattr(obj, part, None)
+        if not isinstance(obj, type) or not issubclass(obj, PageElement):
+            raise ValueError(f"Encoded tree refers to an unknown class: {name}")
+        return obj
+
+    def decode_children(
+        self,
+        container: Tag,
+        parser: Optional[BeautifulSoup],
+        builder: Optional[TreeBuilder],
+    ) -> PageElement:
+        """Rebuild the encoded elements beneath ``container``, after
+        anything that's already there.
+
+        :return: The last element in the rebuilt tree.
+        """
+
+        namespace_maps: List[Dict[Any, str]] = []
+        for i in range(self.next()):
+            namespaces = {}
+            for j in range(self.next()):
+                prefix = self.string()
+                namespaces[prefix] = cast(str, self.string())
+            namespace_maps.append(namespaces)
+
+        types: List[Tuple[Any, ...]] = []
+        for i in range(self.next()):
+            kind = self.next()
+            cls = self._resolve(self.string())
+            if kind == _STRING_TYPE:
+                types.append((None, cls, None, None, None, None, ()))
+                continue
+            name = self.string()
+            namespace = self.string()
+            prefix = self.string()
+            namespace_id = self.next()
+            flags = self.next()
+            keys = []
+            for j in range(self.next()):
+                key = self.string()
+                keys.append((key, self.next() == 1))
+            types.append(
+                (
+                    flags,
+                    cls,
+                    name,
+                    namespace,
+                    prefix,
+                    namespace_maps[namespace_id] if namespace_id != -1 else None,
+                    keys,
+                )
+            )
+
+        if builder is not None:
+            attr_dict_class = builder.attribute_dict_class
+            value_list_class = builder.attribute_value_list_class
+        else:
+            attr_dict_class = HTMLAttributeDict
+            value_list_class = AttributeValueList
+
+        # Most of the work happens in this loop, so it keeps its
+        # own position in the instruction stream rather than calling
+        # next().
+        ints = self.ints
+        strings = self.strings
+        pos = self.pos
+        last: PageElement = container
+        if container.contents:
+            last = cast(PageElement, container._last_descendant())
+        # Whatever came after the container still comes after it.
+        following = last.next_element
+        parent: Tag = container
+        remaining = ints[pos]
+        pos += 1
+        stack: List[Tuple[Tag, int]] = []
+        while True:
+            while remaining == 0 and stack:
+                parent, remaining = stack.pop()
+            if remaining == 0:
+                break
+            remaining -= 1
+
+            flags, cls, name, namespace, prefix, namespaces, keys = types[ints[pos]]
+            pos += 1
+            element: PageElement
+            children = 0
+            if flags is None:
+                element = cls(strings[ints[pos]])
+                pos += 1
+            else:
+                sourceline = sourcepos = None
+                if flags & _HAS_POSITION:
+                    if ints[pos] != -1:
+                        sourceline = ints[pos]
+                    if ints[pos + 1] != -1:
+                        sourcepos = ints[pos + 1]
+                    pos += 2
+                attrs = attr_dict_class()
+                for key, is_list in keys:
+                    if is_list:
+                        count = ints[pos]
+                        attrs[key] = value_list_class(
+                            [strings[x] for x in ints[pos + 1 : pos + 1 + count]]
+                        )
+                        pos += count + 1
+                    else:
+                        attrs[key] = strings[ints[pos]]
+                        pos += 1
+                tag = cls(
+                    parser,
+                    builder,
+                    name,
+                    namespace,
+                    prefix,
+                    attrs,
+                    sourceline=sourceline,
+                    sourcepos=sourcepos,
+                    namespaces=namespaces,
+                )
+                tag.hidden = bool(flags & _HIDDEN)
+                if flags & _CAN_BE_EMPTY:
+                    tag.can_be_empty_element = True
+                elif flags & _CANNOT_BE_EMPTY:
+                    tag.can_be_empty_element = False
+                else:
+                    tag.can_be_empty_element = None
+                children = ints[pos]
+                pos += 1
+                element = tag
+
+            # Link the new element into the tree. It always goes
+            # after everything decoded so far.
+            element.parent = parent
+            element.previous_element = last
+            last.next_element = element
+            siblings = parent.contents
+            if siblings:
+                previous_sibling = siblings[-1]
+                previous_sibling.next_sibling = element
+                element.previous_sibling = previous_sibling
+            siblings.append(element)
+            last = element
+
+            if children:
+                stack.append((parent, remaining))
+                parent = element
+                remaining = children
+        self.pos = pos
+        last.next_element = following
+        if following is not None:
+            following.previous_element = last
+        return last
+
+
+def snapshot(root: Tag) -> _Decoder:
+    """Encode the elements beneath ``root`` without turning them
+    into bytes. This is how a tree is deep-copied.
+
+    :return: A `_Decoder` that can rebuild the elements elsewhere.
+    """
+    encoder = _Encoder()
+    ints = encoder.encode_children(root)
+    return _Decoder(encoder.strings, ints)
+
+
+def dumps(soup: BeautifulSoup) -> bytes:
+    """Turn a `BeautifulSoup` object into bytes."""
+    encoder = _Encoder()
+    string = encoder.string
+    meta = [
+        string(soup.builder.NAME if soup.builder is not None else None),
+        string(soup.original_encoding),
+        string(soup.declared_html_encoding),
+        1 if soup.contains_replacement_characters else 0,
+        len(soup._namespaces),
+    ]
+    for prefix, uri in soup._namespaces.items():
+        meta.append(string(prefix))
+        meta.append(string(uri))
+    values = meta + encoder.encode_children(soup)
+    if values and -32768 <= min(values) and max(values) <= 32767:
+        ints = array(_SHORT, values)
+    else:
+        ints = array(_INT, values)
+    lengths = array(_INT, [len(x) for x in encoder.strings])
+    if sys.byteorder != "little":
+        ints.byteswap()
+        lengths.byteswap()
+    blob = "".join(encoder.strings).encode("utf8", "surrogatepass")
+    header = _HEADER.pack(
+        MAGIC, VERSION, ints.itemsize, len(lengths), len(blob), len(ints)
+    )
+    return b"".join((header, lengths.tobytes(), blob, ints.tobytes()))
+
+
+class _Document(object):
+    """The parts of a document decoded by `read`."""
+
+    builder_name: Optional[str]
+    original_encoding: Optional[str]
+    declared_html_encoding: Optional[str]
+    contains_replacement_characters: bool
+    namespaces: Dict[Any, str]
+    #: Rebuilds the tree itself; see `_Decoder.decode_children`.
+    tree: _Decoder
+
+
+def read(data: bytes) -> _Document:
+    """Decode the document-level information in the output of `dumps`.
+    The tree itself is rebuilt later, with `_Document.tree`.
+    """
+    if len(data) < _HEADER.size:
+        raise ValueError("Not an encoded Beautiful Soup tree.")
+    magic, version, int_size, string_count, blob_size, int_count = (
+        _HEADER.unpack_from(data)
+    )
+    if magic != MAGIC:
+        raise ValueError("Not an encoded Beautiful Soup tree.")
+    if version != VERSION:
+        raise ValueError(f"Unsupported encoded tree version: {version}")
+    if int_size not in (2, 4):
+        raise ValueError("Encoded tree is corrupt.")
+
+    pos = _HEADER.size
+    lengths = array(_INT)
+    lengths.frombytes(data[pos : pos + string_count * lengths.itemsize])
+    pos += string_count * lengths.itemsize
+    text = data[pos : pos + blob_size].decode("utf8", "surrogatepass")
+    pos += blob_size
+    ints = array(_SHORT if int_size == 2 else _INT)
+    ints.frombytes(data[pos : pos + int_count * ints.itemsize])
+    if len(lengths) != string_count or len(ints) != int_count:
+        raise ValueError("Encoded tree is truncated.")
+    if sys.byteorder != "little":
+        ints.byteswap()
+        lengths.byteswap()
+
+    strings = []
+    start = 0
+    for length in lengths:
+        strings.append(text[start : start + length])
+        start += length
+
+    decoder = _Decoder(strings, ints.tolist())
+    document = _Document()
+    document.builder_name = decoder.string()
+    document.original_encoding = decoder.string()
+    document.declared_html_encoding = decoder.string()
+    document.contains_replacement_characters = decoder.next() == 1
+    document.namespaces = {}
+    for i in range(decoder.next()):
+        prefix = decoder.string()
+        document.namespaces[prefix] = cast(str, decoder.string())
+    document.tree = decoder
+    return document
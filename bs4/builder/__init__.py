@@ -4,6 +4,7 @@ from __future__ import annotations
 __license__ = "MIT"
 
 from collections import defaultdict
+import importlib
 import re
 from types import ModuleType
 from typing import (
@@ -18,6 +19,7 @@ from typing import (
     Tuple,
     Type,
     TYPE_CHECKING,
+    Union,
 )
 import warnings
 import sys
@@ -87,17 +89,63 @@ __all__ = [
 
 
 
+class _LazyTreeBuilder(object):
+    """Stands in for a TreeBuilder subclass in a `TreeBuilderRegistry`
+    until the module that defines it is imported.
+    """
+
+    module_name: str
+    class_name: str
+    features: List[str]
+
+    def __init__(self, module_name: str, class_name: str, features: Iterable[str]):
+        self.module_name = module_name
+        self.class_name = class_name
+        self.features = list(features)
+
+    def __repr__(self) -> str:
+        return "<lazy %s.%s>" % (self.module_name, self.class_name)
+
+
+_RegisteredTreeBuilder = Union[Type["TreeBuilder"], _LazyTreeBuilder]
+
+
 class TreeBuilderRegistry(object):
     """A way of looking up TreeBuilder subclasses by their name or by desired
     features.
+
+    A TreeBuilder can be registered lazily, by naming its module and
+    listing its features; the module won't be imported until a lookup
+    picks that TreeBuilder. If the import fails (probably because a
+    third-party parser isn't installed) the TreeBuilder is forgotten
+    and the lookup carries on as if it had never been registered.
     """
 
-    builders_for_feature: Dict[str, List[Type[TreeBuilder]]]
-    builders: List[Type[TreeBuilder]]
+    _builders_for_feature: Dict[str, List[_RegisteredTreeBuilder]]
+    _builders: List[_RegisteredTreeBuilder]
 
     def __init__(self) -> None:
-        self.builders_for_feature = defaultdict(list)
-        self.builders = []
+        self._builders_for_feature = defaultdict(list)
+        self._builders = []
+
+    @property
+    def builders(self) -> List[Type[TreeBuilder]]:
+        """Every registered TreeBuilder subclass, most recently
+        registered first.
+
+        This imports the modules of any lazily registered TreeBuilders.
+        """
+        self._resolve_all()
+        return cast(List[Type[TreeBuilder]], self._builders)
+
+    @property
+    def builders_for_feature(self) -> Dict[str, List[Type[TreeBuilder]]]:
+        """The registered TreeBuilder subclasses with each feature.
+
+        This imports the modules of any lazily registered TreeBuilders.
+        """
+        self._resolve_all()
+        return cast(Dict[str, List[Type[TreeBuilder]]], self._builders_for_feature)
 
     def register(self, treebuilder_class: type[TreeBuilder]) -> None:
         """Register a treebuilder based on its advertised features.
@@ -105,9 +153,57 @@ class TreeBuilderRegistry(object):
         :param treebuilder_class: A subclass of `TreeBuilder`. its
            `TreeBuilder.features` attribute should list its features.
         """
-        for feature in treebuilder_class.features:
-            self.builders_for_feature[feature].insert(0, treebuilder_class)
-        self.builders.insert(0, treebuilder_class)
+        self._register(treebuilder_class, treebuilder_class.features)
+
+    def register_lazy(
+        self, module_name: str, class_name: str, features: Iterable[str]
+    ) -> None:
+        """Register a treebuilder without importing the module that
+        defines it.
+
+        :param module_name: The full name of the module that defines
+           the `TreeBuilder` subclass.
+        :param class_name: The name of the subclass within that module.
+        :param features: The subclass's `TreeBuilder.features`.
+        """
+        self._register(_LazyTreeBuilder(module_name, class_name, features), features)
+
+    def _register(
+        self, treebuilder: _RegisteredTreeBuilder, features: Iterable[str]
+    ) -> None:
+        for feature in features:
+            self._builders_for_feature[feature].insert(0, treebuilder)
+        self._builders.insert(0, treebuilder)
+
+    def _resolve(self, placeholder: _LazyTreeBuilder) -> None:
+        """Import the module behind a lazily registered TreeBuilder,
+        and replace every placeholder for that module with the real
+        class--or remove them all, if the module can't be imported.
+        """
+        module: Optional[ModuleType]
+        try:
+            module = importlib.import_module(placeholder.module_name)
+        except ImportError:
+            module = None
+        else:
+            _export_lazy_treebuilders(module)
+        for builders in [self._builders] + list(self._builders_for_feature.values()):
+            for i in range(len(builders) - 1, -1, -1):
+                builder = builders[i]
+                if (
+                    not isinstance(builder, _LazyTreeBuilder)
+                    or builder.module_name != placeholder.module_name
+                ):
+                    continue
+                if module is None:
+                    del builders[i]
+                else:
+                    builders[i] = getattr(module, builder.class_name)
+
+    def _resolve_all(self) -> None:
+        for builder in list(self._builders):
+            if isinstance(builder, _LazyTreeBuilder):
+                self._resolve(builder)
 
     def lookup(self, *features: str) -> Optional[Type[TreeBuilder]]:
         """Look up a TreeBuilder subclass with the desired features.
@@ -118,14 +214,24 @@ class TreeBuilderRegistry(object):
         :return: A TreeBuilder subclass, or None if there's no
             registered subclass with all the requested features.
         """
-        if len(self.builders) == 0:
+        while True:
+            candidate = self._lookup(features)
+            if not isinstance(candidate, _LazyTreeBuilder):
+                return candidate
+            # Import the module and look again. Either the candidate
+            # is now a real class, or it's gone and the next-best
+            # candidate will be found.
+            self._resolve(candidate)
+
+    def _lookup(self, features: Tuple[str, ...]) -> Optional[_RegisteredTreeBuilder]:
+        if len(self._builders) == 0:
             # There are no builders at all.
             return None
 
         if len(features) == 0:
             # They didn't ask for any features. Give them the most
             # recently registered builder.
-            return self.builders[0]
+            return self._builders[0]
 
         # Go down the list of features in order, and eliminate any builders
         # that don't match every feature.
@@ -135,7 +241,7 @@ class TreeBuilderRegistry(object):
         candidate_set = None
         while len(feature_list) > 0:
             feature = feature_list.pop()
-            we_have_the_feature = self.builders_for_feature.get(feature, [])
+            we_have_the_feature = self._builders_for_feature.get(feature, [])
             if len(we_have_the_feature) > 0:
                 if candidates is None:
                     candidates = we_have_the_feature
@@ -224,7 +330,6 @@ class TreeBuilder(object):
         **kwargs: Any
     ):
 
-        self.replacer = kwargs.pop('replacer', None)
         self.soup = None
         if multi_valued_attributes is self.USE_DEFAULT:
             multi_valued_attributes = self.DEFAULT_CDATA_LIST_ATTRIBUTES
@@ -287,6 +392,13 @@ class TreeBuilder(object):
     #: Most parsers don't keep track of line numbers.
     TRACKS_LINE_NUMBERS: bool = False
 
+    #: If this is True, the TreeBuilder implements start_feed(),
+    #: feed_chunk() and finish_feed(), and can build a tree from a
+    #: document that arrives in pieces through
+    #: `bs4.BeautifulSoup.feed`. Otherwise, BeautifulSoup will buffer
+    #: the pieces and pass the whole document into feed() at the end.
+    FEEDS_INCREMENTALLY: bool = False
+
     def initialize_soup(self, soup: BeautifulSoup) -> None:
         """The BeautifulSoup object has been initialized and is now
         being associated with the TreeBuilder.
@@ -330,6 +442,37 @@ class TreeBuilder(object):
         """Run incoming markup through some parsing process."""
         raise NotImplementedError()
 
+    def start_feed(
+        self,
+        user_specified_encoding: Optional[_Encoding] = None,
+        exclude_encodings: Optional[_Encodings] = None,
+    ) -> None:
+        """Get ready to parse a document that will be passed in one
+        chunk at a time through feed_chunk().
+
+        Only called if `TreeBuilder.FEEDS_INCREMENTALLY` is True.
+
+        :param user_specified_encoding: The user asked to try this encoding.
+        :param exclude_encodings: The user asked _not_ to try any of
+            these encodings.
+        """
+        raise NotImplementedError()
+
+    def feed_chunk(self, chunk: _RawMarkup) -> None:
+        """Run one piece of a document through the parser.
+
+        Only called if `TreeBuilder.FEEDS_INCREMENTALLY` is True.
+        """
+        raise NotImplementedError()
+
+    def finish_feed(self) -> None:
+        """Tell the parser there will be no more chunks, so it can
+        process anything it was holding back.
+
+        Only called if `TreeBuilder.FEEDS_INCREMENTALLY` is True.
+        """
+        raise NotImplementedError()
+
     def prepare_markup(
         self,
         markup: _RawMarkup,
@@ -729,6 +872,13 @@ class DetectsXMLParsedAsHTML(object):
     #: The start of an XML document bytestring.
     XML_PREFIX_B: bytes = b"<?xml"
 
+    #: The stacklevel of the warning issued by
+    #: `DetectsXMLParsedAsHTML._root_tag_encountered`. This is right
+    #: for a document passed into the `BeautifulSoup` constructor;
+    #: a document pushed in through `BeautifulSoup.feed` is parsed
+    #: one stack frame closer to the caller.
+    _root_tag_warning_stacklevel: int = 11
+
     # This is typed as str, not `ProcessingInstruction`, because this
     # check may be run before any Beautiful Soup objects are created.
     _first_processing_instruction: Optional[str]  #: :meta private:
@@ -825,7 +975,7 @@ class DetectsXMLParsedAsHTML(object):
             # We encountered an XML declaration and then a tag other
             # than 'html'. This is a reliable indicator that a
             # non-XHTML document is being parsed as XML.
-            self._warn(stacklevel=10)
+            self._warn(stacklevel=self._root_tag_warning_stacklevel)
 
 
 def register_treebuilders_from(module: ModuleType) -> None:
@@ -841,24 +991,83 @@ def register_treebuilders_from(module: ModuleType) -> None:
             this_module.builder_registry.register(obj)
 
 
+#: TreeBuilder subclasses that can be imported from this module, but
+#: whose own modules haven't been imported yet, mapped to the names of
+#: those modules.
+_lazy_treebuilders: Dict[str, str] = {}
+
+
+def register_treebuilders_lazily(
+    module_name: str, treebuilders: Dict[str, Iterable[str]]
+) -> None:
+    """Register TreeBuilders from the given module without importing it.
+
+    The module is imported the first time one of its TreeBuilders is
+    looked up in the registry, or imported from this module. Its
+    TreeBuilders are added to this module's ``__all__`` at that
+    point, so ``from bs4.builder import *`` only picks up the ones
+    that have been imported.
+
+    :param module_name: The full name of a module.
+    :param treebuilders: The names of the module's `TreeBuilder`
+       subclasses, in the order of its ``__all__``, each mapped to its
+       `TreeBuilder.features`.
+    """
+    for name, features in treebuilders.items():
+        _lazy_treebuilders[name] = module_name
+        builder_registry.register_lazy(module_name, name, features)
+
+
+def __getattr__(name: str) -> Any:
+    # Import a lazily registered TreeBuilder the first time someone
+    # asks this module for it.
+    module_name = _lazy_treebuilders.get(name)
+    if module_name is None:
+        raise AttributeError("module %r has no attribute %r" % (__name__, name))
+    try:
+        module = importlib.import_module(module_name)
+    except ImportError as e:
+        raise AttributeError(
+            "%s is not available: %s" % (name, e)
+        ) from e
+    _export_lazy_treebuilders(module)
+    return getattr(module, name)
+
+
+def _export_lazy_treebuilders(module: ModuleType) -> None:
+    """Make the lazily registered TreeBuilders from a module that's
+    just been imported available from this module, the way
+    `register_treebuilders_from` would have.
+    """
+    this_module = sys.modules[__name__]
+    for name, module_name in _lazy_treebuilders.items():
+        if module_name == module.__name__ and name not in this_module.__all__:
+            setattr(this_module, name, getattr(module, name))
+            this_module.__all__.append(name)
+
+
 # Builders are registered in reverse order of priority, so that custom
 # builder registrations will take precedence. In general, we want lxml
 # to take precedence over html5lib, because it's faster. And we only
 # want to use HTMLParser as a last resort.
-from . import _htmlparser # noqa: E402
+#
+# html.parser is in the standard library and the bs4 package needs
+# it anyway, so it's registered right away. The other modules aren't
+# imported until they're needed: importing html5lib or lxml is a
+# large part of the cost of importing Beautiful Soup, and most
+# programs only use one parser. The features listed here must match
+# each class's TreeBuilder.features.
+from . import _htmlparser  # noqa: E402
 
 register_treebuilders_from(_htmlparser)
-try:
-    from . import _html5lib
-
-    register_treebuilders_from(_html5lib)
-except ImportError:
-    # They don't have html5lib installed.
-    pass
-try:
-    from . import _lxml
-
-    register_treebuilders_from(_lxml)
-except ImportError:
-    # They don't have lxml installed.
-    pass
+register_treebuilders_lazily(
+    "bs4.builder._html5lib",
+    {"HTML5TreeBuilder": ["html5lib", PERMISSIVE, HTML_5, HTML]},
+)
+register_treebuilders_lazily(
+    "bs4.builder._lxml",
+    {
+        "LXMLTreeBuilderForXML": ["lxml-xml", "lxml", XML, FAST, PERMISSIVE],
+        "LXMLTreeBuilder": ["lxml-html", "lxml", HTML, FAST, PERMISSIVE],
+    },
+)
@@ -104,12 +104,12 @@ class HTML5TreeBuilder(HTMLTreeBuilder):
             if variable:
                 warnings.warn(
                     f"You provided a value for {name}, but the html5lib tree builder doesn't support {name}.",
-                    stacklevel=3,
+                    stacklevel=4,
                 )
 
         # html5lib only parses HTML, so if it's given XML that's worth
         # noting.
-        DetectsXMLParsedAsHTML.warn_if_markup_looks_like_xml(markup, stacklevel=3)
+        DetectsXMLParsedAsHTML.warn_if_markup_looks_like_xml(markup, stacklevel=4)
 
         yield (markup, None, None, False)
 
@@ -121,7 +121,7 @@ class HTML5TreeBuilder(HTMLTreeBuilder):
         if self.soup is not None and self.soup.parse_only is not None:
             warnings.warn(
                 "You provided a value for parse_only, but the html5lib tree builder doesn't support parse_only. The entire document will be parsed.",
-                stacklevel=4,
+                stacklevel=5,
             )
 
         # self.underlying_builder is probably None now, but it'll be set
@@ -230,11 +230,16 @@ class TreeBuilderForHtml5lib(treebuilder_base.TreeBuilder):
             sourceline, sourcepos = self.parser.tokenizer.stream.position()
             assert sourcepos is not None
             sourcepos = sourcepos - 1
+        new_name = name
+        if self.soup.replacer is not None:
+            new_name = self.soup.replacer.rename(name)
         tag = self.soup.new_tag(
-            name, namespace, sourceline=sourceline, sourcepos=sourcepos
+            new_name, namespace, sourceline=sourceline, sourcepos=sourcepos
         )
 
-        return Element(tag, self.soup, namespace)
+        # html5lib goes on using the original name, so a renamed tag
+        # still gets the treatment the HTML spec gives the original.
+        return Element(tag, self.soup, namespace, name)
 
     def commentClass(self, data: str) -> "TextNode":
         return TextNode(Comment(data), self.soup)
@@ -346,9 +351,15 @@ class Element(BeautifulSoupNode):
     namespace: Optional[_NamespaceURL]
 
     def __init__(
-        self, element: Tag, soup: "BeautifulSoup", namespace: Optional[_NamespaceURL]
+        self,
+        element: Tag,
+        soup: "BeautifulSoup",
+        namespace: Optional[_NamespaceURL],
+        name: Optional[str] = None,
     ):
-        treebuilder_base.Node.__init__(self, element.name)
+        # ``name`` is the name html5lib knows the element by. It's
+        # different from the Tag's name if a SoupReplacer renamed it.
+        treebuilder_base.Node.__init__(self, name or element.name)
         self.element = element
         self.soup = soup
         self.namespace = namespace
@@ -558,6 +569,11 @@ class Element(BeautifulSoupNode):
         element.contents = []
         element.next_element = final_next_element
 
+        # We moved the children around without going through
+        # Tag.insert(), so any tag index is now out of date.
+        if self.soup._index is not None:
+            self.soup._index.invalidate()
+
         # print("DONE WITH MOVE")
         # print("FROM", self.element)
         # print("TO", new_parent_element)
@@ -571,7 +587,7 @@ class Element(BeautifulSoupNode):
     # cloneNode returns a new Node, not None.
     def cloneNode(self) -> treebuilder_base.Node:
         tag = self.soup.new_tag(self.element.name, self.namespace)
-        node = Element(tag, self.soup, self.namespace)
+        node = Element(tag, self.soup, self.namespace, self.name)
         for key, value in self.attributes:
             node.attributes[key] = value
         return node
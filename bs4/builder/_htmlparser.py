@@ -9,12 +9,14 @@ __all__ = [
     "HTMLParserTreeBuilder",
 ]
 
+from collections import Counter
 from html.parser import HTMLParser
 
 from typing import (
     Any,
     Callable,
     cast,
+    Counter as CounterType,
     Dict,
     Iterable,
     List,
@@ -33,7 +35,7 @@ from bs4.element import (
     Doctype,
     ProcessingInstruction,
 )
-from bs4.dammit import EntitySubstitution, UnicodeDammit
+from bs4.dammit import EntitySubstitution, IncrementalUnicodeDammit, UnicodeDammit
 
 from bs4.builder import (
     DetectsXMLParsedAsHTML,
@@ -98,14 +100,16 @@ class BeautifulSoupHTMLParser(HTMLParser, DetectsXMLParsedAsHTML):
         # of this type, we'll associate it with one of those entries.
         #
         # This isn't a stack because we don't care about the
-        # order. It's a list of closing tags we've already handled and
-        # will ignore, assuming they ever show up.
-        self.already_closed_empty_element = []
+        # order. It's a count of closing tags we've already handled and
+        # will ignore, assuming they ever show up. (A list would make
+        # every end tag cost time proportional to the number of
+        # empty-element tags seen so far.)
+        self.already_closed_empty_element = Counter()
 
         self._initialize_xml_detector()
 
     on_duplicate_attribute: Union[str, _DuplicateAttributeHandler]
-    already_closed_empty_element: List[str]
+    already_closed_empty_element: CounterType[str]
     soup: BeautifulSoup
 
     def error(self, message: str) -> None:
@@ -173,22 +177,12 @@ class BeautifulSoupHTMLParser(HTMLParser, DetectsXMLParsedAsHTML):
             sourceline, sourcepos = self.getpos()
         else:
             sourceline = sourcepos = None
-        if self.soup.replacer and self.soup.replacer.name_xformer:
-            new_name = self.soup.replacer.name_xformer(name)
-            # this para is a function: self.soup.replacer.name_xformer(name).
-            # To accept the parameter that instruct the replacement by specific rules.
-            if new_name is not None:
-                name = new_name
-        
         tag = self.soup.handle_starttag(
             name, None, None, attr_dict, sourceline=sourceline, sourcepos=sourcepos
         )
-        replacer = getattr(self.soup, "replacer", None)
-        if replacer:
-            replacer.replace(tag)
         if tag and tag.is_empty_element and handle_empty_element:
             self.handle_endtag(name, check_already_closed=False)
-            self.already_closed_empty_element.append(name)
+            self.already_closed_empty_element[name] += 1
 
         if self._root_tag_name is None:
             self._root_tag_encountered(name)
@@ -197,13 +191,8 @@ class BeautifulSoupHTMLParser(HTMLParser, DetectsXMLParsedAsHTML):
     def handle_endtag(self, name: str, check_already_closed: bool = True) -> None:
         # Handle a closing tag, e.g. '</tag>'
 
-        if self.soup.replacer and self.soup.replacer.name_xformer:
-            new_name = self.soup.replacer.name_xformer(name)
-            if new_name is not None:
-                name = new_name
-        if check_already_closed and name in self.already_closed_empty_element:
-            self.already_closed_empty_element.remove(name)
-        
+        if check_already_closed and self.already_closed_empty_element.get(name):
+            self.already_closed_empty_element[name] -= 1
         else:
             self.soup.handle_endtag(name)
 
@@ -333,6 +322,21 @@ class HTMLParserTreeBuilder(HTMLTreeBuilder):
     #: original file is the source of an element.
     TRACKS_LINE_NUMBERS: bool = True
 
+    #: html.parser can be fed a document a little at a time.
+    FEEDS_INCREMENTALLY: bool = True
+
+    # These are only used while a document is being fed in
+    # through feed_chunk().
+    _parser: Optional[BeautifulSoupHTMLParser]
+    _decoder: Optional[IncrementalUnicodeDammit]
+    _feeding_bytes: Optional[bool]
+
+    # A parser that has finished with a document, and can be reset
+    # and used for the next one instead of creating a new one.
+    _idle_parser: Optional[BeautifulSoupHTMLParser]
+    _known_definite_encodings: List[_Encoding]
+    _exclude_encodings: Optional[_Encodings]
+
     def __init__(
         self,
         parser_args: Optional[Iterable[Any]] = None,
@@ -367,6 +371,17 @@ class HTMLParserTreeBuilder(HTMLTreeBuilder):
         parser_kwargs.update(extra_parser_kwargs)
         parser_kwargs["convert_charrefs"] = False
         self.parser_args = (parser_args, parser_kwargs)
+        self._parser = None
+        self._decoder = None
+        self._feeding_bytes = None
+        self._idle_parser = None
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # An idle parser refers to the last document parsed, which
+        # may not be the document being pickled.
+        d = dict(self.__dict__)
+        d["_idle_parser"] = None
+        return d
 
     def prepare_markup(
         self,
@@ -440,8 +455,27 @@ class HTMLParserTreeBuilder(HTMLTreeBuilder):
                 dammit.contains_replacement_characters,
             )
 
-    def feed(self, markup: _RawMarkup) -> None:
+    def _new_parser(self) -> BeautifulSoupHTMLParser:
+        """Create a BeautifulSoupHTMLParser that will send events to
+        the BeautifulSoup object associated with this TreeBuilder.
+        """
         args, kwargs = self.parser_args
+        # We know BeautifulSoup calls TreeBuilder.initialize_soup
+        # before calling feed(), so we can assume self.soup
+        # is set.
+        assert self.soup is not None
+        parser = self._idle_parser
+        if parser is None:
+            return BeautifulSoupHTMLParser(self.soup, *args, **kwargs)
+
+        # Resetting a parser is cheaper than creating one, which
+        # matters when one TreeBuilder parses lots of small documents.
+        # feed() reset the parser when it put it aside.
+        self._idle_parser = None
+        parser.soup = self.soup
+        return parser
+
+    def feed(self, markup: _RawMarkup) -> None:
 
         # HTMLParser.feed will only handle str, but
         # BeautifulSoup.markup is allowed to be _RawMarkup, because
@@ -450,12 +484,10 @@ class HTMLParserTreeBuilder(HTMLTreeBuilder):
         # HTMLParserTreeBuilder.prepare_markup always yields a str
         # (UnicodeDammit.unicode_markup).
         assert isinstance(markup, str)
-
-        # We know BeautifulSoup calls TreeBuilder.initialize_soup
-        # before calling feed(), so we can assume self.soup
-        # is set.
-        assert self.soup is not None
-        parser = BeautifulSoupHTMLParser(self.soup, *args, **kwargs)
+        parser = self._new_parser()
+        parser._root_tag_warning_stacklevel = (
+            DetectsXMLParsedAsHTML._root_tag_warning_stacklevel
+        )
 
         try:
             parser.feed(markup)
@@ -465,4 +497,98 @@ class HTMLParserTreeBuilder(HTMLTreeBuilder):
             # indicate a fatal problem with the markup, especially
             # when there's an error in the doctype declaration.
             raise ParserRejectedMarkup(e)
-        parser.already_closed_empty_element = []
+
+        # Don't let the idle parser keep the document we just parsed
+        # alive.
+        parser.soup = None  # type: ignore[assignment]
+        parser.reset()
+        parser.already_closed_empty_element.clear()
+        parser._initialize_xml_detector()
+        self._idle_parser = parser
+
+    def start_feed(
+        self,
+        user_specified_encoding: Optional[_Encoding] = None,
+        exclude_encodings: Optional[_Encodings] = None,
+    ) -> None:
+        """See `TreeBuilder`."""
+        self._parser = self._new_parser()
+        self._parser._root_tag_warning_stacklevel = (
+            DetectsXMLParsedAsHTML._root_tag_warning_stacklevel - 1
+        )
+        self._decoder = None
+        self._feeding_bytes = None
+        self._known_definite_encodings = []
+        if user_specified_encoding:
+            self._known_definite_encodings.append(user_specified_encoding)
+        self._exclude_encodings = exclude_encodings
+
+    def feed_chunk(self, chunk: _RawMarkup) -> None:
+        """See `TreeBuilder`.
+
+        html.parser only handles Unicode, so bytestring chunks are
+        decoded as they arrive, by an `IncrementalUnicodeDammit`. The
+        encoding is chosen once the first kilobyte or so has arrived,
+        using any user-specified encoding, a byte-order mark, or an
+        encoding declared in the document, in that order.
+        """
+        assert self._parser is not None
+        is_bytes = isinstance(chunk, bytes)
+        if self._feeding_bytes is None:
+            # The first chunk decides whether this is a document of
+            # strings or of bytestrings.
+            self._feeding_bytes = is_bytes
+        elif is_bytes != self._feeding_bytes:
+            raise TypeError(
+                "Can't mix strings and bytestrings when feeding a document in chunks."
+            )
+        if isinstance(chunk, bytes):
+            if self._decoder is None:
+                self._decoder = IncrementalUnicodeDammit(
+                    known_definite_encodings=self._known_definite_encodings,
+                    is_html=True,
+                    exclude_encodings=self._exclude_encodings,
+                )
+            chunk = self._decode(chunk, False)
+        self._parser_feed(chunk)
+
+    def _decode(self, chunk: bytes, final: bool) -> str:
+        """Decode a bytestring chunk, and tell the BeautifulSoup object
+        about the encoding once it's been chosen.
+        """
+        assert self._decoder is not None
+        assert self.soup is not None
+        try:
+            text = self._decoder.decode(chunk, final)
+        except UnicodeError as e:
+            raise ParserRejectedMarkup(e)
+        if self._decoder.original_encoding is not None:
+            self.soup.original_encoding = self._decoder.original_encoding
+            self.soup.declared_html_encoding = self._decoder.declared_html_encoding
+            self.soup.contains_replacement_characters = (
+                self._decoder.contains_replacement_characters
+            )
+        return text
+
+    def _parser_feed(self, markup: str) -> None:
+        assert self._parser is not None
+        try:
+            self._parser.feed(markup)
+        except AssertionError as e:
+            # See feed() for why this can happen.
+            raise ParserRejectedMarkup(e)
+
+    def finish_feed(self) -> None:
+        """See `TreeBuilder`."""
+        if self._parser is None:
+            return
+        if self._decoder is not None:
+            self._parser_feed(self._decode(b"", True))
+        try:
+            self._parser.close()
+        except AssertionError as e:
+            raise ParserRejectedMarkup(e)
+        self._parser.already_closed_empty_element.clear()
+        self._parser = None
+        self._decoder = None
+        self._feeding_bytes = None
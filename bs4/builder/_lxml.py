@@ -24,8 +24,6 @@ from typing import (
 )
 from typing_extensions import TypeAlias
 
-from io import BytesIO
-from io import StringIO
 from lxml import etree
 from bs4.element import (
     AttributeDict,
@@ -89,6 +87,10 @@ class LXMLTreeBuilderForXML(TreeBuilder):
 
     CHUNK_SIZE: int = 512
 
+    #: lxml's feed parser interface can be given a document a little
+    #: at a time.
+    FEEDS_INCREMENTALLY: bool = True
+
     # This namespace mapping is specified in the XML Namespace
     # standard.
     DEFAULT_NSMAPS: _NamespaceMapping = dict(xml="http://www.w3.org/XML/1998/namespace")
@@ -99,6 +101,7 @@ class LXMLTreeBuilderForXML(TreeBuilder):
     empty_element_tags: Set[str]
     parser: Any
     _default_parser: Optional[etree.XMLParser]
+    _feed_started: bool
 
     # NOTE: If we parsed Element objects and looked at .sourceline,
     # we'd be able to see the line numbers from the original document.
@@ -200,7 +203,9 @@ class LXMLTreeBuilderForXML(TreeBuilder):
         document_declared_encoding: Optional[_Encoding] = None,
         exclude_encodings: Optional[_Encodings] = None,
     ) -> Iterable[
-        Tuple[Union[str, bytes], Optional[_Encoding], Optional[_Encoding], bool]
+        Tuple[
+            Union[str, bytes, memoryview], Optional[_Encoding], Optional[_Encoding], bool
+        ]
     ]:
         """Run any preliminary steps necessary to make incoming markup
         acceptable to the parser.
@@ -231,7 +236,7 @@ class LXMLTreeBuilderForXML(TreeBuilder):
             self.processing_instruction_class = ProcessingInstruction
             # We're in HTML mode, so if we're given XML, that's worth
             # noting.
-            DetectsXMLParsedAsHTML.warn_if_markup_looks_like_xml(markup, stacklevel=3)
+            DetectsXMLParsedAsHTML.warn_if_markup_looks_like_xml(markup, stacklevel=4)
         else:
             self.processing_instruction_class = XMLProcessingInstruction
 
@@ -277,31 +282,74 @@ class LXMLTreeBuilderForXML(TreeBuilder):
             is_html=is_html,
             exclude_encodings=exclude_encodings,
         )
+        # The XML parser is fed the markup in chunks (see feed()), so it
+        # can be given a view of the markup that leaves out the
+        # byte-order mark, instead of a copy of the whole document.
+        markup_for_parser = detector.markup_buffer if self.is_xml else detector.markup
         for encoding in detector.encodings:
-            yield (detector.markup, encoding, document_declared_encoding, False)
-
-    def feed(self, markup: _RawMarkup) -> None:
-        io: Union[BytesIO, StringIO]
-        if isinstance(markup, bytes):
-            io = BytesIO(markup)
-        elif isinstance(markup, str):
-            io = StringIO(markup)
+            yield (markup_for_parser, encoding, document_declared_encoding, False)
 
+    def feed(self, markup: Union[_RawMarkup, memoryview]) -> None:
         # initialize_soup is called before feed, so we know this
         # is not None.
         assert self.soup is not None
 
-        # Call feed() at least once, even if the markup is empty,
-        # or the parser won't be initialized.
-        data = io.read(self.CHUNK_SIZE)
         try:
             self.parser = self.parser_for(self.soup.original_encoding)
-            self.parser.feed(data)
-            while len(data) != 0:
-                # Now call feed() on the rest of the data, chunk by chunk.
-                data = io.read(self.CHUNK_SIZE)
-                if len(data) != 0:
-                    self.parser.feed(data)
+            # Call feed() at least once, even if the markup is empty,
+            # or the parser won't be initialized. Then call feed() on
+            # the rest of the data, chunk by chunk.
+            for start in range(0, max(len(markup), 1), self.CHUNK_SIZE):
+                data = markup[start : start + self.CHUNK_SIZE]
+                if isinstance(data, memoryview):
+                    data = data.tobytes()
+                self.parser.feed(data)
+            self.parser.close()
+        except (UnicodeDecodeError, LookupError, etree.ParserError) as e:
+            raise ParserRejectedMarkup(e)
+
+    def start_feed(
+        self,
+        user_specified_encoding: Optional[_Encoding] = None,
+        exclude_encodings: Optional[_Encodings] = None,
+    ) -> None:
+        """See `TreeBuilder`.
+
+        lxml detects the encoding of bytestring chunks itself, so
+        exclude_encodings is ignored.
+        """
+        assert self.soup is not None
+        if self.is_xml:
+            self.processing_instruction_class = XMLProcessingInstruction
+        else:
+            self.processing_instruction_class = ProcessingInstruction
+        self.soup.original_encoding = user_specified_encoding
+        self._feed_started = False
+        try:
+            self.parser = self.parser_for(user_specified_encoding)
+        except LookupError as e:
+            raise ParserRejectedMarkup(e)
+
+    def feed_chunk(self, chunk: _RawMarkup) -> None:
+        """See `TreeBuilder`."""
+        if not self._feed_started:
+            # See prepare_markup() for why a byte-order mark has to be
+            # stripped from Unicode markup.
+            if isinstance(chunk, str) and chunk[:1] == "\N{BYTE ORDER MARK}":
+                chunk = chunk[1:]
+            self._feed_started = len(chunk) > 0
+        try:
+            self.parser.feed(chunk)
+        except (UnicodeDecodeError, LookupError, etree.ParserError) as e:
+            raise ParserRejectedMarkup(e)
+
+    def finish_feed(self) -> None:
+        """See `TreeBuilder`."""
+        try:
+            if not self._feed_started:
+                # The parser won't be initialized unless feed() is
+                # called at least once.
+                self.parser.feed("")
             self.parser.close()
         except (UnicodeDecodeError, LookupError, etree.ParserError) as e:
             raise ParserRejectedMarkup(e)
@@ -18,8 +18,10 @@ from types import ModuleType
 from typing import (
     Any,
     cast,
+    Dict,
     Iterable,
     Iterator,
+    List,
     Optional,
     TYPE_CHECKING,
 )
@@ -88,6 +90,27 @@ class CSS(object):
             ns = self.tag._namespaces
         return ns
 
+    def _indexed_select(
+        self,
+        select: str,
+        namespaces: Optional[_NamespaceMapping],
+        limit: int,
+        flags: int,
+        kwargs: Dict[str, Any],
+    ) -> Optional[List[element.Tag]]:
+        """Answer a simple ``#id`` or ``.class`` selector from the
+        document's `TreeIndex`, if it has one.
+
+        :return: A list of results, or None if Soup Sieve needs to
+            do the work.
+        """
+        if namespaces or flags or kwargs or self.api is not soupsieve:
+            return None
+        index = self.tag._tree_index()
+        if index is None:
+            return None
+        return index.select(self.tag, select, limit)
+
     def _rs(self, results: Iterable[Tag]) -> ResultSet[Tag]:
         """Normalize a list of results to a py:class:`ResultSet`.
 
@@ -154,6 +177,9 @@ class CSS(object):
         :param kwargs: Keyword arguments to be passed into Soup Sieve's
            `soupsieve.select_one() <https://facelessuser.github.io/soupsieve/api/#soupsieveselect_one>`_ method.
         """
+        found = self._indexed_select(select, namespaces, 1, flags, kwargs)
+        if found is not None:
+            return found[0] if found else None
         return self.api.select_one(
             select, self.tag, self._ns(namespaces, select), flags, **kwargs
         )
@@ -189,6 +215,10 @@ class CSS(object):
         if limit is None:
             limit = 0
 
+        found = self._indexed_select(select, namespaces, limit, flags, kwargs)
+        if found is not None:
+            return self._rs(found)
+
         return self._rs(
             self.api.select(
                 select, self.tag, self._ns(namespaces, select), limit, flags, **kwargs
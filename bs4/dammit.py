@@ -20,7 +20,9 @@ import re
 from logging import Logger, getLogger
 from types import ModuleType
 from typing import (
+    Any,
     Dict,
+    Iterable,
     Iterator,
     List,
     Optional,
@@ -94,27 +96,95 @@ encoding_res[str] = {
     "xml": re.compile(xml_encoding, re.I),
 }
 
+# Regular expressions for the HTML5 "prescan a byte stream to determine
+# its encoding" algorithm. See EncodingDetector.prescan.
+_PRESCAN_SPACE = b"\t\n\x0c\r "
+_prescan_tag_end = re.compile(b"[\t\n\x0c\r /]*>")
+_prescan_attribute = re.compile(
+    b"[\t\n\x0c\r /]*"
+    # The name. Its first character may be an equals sign.
+    b"([^\t\n\x0c\r />][^\t\n\x0c\r /=>]*)"
+    b"(?:[\t\n\x0c\r ]*=[\t\n\x0c\r ]*"
+    # The value, which may be quoted. An unquoted value is ended by a
+    # slash as well as by whitespace, so that <meta charset=utf-8/>
+    # works.
+    b"(?:\"([^\"]*)(\"?)|'([^']*)('?)|([^\t\n\x0c\r />]*)))?"
+)
+_prescan_content_charset = re.compile(
+    b"charset[\t\n\x0c\r ]*=[\t\n\x0c\r ]*"
+    b"(?:\"([^\"]*)\"|'([^']*)'|([^\t\n\x0c\r ;]+))",
+    re.I,
+)
+
+
+# Bytes that are Microsoft smart quotes (and similar characters) in
+# encodings like Windows-1252.
+_smart_quotes_re: Pattern = re.compile(b"([\x80-\x9f])")
+
+
+class _LazyClassVariable(object):
+    """A class variable that isn't calculated until it's first used.
+
+    The first time the variable is looked up, the named classmethod is
+    called on the class that defines the variable, even if it's looked
+    up through a subclass. That method must set the variable on the
+    class, replacing this object, so the cost is only paid once.
+    """
+
+    name: str
+    owner: type
+
+    def __init__(self, populate: str):
+        self.populate = populate
+
+    def __set_name__(self, owner: type, name: str) -> None:
+        self.owner = owner
+        self.name = name
+
+    def __get__(self, instance: Any, owner: type) -> Any:
+        getattr(self.owner, self.populate)()
+        return getattr(self.owner, self.name)
+
 
 class EntitySubstitution(object):
-    """The ability to substitute XML or HTML entities for certain characters."""
+    """The ability to substitute XML or HTML entities for certain characters.
+
+    The tables of HTML entities are big, and so are the regular
+    expressions that find characters to replace with entities, so
+    they're built the first time they're used rather than when this
+    module is imported. A program that never outputs HTML entities
+    never builds the regular expressions.
+    """
 
     #: A map of named HTML entities to the corresponding Unicode string.
     #:
     #: :meta hide-value:
-    HTML_ENTITY_TO_CHARACTER: Dict[str, str]
+    HTML_ENTITY_TO_CHARACTER: Dict[str, str] = _LazyClassVariable(  # type: ignore[assignment]
+        "_populate_class_variables"
+    )
 
     #: A map of Unicode strings to the corresponding named HTML entities;
     #: the inverse of HTML_ENTITY_TO_CHARACTER.
     #:
     #: :meta hide-value:
-    CHARACTER_TO_HTML_ENTITY: Dict[str, str]
+    CHARACTER_TO_HTML_ENTITY: Dict[str, str] = _LazyClassVariable(  # type: ignore[assignment]
+        "_populate_class_variables"
+    )
+
+    # The definitions of CHARACTER_TO_HTML_ENTITY_RE and
+    # CHARACTER_TO_HTML_ENTITY_WITH_AMPERSAND_RE.
+    _CHARACTER_TO_HTML_ENTITY_RE_DEFINITIONS: Tuple[str, str] = _LazyClassVariable(  # type: ignore[assignment]
+        "_populate_class_variables"
+    )
 
     #: A regular expression that matches any character (or, in rare
     #: cases, pair of characters) that can be replaced with a named
     #: HTML entity.
     #:
     #: :meta hide-value:
-    CHARACTER_TO_HTML_ENTITY_RE: Pattern[str]
+    CHARACTER_TO_HTML_ENTITY_RE: Pattern[str] = _LazyClassVariable(  # type: ignore[assignment]
+        "_compile_regular_expressions"
+    )
 
     #: A very similar regular expression to
     #: CHARACTER_TO_HTML_ENTITY_RE, but which also matches unescaped
@@ -123,7 +193,9 @@ class EntitySubstitution(object):
     #: ampersands to go unescaped.
     #:
     #: :meta hide-value:
-    CHARACTER_TO_HTML_ENTITY_WITH_AMPERSAND_RE: Pattern[str]
+    CHARACTER_TO_HTML_ENTITY_WITH_AMPERSAND_RE: Pattern[str] = _LazyClassVariable(  # type: ignore[assignment]
+        "_compile_regular_expressions"
+    )
 
     @classmethod
     def _populate_class_variables(cls) -> None:
@@ -140,14 +212,10 @@ class EntitySubstitution(object):
         HTML_ENTITY_TO_CHARACTER: A mapping of entity names like "angmsdaa" to
         Unicode strings like "⦨".
 
-        CHARACTER_TO_HTML_ENTITY_RE: A regular expression matching (almost) any
-        Unicode string that corresponds to an HTML5 named entity.
+        _CHARACTER_TO_HTML_ENTITY_RE_DEFINITIONS: The definitions of
+        the regular expressions set by `_compile_regular_expressions`.
 
-        CHARACTER_TO_HTML_ENTITY_WITH_AMPERSAND_RE: A very similar
-        regular expression to CHARACTER_TO_HTML_ENTITY_RE, but which
-        also matches unescaped ampersands. This is used by the 'html'
-        formatted to provide backwards-compatibility, even though the HTML5
-        spec allows most ampersands to go unescaped.
+        This is called the first time one of those variables is used.
         """
         unicode_to_name = {}
         name_to_unicode = {}
@@ -220,11 +288,17 @@ class EntitySubstitution(object):
 
         # Now that we've been through the entire list of entities, we
         # can create a regular expression that matches any of them.
+        #
+        # Most entities are single characters that aren't the start
+        # of any longer entity. They go into a single character
+        # class, which compiles much faster than an alternation with
+        # a branch for each character.
         particles = set()
+        single_characters = []
         for short in short_entities:
             long_versions = long_entities_by_first_character[short]
             if not long_versions:
-                particles.add(short)
+                single_characters.append(short)
             else:
                 ignore = "".join([x[1] for x in long_versions])
                 # This finds, e.g. \u2267 but only if it is _not_
@@ -235,10 +309,15 @@ class EntitySubstitution(object):
             for long_entity in long_entities:
                 particles.add(long_entity)
 
-        re_definition = "(%s)" % "|".join(particles)
+        character_class = "[%s]" % "".join(
+            re.escape(x) for x in sorted(single_characters)
+        )
+        re_definition = "(%s)" % "|".join(list(particles) + [character_class])
 
         particles.add("&")
-        re_definition_with_ampersand = "(%s)" % "|".join(particles)
+        re_definition_with_ampersand = "(%s)" % "|".join(
+            list(particles) + [character_class]
+        )
 
         # If an entity shows up in both html5 and codepoint2name, it's
         # likely that HTML5 gives it several different names, such as
@@ -252,6 +331,21 @@ class EntitySubstitution(object):
 
         cls.CHARACTER_TO_HTML_ENTITY = unicode_to_name
         cls.HTML_ENTITY_TO_CHARACTER = name_to_unicode
+        cls._CHARACTER_TO_HTML_ENTITY_RE_DEFINITIONS = (
+            re_definition,
+            re_definition_with_ampersand,
+        )
+
+    @classmethod
+    def _compile_regular_expressions(cls) -> None:
+        """Set the class variables CHARACTER_TO_HTML_ENTITY_RE and
+        CHARACTER_TO_HTML_ENTITY_WITH_AMPERSAND_RE.
+
+        This is called the first time one of those variables is used.
+        """
+        re_definition, re_definition_with_ampersand = (
+            cls._CHARACTER_TO_HTML_ENTITY_RE_DEFINITIONS
+        )
         cls.CHARACTER_TO_HTML_ENTITY_RE = re.compile(re_definition)
         cls.CHARACTER_TO_HTML_ENTITY_WITH_AMPERSAND_RE = re.compile(
             re_definition_with_ampersand
@@ -479,9 +573,6 @@ class EntitySubstitution(object):
         return s
 
 
-EntitySubstitution._populate_class_variables()
-
-
 class EncodingDetector:
     """This class is capable of guessing a number of possible encodings
     for a bytestring.
@@ -497,13 +588,15 @@ class EncodingDetector:
        byte-order mark sniffing fails (the ``user_encodings`` argument to the
        constructor).
 
-    4. An encoding declared within the bytestring itself, either in an
-       XML declaration (if the bytestring is to be interpreted as an XML
-       document), or in a <meta> tag (if the bytestring is to be
+    4. An encoding declared near the start of the bytestring itself,
+       either in an XML declaration (if the bytestring is to be
+       interpreted as an XML document), or in a <meta> tag found the
+       way a web browser would find it (if the bytestring is to be
        interpreted as an HTML document.)
 
-    5. An encoding detected through textual analysis by chardet,
-       cchardet, or a similar external library.
+    5. An encoding detected through textual analysis, of the start of
+       the bytestring, by chardet, cchardet, or a similar external
+       library.
 
     6. UTF-8.
 
@@ -535,8 +628,17 @@ class EncodingDetector:
     :param exclude_encodings: These encodings will not be tried,
         even if they otherwise would be.
 
+    :param sniff_bytes: Only look at this many bytes at the start of
+        the markup when looking for a declared encoding or running
+        chardet. Defaults to `EncodingDetector.DEFAULT_SNIFF_BYTES`;
+        pass in 0 to look at the entire document.
+
     """
 
+    #: How much of a document is looked at, by default, when looking
+    #: for a declared encoding or running chardet.
+    DEFAULT_SNIFF_BYTES: int = 64 * 1024
+
     def __init__(
         self,
         markup: bytes,
@@ -545,6 +647,7 @@ class EncodingDetector:
         exclude_encodings: Optional[_Encodings] = None,
         user_encodings: Optional[_Encodings] = None,
         override_encodings: Optional[_Encodings] = None,
+        sniff_bytes: Optional[int] = None,
     ):
         self.known_definite_encodings = list(known_definite_encodings or [])
         if override_encodings:
@@ -560,9 +663,30 @@ class EncodingDetector:
         self.chardet_encoding = None
         self.is_html = False if is_html is None else is_html
         self.declared_encoding: Optional[str] = None
-
-        # First order of business: strip a byte-order mark.
-        self.markup, self.sniffed_encoding = self.strip_byte_order_mark(markup)
+        if sniff_bytes is None:
+            sniff_bytes = self.DEFAULT_SNIFF_BYTES
+        self.sniff_bytes = sniff_bytes
+        self.strategy = None
+
+        # First order of business: look for a byte-order mark. Taking
+        # it off means copying the markup, which is put off until
+        # someone needs the copy.
+        self.raw_markup = markup
+        self.byte_order_mark_length, self.sniffed_encoding = self._byte_order_mark(
+            markup
+        )
+        self._markup = None
+
+    #: The strategies that `EncodingDetector.encodings` uses, in order.
+    #: `EncodingDetector.strategy` is set to one of these.
+    STRATEGIES: Tuple[str, ...] = (
+        "known_definite",
+        "byte_order_mark",
+        "user",
+        "declared",
+        "chardet",
+        "fallback",
+    )
 
     known_definite_encodings: _Encodings
     user_encodings: _Encodings
@@ -570,8 +694,55 @@ class EncodingDetector:
     chardet_encoding: Optional[_Encoding]
     is_html: bool
     declared_encoding: Optional[_Encoding]
-    markup: bytes
     sniffed_encoding: Optional[_Encoding]
+    sniff_bytes: int
+
+    #: The markup that was passed into the constructor.
+    raw_markup: bytes
+
+    #: The length of the byte-order mark at the start of
+    #: `EncodingDetector.raw_markup`, or 0 if there isn't one.
+    byte_order_mark_length: int
+
+    _markup: Optional[bytes]
+
+    @property
+    def markup(self) -> bytes:
+        """The markup, with any byte-order mark stripped.
+
+        If there's a byte-order mark, this is a copy of the markup;
+        use `EncodingDetector.markup_buffer` to avoid making one.
+        """
+        if self._markup is None:
+            if self.byte_order_mark_length:
+                self._markup = self.raw_markup[self.byte_order_mark_length :]
+            else:
+                self._markup = self.raw_markup
+        return self._markup
+
+    @property
+    def markup_buffer(self) -> Union[bytes, memoryview]:
+        """The markup, with any byte-order mark stripped, without
+        copying it: either the original markup or a `memoryview` of it.
+        """
+        if self._markup is not None or not self.byte_order_mark_length:
+            return self.markup
+        return memoryview(self.raw_markup)[self.byte_order_mark_length :]
+
+    #: The strategy that came up with the encoding most recently
+    #: yielded by `EncodingDetector.encodings`: one of
+    #: `EncodingDetector.STRATEGIES`.
+    strategy: Optional[str]
+
+    @property
+    def sniffed_markup(self) -> bytes:
+        """The part of the markup that's looked at when looking for a
+        declared encoding or running chardet.
+        """
+        start = self.byte_order_mark_length
+        if self.sniff_bytes > 0 and len(self.raw_markup) - start > self.sniff_bytes:
+            return self.raw_markup[start : start + self.sniff_bytes]
+        return self.markup
 
     def _usable(self, encoding: Optional[_Encoding], tried: Set[_Encoding]) -> bool:
         """Should we even bother to try this encoding?
@@ -600,12 +771,14 @@ class EncodingDetector:
         tried: Set[_Encoding] = set()
 
         # First, try the known definite encodings
+        self.strategy = "known_definite"
         for e in self.known_definite_encodings:
             if self._usable(e, tried):
                 yield e
 
         # Did the document originally start with a byte-order mark
         # that indicated its encoding?
+        self.strategy = "byte_order_mark"
         if self.sniffed_encoding is not None and self._usable(
             self.sniffed_encoding, tried
         ):
@@ -613,16 +786,16 @@ class EncodingDetector:
 
         # Sniffing the byte-order mark did nothing; try the user
         # encodings.
+        self.strategy = "user"
         for e in self.user_encodings:
             if self._usable(e, tried):
                 yield e
 
-        # Look within the document for an XML or HTML encoding
-        # declaration.
+        # Look within the start of the document for an XML or HTML
+        # encoding declaration.
+        self.strategy = "declared"
         if self.declared_encoding is None:
-            self.declared_encoding = self.find_declared_encoding(
-                self.markup, self.is_html
-            )
+            self.declared_encoding = self._find_declared_encoding()
         if self.declared_encoding is not None and self._usable(
             self.declared_encoding, tried
         ):
@@ -630,18 +803,34 @@ class EncodingDetector:
 
         # Use third-party character set detection to guess at the
         # encoding.
+        self.strategy = "chardet"
         if self.chardet_encoding is None:
-            self.chardet_encoding = _chardet_dammit(self.markup)
+            self.chardet_encoding = _chardet_dammit(self.sniffed_markup)
         if self.chardet_encoding is not None and self._usable(
             self.chardet_encoding, tried
         ):
             yield self.chardet_encoding
 
         # As a last-ditch effort, try utf-8 and windows-1252.
+        self.strategy = "fallback"
         for e in ("utf-8", "windows-1252"):
             if self._usable(e, tried):
                 yield e
 
+    def _find_declared_encoding(self) -> Optional[_Encoding]:
+        """Look for an encoding declaration in the sniffed part of the
+        markup.
+        """
+        markup = self.sniffed_markup
+        if self.is_html and isinstance(markup, bytes):
+            xml_match = encoding_res[bytes]["xml"].search(markup, endpos=1024)
+            if xml_match is not None:
+                return self.find_declared_encoding(markup)
+            return self.prescan(markup)
+        return self.find_declared_encoding(
+            markup, self.is_html, search_entire_document=True
+        )
+
     @classmethod
     def strip_byte_order_mark(cls, data: bytes) -> Tuple[bytes, Optional[_Encoding]]:
         """If a byte-order mark is present, strip it and return the encoding it implies.
@@ -651,34 +840,148 @@ class EncodingDetector:
 
         :return: A 2-tuple (data stripped of byte-order mark, encoding implied by byte-order mark)
         """
-        encoding = None
+        length, encoding = cls._byte_order_mark(data)
+        if length:
+            data = data[length:]
+        return data, encoding
+
+    @classmethod
+    def _byte_order_mark(cls, data: bytes) -> Tuple[int, Optional[_Encoding]]:
+        """Find the byte-order mark at the start of a bytestring.
+
+        :return: A 2-tuple (length of byte-order mark, encoding implied
+            by byte-order mark). The length is 0 if there's no
+            byte-order mark.
+        """
         if isinstance(data, str):
             # Unicode data cannot have a byte-order mark.
-            return data, encoding
+            return 0, None
         if (
             (len(data) >= 4)
             and (data[:2] == b"\xfe\xff")
             and (data[2:4] != b"\x00\x00")
         ):
-            encoding = "utf-16be"
-            data = data[2:]
+            return 2, "utf-16be"
         elif (
             (len(data) >= 4)
             and (data[:2] == b"\xff\xfe")
             and (data[2:4] != b"\x00\x00")
         ):
-            encoding = "utf-16le"
-            data = data[2:]
+            return 2, "utf-16le"
         elif data[:3] == b"\xef\xbb\xbf":
-            encoding = "utf-8"
-            data = data[3:]
+            return 3, "utf-8"
         elif data[:4] == b"\x00\x00\xfe\xff":
-            encoding = "utf-32be"
-            data = data[4:]
+            return 4, "utf-32be"
         elif data[:4] == b"\xff\xfe\x00\x00":
-            encoding = "utf-32le"
-            data = data[4:]
-        return data, encoding
+            return 4, "utf-32le"
+        return 0, None
+
+    @classmethod
+    def prescan(cls, data: bytes) -> Optional[_Encoding]:
+        """Find the encoding declared in an HTML document's <meta> tags,
+        the way a web browser would.
+
+        This follows the "prescan a byte stream to determine its
+        encoding" algorithm from `section 13.2.3.2 of the HTML standard
+        <https://html.spec.whatwg.org/multipage/parsing.html#prescan-a-byte-stream-to-determine-its-encoding>`_:
+        comments and the attributes of other tags are skipped, and an
+        encoding in a ``content`` attribute only counts if the tag also
+        has ``http-equiv="content-type"``.
+
+        :param data: The start of an HTML document. Pass in a limited
+            amount of data; the whole thing will be scanned if no
+            encoding is found.
+        :return: The declared encoding, if one is found.
+        """
+        length = len(data)
+        position = 0
+        while True:
+            position = data.find(b"<", position)
+            if position == -1 or position + 1 >= length:
+                return None
+            if data.startswith(b"<!--", position):
+                # The "-->" may overlap the "<!--".
+                end = data.find(b"-->", position + 2)
+                if end == -1:
+                    return None
+                position = end + 3
+                continue
+
+            next_byte = data[position + 1 : position + 2]
+            is_meta = (
+                data[position + 1 : position + 5].lower() == b"meta"
+                and position + 5 < length
+                and data[position + 5] in b"\t\n\x0c\r /"
+            )
+            if next_byte.isalpha():
+                position += 1
+            elif next_byte == b"/" and data[position + 2 : position + 3].isalpha():
+                position += 2
+            elif next_byte in (b"!", b"/", b"?"):
+                # A doctype, processing instruction or other bogus
+                # comment.
+                position = data.find(b">", position)
+                if position == -1:
+                    return None
+                continue
+            else:
+                position += 1
+                continue
+
+            # Skip the tag name, then read the attributes.
+            while position < length and data[position] not in b"\t\n\x0c\r />":
+                position += 1
+            attributes: Dict[bytes, bytes] = {}
+            while True:
+                match = _prescan_tag_end.match(data, position)
+                if match is not None:
+                    position = match.end()
+                    break
+                match = _prescan_attribute.match(data, position)
+                if match is None or match.end() >= length:
+                    # The document ended inside the tag.
+                    return None
+                name, dq, dq_end, sq, sq_end, unquoted = match.groups()
+                if (dq is not None and not dq_end) or (sq is not None and not sq_end):
+                    return None
+                value = dq if dq is not None else sq if sq is not None else unquoted
+                name = name.lower()
+                if name not in attributes:
+                    attributes[name] = (value or b"").lower()
+                position = match.end()
+
+            if not is_meta:
+                continue
+            encoding = cls._meta_encoding(attributes)
+            if encoding is not None:
+                return encoding
+
+    @classmethod
+    def _meta_encoding(cls, attributes: Dict[bytes, bytes]) -> Optional[_Encoding]:
+        """Find the encoding declared by a <meta> tag with the given
+        (lowercased) attributes, as part of `EncodingDetector.prescan`.
+        """
+        charset: Optional[bytes] = attributes.get(b"charset")
+        if charset is None:
+            if attributes.get(b"http-equiv") != b"content-type":
+                return None
+            content = attributes.get(b"content")
+            if content is None:
+                return None
+            match = _prescan_content_charset.search(content)
+            if match is None:
+                return None
+            charset = match.group(1) or match.group(2) or match.group(3)
+        encoding = charset.strip(_PRESCAN_SPACE).decode("ascii", "replace")
+        if not encoding:
+            return None
+        if encoding.startswith("utf-16"):
+            # The document can't really be in UTF-16, or the <meta>
+            # tag couldn't have been read as ASCII.
+            return "utf-8"
+        if encoding == "x-user-defined":
+            return "windows-1252"
+        return encoding
 
     @classmethod
     def find_declared_encoding(
@@ -770,6 +1073,10 @@ class UnicodeDammit:
     :param exclude_encodings: These encodings will not be considered,
        even if the sniffing code thinks they might make sense.
 
+    :param sniff_bytes: Only look at this many bytes at the start of
+       the markup when looking for a declared encoding or running
+       chardet. See `EncodingDetector`.
+
     """
 
     def __init__(
@@ -781,11 +1088,13 @@ class UnicodeDammit:
         exclude_encodings: Optional[_Encodings] = [],
         user_encodings: Optional[_Encodings] = None,
         override_encodings: Optional[_Encodings] = None,
+        sniff_bytes: Optional[int] = None,
     ):
         self.smart_quotes_to = smart_quotes_to
         self.tried_encodings = []
         self.contains_replacement_characters = False
         self.is_html = is_html
+        self.encoding_strategy = None
         self.log = getLogger(__name__)
         self.detector = EncodingDetector(
             markup,
@@ -794,24 +1103,20 @@ class UnicodeDammit:
             exclude_encodings,
             user_encodings,
             override_encodings,
+            sniff_bytes,
         )
 
         # Short-circuit if the data is in Unicode to begin with.
         if isinstance(markup, str) or markup == b"":
-            self.markup = markup
             self.unicode_markup = str(markup)
             self.original_encoding = None
             return
 
-        # The encoding detector may have stripped a byte-order mark.
-        # Use the stripped markup from this point on.
-        self.markup = self.detector.markup
-
         u = None
         for encoding in self.detector.encodings:
-            markup = self.detector.markup
             u = self._convert_from(encoding)
             if u is not None:
+                self.encoding_strategy = self.detector.strategy
                 break
 
         if not u:
@@ -828,6 +1133,7 @@ class UnicodeDammit:
                     )
 
                     self.contains_replacement_characters = True
+                    self.encoding_strategy = self.detector.strategy
                     break
 
         # If none of that worked, we could at this point force it to
@@ -844,10 +1150,13 @@ class UnicodeDammit:
         else:
             self.unicode_markup = u
 
-    #: The original markup, before it was converted to Unicode.
-    #: This is not necessarily the same as what was passed in to the
-    #: constructor, since any byte-order mark will be stripped.
-    markup: bytes
+    @property
+    def markup(self) -> bytes:
+        """The original markup, before it was converted to Unicode.
+        This is not necessarily the same as what was passed in to the
+        constructor, since any byte-order mark will be stripped.
+        """
+        return self.detector.markup
 
     #: The Unicode version of the markup, following conversion. This
     #: is set to None if there was simply no way to convert the
@@ -864,6 +1173,11 @@ class UnicodeDammit:
     #: encoding of `UnicodeDammit.markup`.
     original_encoding: Optional[_Encoding]
 
+    #: Which of the `EncodingDetector.STRATEGIES` came up with
+    #: `UnicodeDammit.original_encoding`, or None if the markup was
+    #: already Unicode.
+    encoding_strategy: Optional[str]
+
     #: The strategy used to handle Microsoft smart quotes.
     smart_quotes_to: Optional[str]
 
@@ -876,25 +1190,32 @@ class UnicodeDammit:
     def _sub_ms_char(self, match: re.Match) -> bytes:
         """Changes a MS smart quote character to an XML or HTML
         entity, or an ASCII character.
+        """
+        return self._ms_char_substitution(match.group(1), self.smart_quotes_to)
+
+    @classmethod
+    def _ms_char_substitution(
+        cls, orig: bytes, smart_quotes_to: Optional[str]
+    ) -> bytes:
+        """Find the replacement for a MS smart quote character.
 
         TODO: Since this is only used to convert smart quotes, it
         could be simplified, and MS_CHARS_TO_ASCII made much less
         parochial.
         """
-        orig: bytes = match.group(1)
         sub: bytes
-        if self.smart_quotes_to == "ascii":
-            if orig in self.MS_CHARS_TO_ASCII:
-                sub = self.MS_CHARS_TO_ASCII[orig].encode()
+        if smart_quotes_to == "ascii":
+            if orig in cls.MS_CHARS_TO_ASCII:
+                sub = cls.MS_CHARS_TO_ASCII[orig].encode()
             else:
                 # Shouldn't happen; substitute the character
                 # with itself.
                 sub = orig
         else:
-            if orig in self.MS_CHARS:
-                substitutions = self.MS_CHARS[orig]
+            if orig in cls.MS_CHARS:
+                substitutions = cls.MS_CHARS[orig]
                 if type(substitutions) is tuple:
-                    if self.smart_quotes_to == "xml":
+                    if smart_quotes_to == "xml":
                         sub = b"&#x" + substitutions[1].encode() + b";"
                     else:
                         sub = b"&" + substitutions[0].encode() + b";"
@@ -942,16 +1263,16 @@ class UnicodeDammit:
             return None
         proposed = lookup_result
         self.tried_encodings.append((proposed, errors))
-        markup = self.markup
+        # Decoding straight from the original markup means a document
+        # with a byte-order mark doesn't have to be copied first.
+        markup = self.detector.markup_buffer
         # Convert smart quotes to HTML if coming from an encoding
         # that might have them.
         if (
             self.smart_quotes_to is not None
             and proposed in self.ENCODINGS_WITH_SMART_QUOTES
         ):
-            smart_quotes_re = b"([\x80-\x9f])"
-            smart_quotes_compiled = re.compile(smart_quotes_re)
-            markup = smart_quotes_compiled.sub(self._sub_ms_char, markup)
+            markup = _smart_quotes_re.sub(self._sub_ms_char, markup)
 
         try:
             # print("Trying to convert document to %s (errors=%s)" % (
@@ -967,9 +1288,10 @@ class UnicodeDammit:
         return self.unicode_markup
 
     def _to_unicode(
-        self, data: bytes, encoding: _Encoding, errors: str = "strict"
+        self, data: Union[bytes, memoryview], encoding: _Encoding, errors: str = "strict"
     ) -> str:
-        """Given a bytestring and its encoding, decodes the string into Unicode.
+        """Given a bytestring (or a view of one) and its encoding, decodes
+        the string into Unicode.
 
         :param encoding: The name of an encoding.
         :param errors: An error handling strategy, used when calling `str`.
@@ -985,16 +1307,17 @@ class UnicodeDammit:
             return None
         return self.detector.declared_encoding
 
-    def find_codec(self, charset: _Encoding) -> Optional[str]:
+    @classmethod
+    def find_codec(cls, charset: _Encoding) -> Optional[str]:
         """Look up the Python codec corresponding to a given character set.
 
         :param charset: The name of a character set.
         :return: The name of a Python codec.
         """
         value = (
-            self._codec(self.CHARSET_ALIASES.get(charset, charset))
-            or (charset and self._codec(charset.replace("-", "")))
-            or (charset and self._codec(charset.replace("-", "_")))
+            cls._codec(cls.CHARSET_ALIASES.get(charset, charset))
+            or (charset and cls._codec(charset.replace("-", "")))
+            or (charset and cls._codec(charset.replace("-", "_")))
             or (charset and charset.lower())
             or charset
         )
@@ -1002,7 +1325,8 @@ class UnicodeDammit:
             return value.lower()
         return None
 
-    def _codec(self, charset: _Encoding) -> Optional[str]:
+    @classmethod
+    def _codec(cls, charset: _Encoding) -> Optional[str]:
         if not charset:
             return charset
         codec = None
@@ -1373,6 +1697,74 @@ class UnicodeDammit:
                 "UTF-8 is the only currently supported main encoding."
             )
 
+        try:
+            in_bytes.decode("utf8")
+            # It's all UTF-8, so there's nothing to fix.
+            return in_bytes
+        except UnicodeDecodeError:
+            pass
+
+        # Any Windows-1252 characters are in between runs of bytes
+        # that are left alone. Only those characters need any work
+        # done in Python.
+        table = cls.WINDOWS_1252_TO_UTF8
+        fixed = cls._detwingle_pattern().sub(
+            lambda match: match.group(1) or table[match.group(2)[0]], in_bytes
+        )
+        if fixed == in_bytes:
+            return in_bytes
+        return fixed
+
+    #: :meta private:
+    _detwingle_re: Optional[Pattern[bytes]] = None
+
+    @classmethod
+    def _detwingle_pattern(cls) -> Pattern[bytes]:
+        """Build the regular expression used by `UnicodeDammit.detwingle`.
+
+        Group 1 matches a run of bytes that are left alone: UTF-8
+        multibyte characters (a start byte and whatever follows it,
+        valid or not), and bytes that aren't Windows-1252 characters.
+        Group 2 matches a single Windows-1252 character.
+        """
+        if cls._detwingle_re is None:
+
+            def byte_class(values: Iterable[int]) -> bytes:
+                return b"".join(re.escape(bytes([x])) for x in values)
+
+            multibyte_starts = set()
+            sequences = []
+            for start, end, size in cls.MULTIBYTE_MARKERS_AND_SIZES:
+                multibyte_starts.update(range(start, end + 1))
+                # A character cut off by the end of the string is left
+                # alone too.
+                sequences.append(
+                    b"[%s].{0,%d}" % (byte_class(range(start, end + 1)), size - 1)
+                )
+            special = multibyte_starts.union(
+                x for x in cls.WINDOWS_1252_TO_UTF8 if x >= 0x80
+            )
+            windows_1252 = sorted(
+                x
+                for x in cls.WINDOWS_1252_TO_UTF8
+                if x >= 0x80 and x not in multibyte_starts
+            )
+            left_alone = b"[^%s]+" % byte_class(sorted(special))
+            cls._detwingle_re = re.compile(
+                b"((?:%s)+)|([%s])"
+                % (b"|".join([left_alone] + sequences), byte_class(windows_1252)),
+                re.DOTALL,
+            )
+        return cls._detwingle_re
+
+    @classmethod
+    def _detwingle_bytewise(cls, in_bytes: bytes) -> bytes:
+        """The original, byte-at-a-time implementation of
+        `UnicodeDammit.detwingle`, kept as a reference for tests and
+        benchmarks.
+
+        :meta private:
+        """
         byte_chunks = []
 
         chunk_start = 0
@@ -1406,3 +1798,181 @@ class UnicodeDammit:
             # Store the final chunk.
             byte_chunks.append(in_bytes[chunk_start:])
         return b"".join(byte_chunks)
+
+
+class IncrementalUnicodeDammit(object):
+    """Convert a bytestring to Unicode a piece at a time, as it
+    arrives, rather than all at once like `UnicodeDammit`::
+
+     dammit = IncrementalUnicodeDammit(is_html=True)
+     for chunk in iter(lambda: fh.read(65536), b""):
+         process(dammit.decode(chunk))
+     process(dammit.decode(b"", final=True))
+
+    The encoding is chosen once, by an `EncodingDetector`, from the
+    start of the document: the first
+    `IncrementalUnicodeDammit.MINIMUM_SNIFF_BYTES` bytes are held back
+    until then. From then on, each chunk is decoded with an
+    incremental decoder from the `codecs` module, so a multibyte
+    character can be split between two chunks.
+
+    As with `UnicodeDammit`, an encoding is only chosen if it can
+    decode the start of the document. If a later chunk turns out
+    not to be valid in that encoding, it's too late to pick another
+    one; the invalid bytes are replaced with REPLACEMENT CHARACTER
+    and `IncrementalUnicodeDammit.contains_replacement_characters`
+    is set.
+
+    The arguments are the same as for `UnicodeDammit`.
+    """
+
+    #: The encoding isn't chosen until at least this many bytes have
+    #: arrived (or the document ends), so the `EncodingDetector` has
+    #: something to work with.
+    MINIMUM_SNIFF_BYTES: int = 1024
+
+    #: The `EncodingDetector` that chose the encoding, once it's
+    #: been chosen.
+    detector: Optional[EncodingDetector]
+
+    #: The encoding being used to decode the document, once it's been
+    #: chosen.
+    original_encoding: Optional[_Encoding]
+
+    #: Which of the `EncodingDetector.STRATEGIES` came up with
+    #: `IncrementalUnicodeDammit.original_encoding`.
+    encoding_strategy: Optional[str]
+
+    #: This is True if any bytes couldn't be decoded, and were
+    #: replaced with REPLACEMENT CHARACTER.
+    contains_replacement_characters: bool
+
+    #: The (encoding, error handling strategy) 2-tuples that were used
+    #: to try and convert the start of the document to Unicode.
+    tried_encodings: List[Tuple[_Encoding, str]]
+
+    def __init__(
+        self,
+        known_definite_encodings: Optional[_Encodings] = None,
+        smart_quotes_to: Optional[Literal["ascii", "xml", "html"]] = None,
+        is_html: bool = False,
+        exclude_encodings: Optional[_Encodings] = None,
+        user_encodings: Optional[_Encodings] = None,
+        sniff_bytes: Optional[int] = None,
+    ):
+        self.known_definite_encodings = known_definite_encodings
+        self.smart_quotes_to = smart_quotes_to
+        self.is_html = is_html
+        self.exclude_encodings = exclude_encodings
+        self.user_encodings = user_encodings
+        self.sniff_bytes = sniff_bytes
+        self.detector = None
+        self.original_encoding = None
+        self.encoding_strategy = None
+        self.contains_replacement_characters = False
+        self.tried_encodings = []
+        self._pending: List[bytes] = []
+        self._pending_length = 0
+        self._decoder: Optional[codecs.IncrementalDecoder] = None
+        self._substitute_smart_quotes = False
+
+    @property
+    def declared_html_encoding(self) -> Optional[_Encoding]:
+        """If the markup is an HTML document, returns the encoding, if any,
+        declared *inside* the document.
+        """
+        if not self.is_html or self.detector is None:
+            return None
+        return self.detector.declared_encoding
+
+    def decode(self, chunk: bytes, final: bool = False) -> str:
+        """Convert the next chunk of the document to Unicode.
+
+        :param chunk: The next chunk of the document.
+        :param final: True if this is the last chunk.
+        :return: As much of the document as can be converted so far.
+            This may be empty, if the encoding hasn't been chosen yet
+            or the chunk ends partway through a character.
+        :raise UnicodeError: If no encoding can decode the start of
+            the document, even with character replacement.
+        """
+        if self._decoder is None:
+            self._pending.append(chunk)
+            self._pending_length += len(chunk)
+            if self._pending_length < self.MINIMUM_SNIFF_BYTES and not final:
+                return ""
+            data = b"".join(self._pending)
+            self._pending = []
+            if not data:
+                return ""
+            return self._start(data, final)
+        return self._decode(chunk, final)
+
+    def _start(self, data: bytes, final: bool) -> str:
+        """Choose an encoding that can decode the start of the
+        document, and decode it.
+        """
+        self.detector = EncodingDetector(
+            data,
+            self.known_definite_encodings,
+            self.is_html,
+            self.exclude_encodings,
+            self.user_encodings,
+            sniff_bytes=self.sniff_bytes,
+        )
+        data = self.detector.markup
+        for errors in ("strict", "replace"):
+            for encoding in self.detector.encodings:
+                if errors == "replace" and encoding == "ascii":
+                    continue
+                codec = UnicodeDammit.find_codec(encoding)
+                if codec is None or (codec, errors) in self.tried_encodings:
+                    continue
+                self.tried_encodings.append((codec, errors))
+                try:
+                    decoder = codecs.getincrementaldecoder(codec)(errors)
+                except LookupError:
+                    continue
+                self._decoder = decoder
+                self._substitute_smart_quotes = (
+                    self.smart_quotes_to is not None
+                    and codec in UnicodeDammit.ENCODINGS_WITH_SMART_QUOTES
+                )
+                try:
+                    text = decoder.decode(self._prepare(data), final)
+                except UnicodeDecodeError:
+                    self._decoder = None
+                    continue
+                self.original_encoding = codec
+                self.encoding_strategy = self.detector.strategy
+                self.contains_replacement_characters = errors == "replace"
+                return text
+        raise UnicodeError("Could not find an encoding for the start of the document.")
+
+    def _decode(self, chunk: bytes, final: bool) -> str:
+        """Decode a chunk using the encoding that's been chosen."""
+        assert self._decoder is not None
+        chunk = self._prepare(chunk)
+        try:
+            return self._decoder.decode(chunk, final)
+        except UnicodeDecodeError:
+            # The decoder's state is unchanged, so the chunk can be
+            # decoded again, replacing whatever doesn't fit.
+            self._decoder.errors = "replace"
+            self.contains_replacement_characters = True
+            return self._decoder.decode(chunk, final)
+
+    def _prepare(self, chunk: bytes) -> bytes:
+        """Convert Microsoft smart quotes, if necessary. The encodings
+        that have smart quotes use one byte per character, so this can
+        be done one chunk at a time.
+        """
+        if self._substitute_smart_quotes:
+            smart_quotes_to = self.smart_quotes_to
+            chunk = _smart_quotes_re.sub(
+                lambda match: UnicodeDammit._ms_char_substitution(
+                    match.group(1), smart_quotes_to
+                ),
+                chunk,
+            )
+        return chunk
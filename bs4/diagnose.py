@@ -4,6 +4,7 @@
 __license__ = "MIT"
 
 import cProfile
+import gc
 from io import BytesIO
 from html.parser import HTMLParser
 import bs4
@@ -11,6 +12,8 @@ from bs4 import BeautifulSoup, __version__
 from bs4.builder import builder_registry
 from typing import (
     Any,
+    Callable,
+    Dict,
     IO,
     List,
     Optional,
@@ -20,7 +23,9 @@ from typing import (
 
 if TYPE_CHECKING:
     from bs4._typing import _IncomingMarkup
+    from bs4.element import Tag
 
+import os
 import pstats
 import random
 import tempfile
@@ -248,6 +253,338 @@ def benchmark_parsers(num_elements: int = 100000) -> None:
     print(("Raw html5lib parsed the markup in %.2fs." % (b - a)))
 
 
+def benchmark_index(num_records: int = 5000, repeat: int = 200) -> None:
+    """Compare answering common queries by searching the tree with
+    answering them from a `TreeIndex`.
+    """
+    print(("Index benchmark on Beautiful Soup %s" % __version__))
+    record = """
+<div class="record" id="r%d">
+    <h3>Record %d</h3>
+    <p class="intro text">This is record number <b>%d</b>.</p>
+    <a href="#link-%d">Link</a>
+</div>
+"""
+    data = "<html><body>%s</body></html>" % "".join(
+        record % ((i,) * 4) for i in range(num_records)
+    )
+    print(("Generated a document with %d records (%d bytes)." % (num_records, len(data))))
+    plain = BeautifulSoup(data, "html.parser")
+    indexed = BeautifulSoup(data, "html.parser", indexed=True)
+
+    last_id = "r%d" % (num_records - 1)
+    queries: List[Tuple[str, Callable[[Tag], Any]]] = [
+        ("find('a')", lambda soup: soup.find("a")),
+        ("find_all('a')", lambda soup: soup.find_all("a")),
+        ("find(class_='intro')", lambda soup: soup.find(class_="intro")),
+        ("find(id=<last record>)", lambda soup: soup.find(id=last_id)),
+        ("find_all('p', class_='text')", lambda soup: soup.find_all("p", class_="text")),
+        ("soup.div.h3", lambda soup: soup.div.h3),
+    ]
+    for description, query in queries:
+        # The 'id' and 'class' indexes are built the first time
+        # they're needed.
+        if query(plain) != query(indexed):
+            print(("%s gave different results with an index!" % description))
+        times = []
+        for soup in plain, indexed:
+            a = time.time()
+            for i in range(repeat):
+                query(soup)
+            b = time.time()
+            times.append(b - a)
+        print(
+            (
+                "%s %d times: %.4fs searching the tree, %.4fs with an index."
+                % (description, repeat, times[0], times[1])
+            )
+        )
+
+
+def benchmark_output(num_elements: int = 100000, parser: str = "html.parser") -> None:
+    """Compare the speed of the two ways of turning a tree back into
+    a string: the fast path used by str() and decode() when there's
+    no pretty-printing, and the general-purpose path used for
+    everything else.
+    """
+    print(("Output benchmark on Beautiful Soup %s" % __version__))
+    data = rdoc(num_elements)
+    soup = BeautifulSoup(data, parser)
+    print(("Parsed a large invalid HTML document (%d bytes)." % len(data)))
+
+    a = time.time()
+    fast = soup.decode()
+    b = time.time()
+    print(("Fast path rendered the tree in %.2fs." % (b - a)))
+
+    # Passing in an iterator makes decode() use the general-purpose
+    # path.
+    a = time.time()
+    general = soup.decode(iterator=soup.self_and_descendants)
+    b = time.time()
+    print(("General-purpose path rendered the tree in %.2fs." % (b - a)))
+
+    if fast != general:
+        print("The two paths produced different output!")
+
+
+def benchmark_apply_replacer(
+    num_elements: int = 100000, parser: str = "html.parser"
+) -> None:
+    """Compare applying a SoupReplacer while parsing with applying it
+    to a tree that's already been parsed, with and without an index.
+    """
+    from bs4.element import SoupReplacer
+
+    print(("Replacer benchmark on Beautiful Soup %s" % __version__))
+    data = rdoc(num_elements)
+    print(("Generated a large invalid HTML document (%d bytes)." % len(data)))
+    replacer = SoupReplacer.rules({"b": "strong"}, drop_tags={"script"})
+
+    a = time.time()
+    expect = BeautifulSoup(data, parser, replacer=replacer).decode()
+    b = time.time()
+    print(("Parsed with the replacer in %.2fs." % (b - a)))
+
+    for indexed in (False, True):
+        soup = BeautifulSoup(data, parser, indexed=indexed)
+        a = time.time()
+        soup.apply_replacer(replacer)
+        b = time.time()
+        print(("Applied the replacer (indexed=%s) in %.2fs." % (indexed, b - a)))
+        if soup.decode() != expect:
+            print("Applying the replacer after parsing gave a different tree!")
+
+
+def benchmark_detwingle(num_elements: int = 100000) -> None:
+    """Compare UnicodeDammit.detwingle with the byte-at-a-time
+    implementation it replaced, on a large UTF-8 document with some
+    Windows-1252 embedded in it.
+    """
+    from bs4.dammit import UnicodeDammit
+
+    print(("Detwingle benchmark on Beautiful Soup %s" % __version__))
+    utf8 = "caf\N{LATIN SMALL LETTER E WITH ACUTE} \N{SNOWMAN}".encode("utf8")
+    windows_1252 = "\N{LEFT DOUBLE QUOTATION MARK}Hi\N{RIGHT DOUBLE QUOTATION MARK}"
+    pieces = rdoc(num_elements).encode("utf8").split(b" ")
+    for i in range(0, len(pieces), 50):
+        pieces[i] += utf8
+    for i in range(0, len(pieces), 500):
+        pieces[i] += windows_1252.encode("windows-1252")
+    data = b" ".join(pieces)
+    print(("Generated a large mixed-encoding document (%d bytes)." % len(data)))
+
+    a = time.time()
+    fast = UnicodeDammit.detwingle(data)
+    b = time.time()
+    print(("detwingle() fixed the document in %.2fs." % (b - a)))
+
+    a = time.time()
+    slow = UnicodeDammit._detwingle_bytewise(data)
+    b = time.time()
+    print(("The byte-at-a-time implementation took %.2fs." % (b - a)))
+
+    if fast != slow:
+        print("The two implementations produced different output!")
+
+
+def benchmark_parser_session(
+    num_documents: int = 20000, parser: str = "html.parser"
+) -> None:
+    """Compare parsing lots of small documents with the `BeautifulSoup`
+    constructor and with a `ParserSession`.
+    """
+    from bs4 import ParserSession
+
+    print(("Parser session benchmark on Beautiful Soup %s" % __version__))
+    documents = [rdoc(random.randint(1, 10)) for i in range(num_documents)]
+    print(
+        (
+            "Generated %d small HTML documents (%d bytes on average)."
+            % (num_documents, sum(map(len, documents)) / num_documents)
+        )
+    )
+
+    a = time.time()
+    expect = [BeautifulSoup(document, parser) for document in documents]
+    b = time.time()
+    print(
+        (
+            "The BeautifulSoup constructor parsed %d documents a second."
+            % (num_documents / (b - a))
+        )
+    )
+
+    session = ParserSession(parser)
+    a = time.time()
+    got = [session.parse(document) for document in documents]
+    b = time.time()
+    print(("A ParserSession parsed %d documents a second." % (num_documents / (b - a))))
+
+    if [x.decode() for x in got] != [x.decode() for x in expect]:
+        print("The session produced different trees!")
+
+
+def _count_tags(soup: BeautifulSoup) -> int:
+    return len(soup.find_all(True))
+
+
+def benchmark_parse_many(
+    num_documents: int = 2000,
+    num_elements: int = 1000,
+    parser: str = "html.parser",
+    workers: Optional[int] = None,
+) -> None:
+    """Compare parsing a batch of documents one after another with
+    parsing them in a pool of worker processes, with `bs4.parse_many`.
+    """
+    from bs4 import parse_many
+
+    print(("parse_many benchmark on Beautiful Soup %s" % __version__))
+    documents = [rdoc(num_elements) for i in range(num_documents)]
+    print(
+        (
+            "Generated %d HTML documents (%d bytes in all)."
+            % (num_documents, sum(map(len, documents)))
+        )
+    )
+
+    a = time.time()
+    expect = [_count_tags(BeautifulSoup(document, parser)) for document in documents]
+    b = time.time()
+    print(("Parsed the documents one after another in %.2fs." % (b - a)))
+
+    for ordered in (True, False):
+        a = time.time()
+        got = list(
+            parse_many(
+                documents, parser, transform=_count_tags, workers=workers,
+                chunksize=10, ordered=ordered,
+            )
+        )
+        b = time.time()
+        print(("parse_many (ordered=%s) took %.2fs." % (ordered, b - a)))
+        if ordered and got != expect:
+            print("parse_many gave different results!")
+        elif sorted(got) != sorted(expect):
+            print("parse_many gave different results!")
+
+
+def benchmark_parse_split(
+    num_records: int = 100000, workers: Optional[int] = None
+) -> None:
+    """Compare parsing one huge document with the `BeautifulSoup`
+    constructor and with `bs4.parse_split`.
+    """
+    from bs4 import parse_split
+
+    print(("parse_split benchmark on Beautiful Soup %s" % __version__))
+    record = """
+<div class="test-block" data-index="%d">
+    <h3>Data Record %d</h3>
+    <p>This is record number <b>%d</b>.</p>
+    <a href="#link-%d">Link</a>
+</div>
+"""
+    document = (
+        "<!DOCTYPE html><html><head><title>Records</title></head><body>\n"
+        + "".join(record % ((i,) * 4) for i in range(num_records))
+        + "</body></html>"
+    )
+    print(("Generated a document of %d bytes." % len(document)))
+
+    from bs4.parallel import _worker_count
+
+    cpus = os.cpu_count()
+    workers = _worker_count(workers)
+    print(("This machine has %s CPUs; using %d workers." % (cpus, workers)))
+    if workers <= 1:
+        print("With one worker, parse_split parses in this process.")
+
+    a = time.time()
+    expect = BeautifulSoup(document, "html.parser")
+    b = time.time()
+    serial = b - a
+    print(("The BeautifulSoup constructor took %.2fs." % serial))
+
+    # Don't make the garbage collector walk the first tree while the
+    # second one is being built.
+    expect_markup = expect.decode()
+    expect_lines = [tag.sourceline for tag in expect.find_all(True)]
+    del expect
+    gc.collect()
+
+    a = time.time()
+    got = parse_split(document, "html.parser", workers=workers)
+    b = time.time()
+    print(
+        (
+            "parse_split took %.2fs with %d workers (%.2fx the serial time)."
+            % (b - a, workers, (b - a) / serial)
+        )
+    )
+
+    if got.decode() != expect_markup or [
+        tag.sourceline for tag in got.find_all(True)
+    ] != expect_lines:
+        print("parse_split gave a different tree!")
+
+
+def _import_times(module: str = "bs4") -> Dict[str, Tuple[int, int]]:
+    """Import a module in a fresh Python interpreter, with
+    ``python -X importtime``.
+
+    :return: A dictionary mapping the name of each module that was
+        imported to its own import time and its cumulative import
+        time (including the modules it imported), in microseconds.
+    """
+    import subprocess
+
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import %s" % module],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times = {}
+    for line in process.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:") :].split("|")
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            # This is the header line.
+            continue
+        times[fields[2].strip()] = (int(fields[0]), int(fields[1]))
+    return times
+
+
+def benchmark_import_time(module: str = "bs4", runs: int = 5, top: int = 10) -> None:
+    """Measure how long it takes to import Beautiful Soup, using
+    ``python -X importtime``, and show which modules take the longest.
+
+    Each import happens in a new interpreter, so nothing is cached
+    except by the operating system. The fastest of several runs is
+    reported.
+    """
+    print(("Import time benchmark on Beautiful Soup %s" % __version__))
+    best: Optional[Dict[str, Tuple[int, int]]] = None
+    for i in range(runs):
+        times = _import_times(module)
+        if best is None or times[module][1] < best[module][1]:
+            best = times
+    assert best is not None
+    print(("Imported %s in %.3fs." % (module, best[module][1] / 1000000.0)))
+
+    slowest = sorted(best.items(), key=lambda x: x[1][0], reverse=True)[:top]
+    print("The slowest modules to import, not counting the modules they import:")
+    for name, (own, cumulative) in slowest:
+        print(("  %.3fs %s" % (own / 1000000.0, name)))
+
+    for parser in ("bs4.builder._lxml", "bs4.builder._html5lib"):
+        if parser in best:
+            print(("%s was imported, though nothing used it." % parser))
+
+
 def profile(num_elements: int = 100000, parser: str = "lxml") -> None:
     """Use Python's profiler on a randomly generated document."""
     filehandle = tempfile.NamedTemporaryFile()
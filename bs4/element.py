@@ -3,10 +3,13 @@ from __future__ import annotations
 # Use of this source code is governed by the MIT license.
 __license__ = "MIT"
 
+import codecs
+import hashlib
+import io
 import re
+import time
 import warnings
 
-from bs4.css import CSS
 from bs4._deprecation import (
     _deprecated,
     _deprecated_alias,
@@ -23,7 +26,9 @@ from typing import (
     Any,
     Callable,
     Dict,
+    FrozenSet,
     Generic,
+    IO,
     Iterable,
     Iterator,
     List,
@@ -46,7 +51,9 @@ from typing_extensions import (
 if TYPE_CHECKING:
     from bs4 import BeautifulSoup
     from bs4.builder import TreeBuilder
+    from bs4.css import CSS
     from bs4.filter import ElementFilter
+    from bs4.index import TreeIndex, _IndexStamp
     from bs4.formatter import (
         _EntitySubstitutionFunction,
         _FormatterOrName,
@@ -134,12 +141,91 @@ class SoupReplacer:
     Supports:
       - M2: SoupReplacer("old", "new")
       - M3: SoupReplacer(name_xformer, attrs_xformer, xformer)
+      - Rules: SoupReplacer.rules({"old": "new"}, drop_attrs=..., keep_attrs=...)
+
+    Two more keyword arguments work during parsing, before anything
+    is added to the tree:
+      - string_xformer: A function that takes the text of a string and
+        returns new text, or None to leave the string out.
+      - drop: A collection of tag names, or a function that takes a tag
+        name and its attribute dictionary and returns True. A tag that's
+        dropped is left out of the tree along with everything inside it.
+
+    These are applied by `BeautifulSoup.handle_starttag` and
+    `BeautifulSoup.endData`, so they work with the html.parser and lxml
+    tree builders but not with html5lib, which builds its tree
+    differently. Comments, CDATA sections and the like aren't passed
+    into string_xformer.
+
+    A tag's new name is worked out (by `SoupReplacer.rename`) before
+    the `Tag` is created, so end tags can be matched up with it.
+    html5lib goes on using the original name while it builds the
+    tree, so the HTML rules for the original tag still apply. The
+    other transformations are applied to the new `Tag` by
+    `SoupReplacer.replace`.
+
+    Pass in profile=True (or call `SoupReplacer.enable_profiling`) to
+    find out how much time goes into each function, and how many tags
+    and attributes were changed; see `SoupReplacer.stats`.
     """
 
-    def __init__(self, *args, name_xformer=None, attrs_xformer=None, xformer=None):
+    #: An xformer can return this to stop any later stages of a
+    #: `ReplacerPipeline` from seeing the tag.
+    STOP: object = object()
+
+    #: Tag names that should be changed, for the M2 and rules forms.
+    _renames: Optional[Dict[str, str]] = None
+
+    #: How to filter the attributes of tags with particular names, for
+    #: the rules form. Each value is a set of attribute names to keep
+    #: (or None to keep everything), and a set of attribute names
+    #: to remove.
+    _attribute_rules: Dict[str, Tuple[Optional[FrozenSet[str]], FrozenSet[str]]] = {}
+
+    #: How to filter the attributes of all other tags.
+    _default_attribute_rule: Optional[
+        Tuple[Optional[FrozenSet[str]], FrozenSet[str]]
+    ] = None
+
+    #: Tags with these names are dropped.
+    _drop_names: FrozenSet[str] = frozenset()
+
+    #: A function that decides whether to drop a tag.
+    _drop_function: Optional[Callable[[str, Dict[str, Any]], bool]] = None
+
+    #: What this replacer has done, if profiling is turned on.
+    _stats: Optional[Dict[str, Any]] = None
+
+    #: The functions that are timed when profiling is turned on, and
+    #: what they're called in `SoupReplacer.stats`.
+    _PROFILED_FUNCTIONS = (
+        ("name_xformer", "name_xformer"),
+        ("xformer", "xformer"),
+        ("attrs_xformer", "attrs_xformer"),
+        ("string_xformer", "string_xformer"),
+        ("_drop_function", "drop"),
+    )
+
+    def __init__(
+        self,
+        *args,
+        name_xformer=None,
+        attrs_xformer=None,
+        xformer=None,
+        string_xformer=None,
+        drop=None,
+        profile=False,
+    ):
         self.name_xformer = name_xformer
         self.attrs_xformer = attrs_xformer
         self.xformer = xformer
+        self.string_xformer = string_xformer
+        self.drop = drop
+        if drop is not None:
+            if callable(drop):
+                self._drop_function = drop
+            else:
+                self._drop_names = frozenset(drop)
         self.og_tag = None
         self.alt_tag = None
         # --- Milestone 2 compatibility ---
@@ -149,28 +235,110 @@ class SoupReplacer:
             if len(args) != 2:
                 raise ValueError("M2 form: SoupReplacer('old', 'new')")
             old_tag, new_tag = args
-            
+
             self.og_tag = old_tag
             self.alt_tag = new_tag
-            # M2 uses a simple tag name replacement
-            def m2_name_xformer(tag):
-                if tag == old_tag:
-                    return new_tag
-                return tag
+            # M2 is a simple tag name replacement.
+            self._renames = {old_tag: new_tag}
+        if profile:
+            self.enable_profiling()
 
-            self.name_xformer = m2_name_xformer
-
-    def replace(self, tag):
-        """Apply all transformations to a Tag instance."""
-        # 1️ name_xformer(tag)
+    @classmethod
+    def rules(
+        cls,
+        renames: Optional[Dict[str, str]] = None,
+        drop_attrs: Optional[Iterable[str]] = None,
+        keep_attrs: Optional[Dict[str, Iterable[str]]] = None,
+        drop_tags: Optional[Iterable[str]] = None,
+    ) -> "SoupReplacer":
+        """Create a SoupReplacer from a table of rules instead of
+        functions.
+
+        The rules are compiled into dictionaries keyed by tag name,
+        so a tag that no rule mentions costs one dictionary lookup::
+
+         SoupReplacer.rules(
+             {"b": "blockquote"},
+             drop_attrs={"style"},
+             keep_attrs={"a": {"href"}, "img": {"src"}},
+         )
+
+        :param renames: Maps old tag names to new ones.
+        :param drop_attrs: Attributes to remove from every tag.
+        :param keep_attrs: Maps a tag name to the only attributes that
+            tag may keep; all others are removed. The name "*" applies
+            to every tag not otherwise mentioned. Tag names here are
+            names *after* renaming.
+        :param drop_tags: Tags with these names (after renaming) are
+            left out of the tree, along with everything inside them.
+        """
+        replacer = cls(drop=drop_tags)
+        if renames:
+            replacer._renames = dict(renames)
+        drop = frozenset(drop_attrs or ())
+        keep = dict((name, frozenset(attrs)) for name, attrs in (keep_attrs or {}).items())
+        default_keep = keep.pop("*", None)
+        replacer._attribute_rules = dict(
+            (name, (attrs, drop)) for name, attrs in keep.items()
+        )
+        if default_keep is not None or drop:
+            replacer._default_attribute_rule = (default_keep, drop)
+        return replacer
+
+    def rename(self, name):
+        """Work out the new name for a tag with the given name."""
+        if self._renames is not None:
+            name = self._renames.get(name, name)
         if self.name_xformer:
-            new_name = self.name_xformer(tag)
+            new_name = self.name_xformer(name)
             if isinstance(new_name, str):
-                tag.name = new_name
+                name = new_name
+        return name
+
+    def drops(self, name, attrs):
+        """Should a tag with this name and these attributes be left out
+        of the tree?
+        """
+        if name in self._drop_names:
+            return True
+        if self._drop_function is not None:
+            return bool(self._drop_function(name, attrs))
+        return False
+
+    def transform_string(self, text, parent):
+        """Work out the new text for a string found inside ``parent``.
+
+        :return: The new text, or None if the string should be left out.
+        """
+        if self.string_xformer is None:
+            return text
+        return self.string_xformer(text)
+
+    def replace(self, tag):
+        """Apply all transformations, other than renaming, to a Tag instance.
+
+        :return: `SoupReplacer.STOP` if the xformer returned it,
+            otherwise None.
+        """
+        # 1️ The attribute rules.
+        rule = self._attribute_rules.get(tag.name, self._default_attribute_rule)
+        if rule is not None and tag.attrs:
+            keep, drop = rule
+            attrs = tag.attrs
+            if keep is not None:
+                if not keep:
+                    attrs.clear()
+                else:
+                    for key in attrs.keys() - keep:
+                        del attrs[key]
+            if drop:
+                for key in attrs.keys() & drop:
+                    del attrs[key]
 
         # 2️ xformer(tag)
         if self.xformer:
-            self.xformer(tag)
+            if self.xformer(tag) is SoupReplacer.STOP:
+                return SoupReplacer.STOP
 
         # 3️ attrs_xformer(tag.attrs)
         if self.attrs_xformer:
@@ -180,6 +348,262 @@ class SoupReplacer:
                 if not isinstance(result, dict):
                     raise TypeError("attrs_xformer must return dict or None")
                 tag.attrs = result
+        return None
+
+    def enable_profiling(self):
+        """Start counting what this replacer does and timing the
+        functions it was given. See `SoupReplacer.stats`.
+
+        This works by wrapping the replacer's methods and functions,
+        so a replacer that isn't being profiled doesn't pay for it.
+
+        :return: This replacer, so calls can be chained.
+        """
+        if self._stats is not None:
+            return self
+        stats = self._stats = dict(
+            callables={}, tags_renamed=0, attributes_removed=0, tags_dropped=0
+        )
+        for attribute, key in self._PROFILED_FUNCTIONS:
+            function = getattr(self, attribute)
+            if function is not None:
+                timing = stats["callables"][key] = dict(
+                    calls=0, total_time=0.0, max_time=0.0
+                )
+                setattr(self, attribute, _timed(function, timing))
+
+        rename, replace, drops = self.rename, self.replace, self.drops
+
+        def counting_rename(name):
+            new_name = rename(name)
+            if new_name != name:
+                stats["tags_renamed"] += 1
+            return new_name
+
+        def counting_replace(tag):
+            keys = set(tag.attrs)
+            result = replace(tag)
+            stats["attributes_removed"] += len(keys.difference(tag.attrs))
+            return result
+
+        def counting_drops(name, attrs):
+            if drops(name, attrs):
+                stats["tags_dropped"] += 1
+                return True
+            return False
+
+        self.rename = counting_rename
+        self.replace = counting_replace
+        self.drops = counting_drops
+        return self
+
+    def stats(self):
+        """What this replacer has done since profiling was turned on
+        with `SoupReplacer.enable_profiling` (or ``profile=True``).
+
+        :return: None if profiling isn't turned on. Otherwise, a
+            dictionary with these keys:
+
+            * "callables": For each function this replacer was given
+              ("name_xformer", "xformer", "attrs_xformer",
+              "string_xformer" or "drop"), a dictionary with the
+              number of "calls", and the "total_time" and "max_time"
+              spent in them, in seconds.
+            * "tags_renamed": How many tags got a new name.
+            * "attributes_removed": How many attributes were removed
+              from tags, by rules or by functions.
+            * "tags_dropped": How many tags were left out of the tree.
+        """
+        if self._stats is None:
+            return None
+        stats = dict(self._stats)
+        stats["callables"] = dict(
+            (key, dict(timing)) for key, timing in self._stats["callables"].items()
+        )
+        return stats
+
+    def _replaces_anything(self):
+        """Does `SoupReplacer.replace` ever do anything?"""
+        return bool(
+            self._attribute_rules
+            or self._default_attribute_rule is not None
+            or self.xformer
+            or self.attrs_xformer
+        )
+
+    def _drops_anything(self):
+        """Can `SoupReplacer.drops` ever return True?"""
+        return bool(self._drop_names or self._drop_function is not None)
+
+    def _transforms_strings(self):
+        """Does `SoupReplacer.transform_string` ever do anything?"""
+        return self.string_xformer is not None
+
+    def _affected_names(self):
+        """The names of the only tags this replacer can change or drop,
+        or None if it might do something to any tag or string.
+        """
+        if (
+            self.name_xformer
+            or self.xformer
+            or self.attrs_xformer
+            or self.string_xformer
+            or self._drop_function is not None
+            or self._default_attribute_rule is not None
+        ):
+            return None
+        # Attribute rules and dropped names refer to a tag's name after
+        # renaming, but a tag that's renamed is found by its old name.
+        return (
+            frozenset(self._renames or ())
+            | frozenset(self._attribute_rules)
+            | self._drop_names
+        )
+
+
+def _timed(function, timing):
+    """Wrap a function so that calls to it are counted and timed in
+    ``timing``.
+    """
+
+    def timed(*args):
+        start = time.perf_counter()
+        try:
+            return function(*args)
+        finally:
+            elapsed = time.perf_counter() - start
+            timing["calls"] += 1
+            timing["total_time"] += elapsed
+            if elapsed > timing["max_time"]:
+                timing["max_time"] = elapsed
+
+    return timed
+
+
+class ReplacerPipeline(SoupReplacer):
+    """
+    Chains several SoupReplacers together, so they're all applied in
+    one pass as each tag is created::
+
+     pipeline = ReplacerPipeline(renamer, sanitizer)
+     pipeline.add(SoupReplacer(xformer=fix_links), names={"a"})
+     soup = BeautifulSoup(markup, "html.parser", replacer=pipeline)
+
+    The stages run in the order they were added. A stage can be
+    limited to tags with certain names. If a stage's xformer returns
+    `SoupReplacer.STOP`, later stages don't see the tag.
+
+    Renaming happens before a tag is created, so every stage's renames
+    are applied, in order, before anything else; even to a tag that a
+    stage later stops. A stage's names are checked against the name
+    the tag has when the stage runs, which for everything other than
+    renaming is the tag's final name.
+    """
+
+    def __init__(self, *replacers, profile=False):
+        super(ReplacerPipeline, self).__init__()
+        self.stages: List[Tuple[SoupReplacer, Optional[FrozenSet[str]]]] = []
+        # The stages that actually do something for each kind of
+        # work, so the others can be skipped.
+        self._replace_stages: List[Tuple[SoupReplacer, Optional[FrozenSet[str]]]] = []
+        self._drop_stages: List[Tuple[SoupReplacer, Optional[FrozenSet[str]]]] = []
+        self._string_stages: List[Tuple[SoupReplacer, Optional[FrozenSet[str]]]] = []
+        for replacer in replacers:
+            self.add(replacer)
+        if profile:
+            self.enable_profiling()
+
+    def add(self, replacer, names=None):
+        """Add a stage to the end of the pipeline.
+
+        :param replacer: A `SoupReplacer` (or another pipeline).
+        :param names: If given, the stage only applies to tags with
+            one of these names.
+        :return: This pipeline, so calls can be chained.
+        """
+        if self._stats is not None:
+            replacer.enable_profiling()
+        stage = (replacer, None if names is None else frozenset(names))
+        self.stages.append(stage)
+        if replacer._replaces_anything():
+            self._replace_stages.append(stage)
+        if replacer._drops_anything():
+            self._drop_stages.append(stage)
+        if replacer._transforms_strings():
+            self._string_stages.append(stage)
+        return self
+
+    def rename(self, name):
+        """Run the name through each stage's renames in turn."""
+        for replacer, names in self.stages:
+            if names is None or name in names:
+                name = replacer.rename(name)
+        return name
+
+    def replace(self, tag):
+        """Run the tag through each stage in turn."""
+        for replacer, names in self._replace_stages:
+            if names is None or tag.name in names:
+                if replacer.replace(tag) is SoupReplacer.STOP:
+                    return SoupReplacer.STOP
+        return None
+
+    def drops(self, name, attrs):
+        """A tag is dropped if any stage that applies to it says so."""
+        for replacer, names in self._drop_stages:
+            if (names is None or name in names) and replacer.drops(name, attrs):
+                return True
+        return False
+
+    def transform_string(self, text, parent):
+        """Run the text through each stage in turn. A stage's names are
+        checked against the name of the tag that contains the string.
+        """
+        for replacer, names in self._string_stages:
+            if names is None or (parent is not None and parent.name in names):
+                text = replacer.transform_string(text, parent)
+                if text is None:
+                    return None
+        return text
+
+    def enable_profiling(self):
+        """Profile the pipeline as a whole, and each of its stages."""
+        for replacer, names in self.stages:
+            replacer.enable_profiling()
+        return super(ReplacerPipeline, self).enable_profiling()
+
+    def stats(self):
+        """Like `SoupReplacer.stats`, with one more key: "stages", which
+        holds the stats for each stage, in order.
+        """
+        stats = super(ReplacerPipeline, self).stats()
+        if stats is not None:
+            stats["stages"] = [replacer.stats() for replacer, names in self.stages]
+        return stats
+
+    def _replaces_anything(self):
+        return bool(self._replace_stages)
+
+    def _drops_anything(self):
+        return bool(self._drop_stages)
+
+    def _transforms_strings(self):
+        return bool(self._string_stages)
+
+    def _affected_names(self):
+        if self._string_stages:
+            return None
+        affected = set()
+        for replacer, names in self.stages:
+            stage_names = replacer._affected_names()
+            if stage_names is None:
+                # A stage limited to certain names can only affect tags
+                # that have one of those names by the time it runs.
+                stage_names = names
+            if stage_names is None:
+                return None
+            affected.update(stage_names)
+        return frozenset(affected)
     #   SoupReplacer create soup
    
 # --- M4 Implementation Start ---
@@ -448,6 +872,69 @@ class ContentMetaAttributeValue(AttributeValueWithCharsetSubstitution):
         return self.CHARSET_RE.sub(rewrite, self.original_value)
 
 
+def _digest_part(marker: bytes, value: Any) -> bytes:
+    """Encode one piece of the input to `Tag.digest` so that
+    adjacent pieces can't run together.
+    """
+    data = str(value).encode("utf8", "surrogatepass")
+    return marker + len(data).to_bytes(8, "little") + data
+
+
+class _ChunkedWriter(object):
+    """Collect the pieces of a rendered document and write them to a
+    stream in large chunks, used by `Tag.write_to`.
+    """
+
+    #: Write to the stream whenever this many characters have built up.
+    CHUNK_SIZE: int = 64 * 1024
+
+    def __init__(self, fp: IO[Any], encoding: Optional[_Encoding], errors: str):
+        self.fp = fp
+        self.encoder: Optional[codecs.IncrementalEncoder] = None
+        if encoding is not None and self.is_binary(fp):
+            self.encoder = codecs.getincrementalencoder(encoding)(errors)
+        self.pieces: List[str] = []
+        self.size = 0
+
+    @classmethod
+    def is_binary(cls, fp: IO[Any]) -> bool:
+        """Does this stream take bytes rather than strings?
+
+        A stream is binary if it's one of the standard binary streams
+        (e.g. a file opened in binary mode, or a `io.BytesIO`), or if
+        it says so in its ``mode``. Anything else, such as a
+        `codecs.StreamWriter` or an object that just has a ``write``
+        method, is given strings.
+        """
+        if isinstance(fp, (io.RawIOBase, io.BufferedIOBase)):
+            return True
+        if isinstance(fp, io.TextIOBase):
+            return False
+        mode = getattr(fp, "mode", None)
+        return isinstance(mode, str) and "b" in mode
+
+    def write(self, piece: str) -> None:
+        self.pieces.append(piece)
+        self.size += len(piece)
+        if self.size >= self.CHUNK_SIZE:
+            self.flush()
+
+    def flush(self, final: bool = False) -> None:
+        chunk = "".join(self.pieces)
+        self.pieces = []
+        self.size = 0
+        if self.encoder is None:
+            if chunk:
+                self.fp.write(chunk)
+            return
+        data = self.encoder.encode(chunk, final)
+        if data:
+            self.fp.write(data)
+
+    def close(self) -> None:
+        self.flush(final=True)
+
+
 class PageElement(object):
     """An abstract class representing a single element in the parse tree.
 
@@ -464,11 +951,25 @@ class PageElement(object):
     #: :meta private:
     known_xml: Optional[bool] = None
 
+    #: The `TreeIndex` for the tree rooted at this element, if that
+    #: tree is indexed. Only a `BeautifulSoup` object ever has one.
+    #: :meta private:
+    _index: Optional[TreeIndex] = None
+
+    #: Set on every `Tag` in an indexed tree while the index is in
+    #: use, so the tag can find the index without looking for the
+    #: root of the tree. See `TreeIndex` for details.
+    #: :meta private:
+    _index_stamp: Optional[_IndexStamp] = None
+
     #: Whether or not this element has been decomposed from the tree
     #: it was created in.
-    _decomposed: bool
+    _decomposed: bool = False
 
-    parent: Optional[Tag]
+    # A default, so that a Tag that's still being created (e.g. one
+    # being passed through a SoupReplacer) looks like it has no parent
+    # instead of triggering a search.
+    parent: Optional[Tag] = None
     next_element: _AtMostOneElement
     previous_element: _AtMostOneElement
     next_sibling: _AtMostOneElement
@@ -698,7 +1199,10 @@ class PageElement(object):
 
         :return: this `PageElement`, no longer part of the tree.
         """
+        index = None
         if self.parent is not None:
+            index = self._tree_index()
+            self.parent.invalidate_digest()
             if _self_index is None:
                 _self_index = self.parent.index(self)
             del self.parent.contents[_self_index]
@@ -735,8 +1239,30 @@ class PageElement(object):
         ):
             self.next_sibling.previous_sibling = self.previous_sibling
         self.previous_sibling = self.next_sibling = None
+        if index is not None:
+            index.element_removed(self)
         return self
 
+    def _tree_index(self) -> Optional[TreeIndex]:
+        """Find the `TreeIndex` for the tree containing this element,
+        if there is one and it needs to hear about changes to the tree.
+        """
+        stamp = self._index_stamp
+        if stamp is None:
+            if self._index is not None:
+                # This is the root of an indexed tree.
+                return self._index
+            # Strings aren't stamped, but their parents are.
+            parent = self.parent
+            if parent is None:
+                return None
+            if parent._index is not None:
+                return parent._index
+            stamp = parent._index_stamp
+            if stamp is None:
+                return None
+        return stamp.index
+
     def decompose(self) -> None:
         """Recursively destroys this `PageElement` and its children.
 
@@ -1348,7 +1874,7 @@ class PageElement(object):
     @property
     def decomposed(self) -> bool:
         """Check whether a PageElement has been decomposed."""
-        return getattr(self, "_decomposed", False) or False
+        return self._decomposed
 
     @_deprecated("next_elements", "4.0.0")
     def nextGenerator(self) -> Iterator[PageElement]:
@@ -1855,6 +2381,15 @@ class Tag(PageElement):
     hidden: bool
     interesting_string_types: Optional[Set[Type[NavigableString]]]
 
+    #: The cached result of `Tag.digest`.
+    _digest: Optional[bytes] = None
+
+    #: A cached digest of the names and strings in this tag and the
+    #: tags beneath it, without their attributes. Nothing it covers
+    #: can change without the cache being cleared, so unlike `_digest`
+    #: it's never out of date. It's calculated along with `_digest`.
+    _structure_digest: Optional[bytes] = None
+
     can_be_empty_element: Optional[bool]
     cdata_list_attributes: Optional[Dict[str, Set[str]]]
     preserve_whitespace_tags: Optional[Set[str]]
@@ -2123,7 +2658,13 @@ class Tag(PageElement):
                 new_childs_last_element
             )
         self.contents.insert(position, new_child)
+        self.invalidate_digest()
 
+        index = self._tree_index()
+        if index is not None:
+            index.element_inserted(
+                new_child, new_childs_last_element.next_element is None
+            )
         return [new_child]
 
     def unwrap(self) -> Self:
@@ -2305,7 +2846,109 @@ class Tag(PageElement):
         return key in self.attrs
 
     def __hash__(self) -> int:
-        return str(self).__hash__()
+        """A hash that agrees with `Tag.__eq__`.
+
+        It combines a cached digest of the names and strings in this
+        tree (which can't change without Beautiful Soup noticing) with
+        this tag's own attributes, as they are right now. So unlike
+        `Tag.digest`, it never needs `Tag.invalidate_digest` to stay
+        correct.
+        """
+        if self._structure_digest is None:
+            self.digest()
+        parts = [cast(bytes, self._structure_digest)]
+        parts.extend(self._attribute_digest_parts())
+        return int.from_bytes(
+            hashlib.blake2b(b"".join(parts), digest_size=8).digest(), "little"
+        )
+
+    def digest(self) -> bytes:
+        """Calculate a structural digest of this `Tag`.
+
+        The digest covers the same things `Tag.__eq__` compares: the
+        tag's name, its attributes, and (recursively) its contents. Two
+        equal tags always have the same digest, and it's stable across
+        processes, so it can be stored and compared later.
+
+        Each `Tag` caches its digest. The cache is cleared along the
+        path to the root of the tree when the tree is changed through
+        methods like `Tag.insert`, `PageElement.extract` and
+        `Tag.__setitem__`, or by setting `Tag.name` or `Tag.attrs`, so
+        only the changed parts of a tree are looked at again.
+
+        Some changes aren't noticed: modifying the ``attrs``
+        dictionary directly, or modifying a multi-valued attribute in
+        place (for instance, ``tag['class'].append('new')``). After a
+        change like that, call `Tag.invalidate_digest` on the tag.
+        Until you do, `Tag.digest` gives the old answer. ``hash()``
+        and ``==`` don't depend on this.
+
+        :return: A 16-byte BLAKE2b digest.
+        """
+        if self._digest is not None:
+            return self._digest
+        _watch_names_and_attrs()
+
+        # Work out the digests of the tags beneath this one, children
+        # before parents, without making recursive function calls.
+        stack: List[Tuple[Tag, bool]] = [(self, False)]
+        while stack:
+            tag, children_done = stack.pop()
+            if children_done:
+                tag._digest, tag._structure_digest = tag._calculate_digests()
+                continue
+            stack.append((tag, True))
+            for child in tag.contents:
+                if isinstance(child, Tag) and child._digest is None:
+                    stack.append((child, False))
+        return cast(bytes, self._digest)
+
+    def invalidate_digest(self) -> None:
+        """Clear the cached digests of this `Tag` and its parents."""
+        tag: Optional[Tag] = self
+        # If a tag has a digest, so do all the tags beneath it, so
+        # we can stop at the first tag that doesn't.
+        while tag is not None and tag._digest is not None:
+            tag._digest = tag._structure_digest = None
+            tag = tag.parent
+
+    def _attribute_digest_parts(self) -> List[bytes]:
+        """Encode this tag's attributes for a digest."""
+        parts = []
+        for key in sorted(self.attrs):
+            value = self.attrs[key]
+            parts.append(_digest_part(b"K", key))
+            if isinstance(value, list):
+                parts.append(b"L" + len(value).to_bytes(8, "little"))
+                for item in value:
+                    parts.append(_digest_part(b"V", item))
+            else:
+                parts.append(_digest_part(b"V", value))
+        return parts
+
+    def _calculate_digests(self) -> Tuple[bytes, bytes]:
+        """Combine this tag's name and attributes with the (already
+        calculated) digests of its children.
+
+        :return: The values for `Tag._digest` and
+            `Tag._structure_digest`.
+        """
+        name = _digest_part(b"N", self.name)
+        parts = [name]
+        parts.extend(self._attribute_digest_parts())
+        structure = [name]
+        for child in self.contents:
+            if isinstance(child, Tag):
+                parts.append(b"T" + cast(bytes, child._digest))
+                structure.append(b"T" + cast(bytes, child._structure_digest))
+            else:
+                part = _digest_part(b"S", child)
+                parts.append(part)
+                structure.append(part)
+        return (
+            hashlib.blake2b(b"".join(parts), digest_size=16).digest(),
+            hashlib.blake2b(b"".join(structure), digest_size=16).digest(),
+        )
 
     def __getitem__(self, key: str) -> _AttributeValue:
         """tag[key] returns the value of the 'key' attribute for the Tag,
@@ -2330,11 +2973,23 @@ class Tag(PageElement):
     def __setitem__(self, key: str, value: _AttributeValue) -> None:
         """Setting tag[key] sets the value of the 'key' attribute for the
         tag."""
+        index = self._tree_index()
+        if index is not None:
+            index.attribute_changing(self, key)
         self.attrs[key] = value
+        self.invalidate_digest()
+        if index is not None:
+            index.attribute_changed(self, key)
 
     def __delitem__(self, key: str) -> None:
         "Deleting tag[key] deletes all 'key' attributes for the tag."
+        index = self._tree_index()
+        if index is not None:
+            index.attribute_changing(self, key)
         self.attrs.pop(key, None)
+        self.invalidate_digest()
+        if index is not None:
+            index.attribute_changed(self, key)
 
     def __call__(
         self,
@@ -2378,11 +3033,21 @@ class Tag(PageElement):
 
     def __eq__(self, other: Any) -> bool:
         """Returns true iff this Tag has the same name, the same attributes,
-        and the same contents (recursively) as `other`."""
+        and the same contents (recursively) as `other`.
+
+        If both tags have cached digests, tags with different names,
+        strings or structure are told apart without looking at their
+        contents.
+        """
         if self is other:
             return True
         if not isinstance(other, Tag):
             return False
+        mine = self._structure_digest
+        if mine is not None:
+            theirs = other._structure_digest
+            if theirs is not None and mine != theirs:
+                return False
         if (
             not hasattr(other, "name")
             or not hasattr(other, "attrs")
@@ -2438,6 +3103,54 @@ class Tag(PageElement):
         u = self.decode(indent_level, encoding, formatter)
         return u.encode(encoding, errors)
 
+    def write_to(
+        self,
+        fp: IO[Any],
+        encoding: Optional[_Encoding] = DEFAULT_OUTPUT_ENCODING,
+        formatter: _FormatterOrName = "minimal",
+        pretty: bool = False,
+        errors: str = "xmlcharrefreplace",
+    ) -> None:
+        """Render this `Tag` and its contents into a file-like object.
+
+        The output is written a chunk at a time as the tree is
+        traversed, so the whole document never has to be held in
+        memory as one string. The bytes written are the same as the
+        return value of `Tag.encode` (or `Tag.prettify`, if ``pretty``
+        is True)::
+
+         with open("out.html", "wb") as fp:
+             soup.write_to(fp)
+
+        :param fp: A binary stream (such as a file opened in binary
+            mode) or a text stream. A text stream is given strings,
+            and does its own encoding. Any stream that isn't
+            recognizably binary is treated as a text stream.
+        :param encoding: The encoding of the output. This may also
+            affect the text of the document, specifically any encoding
+            declarations within the document. If this is None, ``fp``
+            is treated as a text stream.
+        :param formatter: Either a `Formatter` object, or a string
+            naming one of the standard formatters.
+        :param pretty: If this is True, the output is pretty-printed.
+        :param errors: An error handling strategy such as
+            'xmlcharrefreplace', used when encoding the output for a
+            binary stream. See `Tag.encode`.
+        """
+        writer = _ChunkedWriter(fp, encoding, errors)
+        writer.write(self._output_prefix(encoding))
+        self._write_pieces(
+            writer.write, 0 if pretty else None, encoding, formatter, None
+        )
+        writer.close()
+
+    def _output_prefix(self, eventual_encoding: _Encoding) -> str:
+        """Any text that goes before this `Tag` when it's rendered as
+        a document. A `Tag` has none, but a `BeautifulSoup` object
+        representing an XML document starts with an XML declaration.
+        """
+        return ""
+
     def decode(
         self,
         indent_level: Optional[int] = None,
@@ -2464,7 +3177,25 @@ class Tag(PageElement):
             parse tree. This is only used by `Tag.decode_contents` and
             you probably won't need to use it.
         """
-        pieces = []
+        pieces: List[str] = []
+        self._write_pieces(
+            pieces.append, indent_level, eventual_encoding, formatter, iterator
+        )
+        return "".join(pieces)
+
+    def _write_pieces(
+        self,
+        write: Callable[[str], Any],
+        indent_level: Optional[int],
+        eventual_encoding: _Encoding,
+        formatter: _FormatterOrName,
+        iterator: Optional[Iterator[PageElement]],
+    ) -> None:
+        """Render this `Tag` and its contents, passing each piece of
+        the output into ``write`` as it's ready.
+
+        The arguments are the same as for `Tag.decode`.
+        """
         # First off, turn a non-Formatter `formatter` into a Formatter
         # object. This will stop the lookup from happening over and
         # over again.
@@ -2474,6 +3205,14 @@ class Tag(PageElement):
         if indent_level is True:
             indent_level = 0
 
+        if (
+            indent_level is None
+            and iterator is None
+            and self._can_write_quickly(formatter)
+        ):
+            self._write_quickly(write, eventual_encoding, formatter, True)
+            return
+
         # The currently active tag that put us into string literal
         # mode. Until this element is closed, children will be treated
         # as string literals and not pretty-printed. String literal
@@ -2544,8 +3283,113 @@ class Tag(PageElement):
                         )
                 if event == Tag.START_ELEMENT_EVENT:
                     indent_level += 1
-            pieces.append(piece)
-        return "".join(pieces)
+            if piece:
+                write(piece)
+
+    @staticmethod
+    def _can_write_quickly(formatter: Formatter) -> bool:
+        """Can `Tag._write_quickly` stand in for the general-purpose
+        code in `Tag._write_pieces`, when using this formatter?
+
+        It can for the built-in formatters, and for any other
+        formatter that doesn't change how `Formatter` works.
+        """
+        return type(formatter) in (HTMLFormatter, XMLFormatter)
+
+    def _write_quickly(
+        self,
+        write: Callable[[str], Any],
+        eventual_encoding: _Encoding,
+        formatter: Formatter,
+        include_self: bool,
+    ) -> None:
+        """Render this `Tag` without pretty-printing.
+
+        This produces the same output as `Tag._write_pieces`, but it
+        walks `Tag.contents` directly and builds each tag's markup in
+        one go, which makes it several times faster.
+
+        :param include_self: If this is False, only the contents
+            of this tag will be rendered.
+        """
+        append = write
+        substitute = formatter.entity_substitution
+        cdata_containing_tags = formatter.cdata_containing_tags
+        void_element_close_prefix = formatter.void_element_close_prefix or ""
+        empty_attributes_are_booleans = formatter.empty_attributes_are_booleans
+        attribute_value = formatter.attribute_value
+        quoted_attribute_value = formatter.quoted_attribute_value
+
+        # Each item on the stack is a tag that's been opened, and an
+        # iterator over the parts of its contents not yet rendered.
+        start: List[PageElement] = [self] if include_self else self.contents
+        stack: List[Tuple[Optional[Tag], Iterator[PageElement]]] = [
+            (None, iter(start))
+        ]
+        while stack:
+            open_tag, children = stack[-1]
+            for element in children:
+                if element.__class__ is NavigableString:
+                    parent = element.parent
+                    if substitute is None or (
+                        parent is not None and parent.name in cdata_containing_tags
+                    ):
+                        append(element)
+                    else:
+                        append(substitute(element))
+                    continue
+                if not isinstance(element, Tag):
+                    append(cast(NavigableString, element).output_ready(formatter))
+                    continue
+
+                tag = element
+                contents = tag.contents
+                if not tag.hidden:
+                    if tag.prefix:
+                        name = tag.prefix + ":" + tag.name
+                    else:
+                        name = tag.name
+                    markup = "<" + name
+                    if tag.attrs:
+                        for key, val in sorted(tag.attrs.items()):
+                            if val is None or (
+                                empty_attributes_are_booleans and val == ""
+                            ):
+                                markup += " " + key
+                                continue
+                            if isinstance(val, (list, tuple)):
+                                val = " ".join(val)
+                            elif not isinstance(val, str):
+                                val = str(val)
+                            elif (
+                                isinstance(val, AttributeValueWithCharsetSubstitution)
+                                and eventual_encoding is not None
+                            ):
+                                val = val.substitute_encoding(eventual_encoding)
+                            markup += (
+                                " "
+                                + str(key)
+                                + "="
+                                + quoted_attribute_value(attribute_value(val))
+                            )
+                    if not contents and tag.can_be_empty_element:
+                        # This is a void element; there's no closing tag.
+                        append(markup + void_element_close_prefix + ">")
+                        continue
+                    append(markup + ">")
+                if contents:
+                    stack.append((tag, iter(contents)))
+                    break
+                if not tag.hidden:
+                    append("</" + name + ">")
+            else:
+                # Everything inside open_tag has been rendered.
+                stack.pop()
+                if open_tag is not None and not open_tag.hidden:
+                    if open_tag.prefix:
+                        append("</" + open_tag.prefix + ":" + open_tag.name + ">")
+                    else:
+                        append("</" + open_tag.name + ">")
 
     class _TreeTraversalEvent(object):
         """An internal class representing an event in the process
@@ -2586,7 +3430,7 @@ class Tag(PageElement):
             # If the parent of the element we're about to yield is not
             # the tag currently on the stack, it means that the tag on
             # the stack closed before this element appeared.
-            while tag_stack and c.parent != tag_stack[-1]:
+            while tag_stack and c.parent is not tag_stack[-1]:
                 now_closed_tag = tag_stack.pop()
                 yield Tag.END_ELEMENT_EVENT, now_closed_tag
 
@@ -2747,6 +3591,13 @@ class Tag(PageElement):
         :param formatter: A `Formatter` object, or a string naming one of
             the standard Formatters.
         """
+        if indent_level is None:
+            if not isinstance(formatter, Formatter):
+                formatter = self.formatter_for_name(formatter)
+            if self._can_write_quickly(formatter):
+                pieces = [self._output_prefix(eventual_encoding)]
+                self._write_quickly(pieces.append, eventual_encoding, formatter, False)
+                return "".join(pieces)
         return self.decode(
             indent_level, eventual_encoding, formatter, iterator=self.descendants
         )
@@ -2844,6 +3695,15 @@ class Tag(PageElement):
         :param _stacklevel: Used internally to improve warning messages.
         :kwargs: Additional filters on attribute values.
         """
+        if recursive and string is None:
+            # If the document is indexed, we may be able to look up
+            # the answer instead of searching for it.
+            index = self._tree_index()
+            if index is not None:
+                found = index.find_all(self, name, attrs, limit, kwargs)
+                if found is not None:
+                    return found
+
         generator = self.descendants
         if not recursive:
             generator = self.children
@@ -2931,6 +3791,10 @@ class Tag(PageElement):
     @property
     def css(self) -> CSS:
         """Return an interface to the CSS selector API."""
+        # Importing bs4.css imports soupsieve, so it's put off until
+        # it's needed.
+        from bs4.css import CSS
+
         return CSS(self)
 
     # Old names for backwards compatibility
@@ -2962,6 +3826,66 @@ class Tag(PageElement):
         return self.has_attr(key)
 
 
+def _get_tag_name(tag: Tag) -> str:
+    try:
+        return tag.__dict__["name"]
+    except KeyError:
+        raise AttributeError("name")
+
+
+def _set_tag_name(tag: Tag, name: str) -> None:
+    stamp = tag._index_stamp
+    index = None if stamp is None else stamp.index
+    if index is None:
+        tag.__dict__["name"] = name
+    else:
+        index.name_changing(tag)
+        tag.__dict__["name"] = name
+        index.name_changed(tag)
+    if tag._digest is not None:
+        tag.invalidate_digest()
+
+
+def _get_tag_attrs(tag: Tag) -> _AttributeValues:
+    try:
+        return tag.__dict__["attrs"]
+    except KeyError:
+        raise AttributeError("attrs")
+
+
+def _set_tag_attrs(tag: Tag, attrs: _AttributeValues) -> None:
+    stamp = tag._index_stamp
+    index = None if stamp is None else stamp.index
+    if index is None:
+        tag.__dict__["attrs"] = attrs
+    else:
+        index.attrs_replacing(tag)
+        tag.__dict__["attrs"] = attrs
+        index.attrs_replaced(tag)
+    if tag._digest is not None:
+        tag.invalidate_digest()
+
+
+def _watch_names_and_attrs() -> None:
+    """Make setting `Tag.name` or `Tag.attrs` update any `TreeIndex`
+    the tag is filed in, and clear any cached digests that cover it.
+
+    ``name`` and ``attrs`` are plain instance attributes until a
+    `TreeIndex` is created or a digest is cached, so a program that
+    uses neither doesn't pay for a property on every access. The
+    properties keep the values in the instance dictionary, so tags
+    created before this is called work the same as tags created
+    after.
+    """
+    if not isinstance(Tag.__dict__.get("name"), property):
+        Tag.name = property(  # type:ignore
+            _get_tag_name, _set_tag_name, doc="The name of this tag, e.g. 'p'."
+        )
+        Tag.attrs = property(  # type:ignore
+            _get_tag_attrs, _set_tag_attrs, doc="This tag's attributes."
+        )
+
+
 _PageElementT = TypeVar("_PageElementT", bound=PageElement)
 
 
@@ -69,6 +69,20 @@ class ElementFilter(object):
 
     match_function: Optional[_PageElementMatchFunction]
 
+    #: Possible return values of `ElementFilter.tag_decision`. A tag
+    #: can be kept (turned into a `Tag`), skipped along with
+    #: everything inside it, or dropped while its contents are
+    #: considered as though the tag itself weren't there.
+    KEEP: str = "keep"
+    SKIP: str = "skip"
+    DESCEND: str = "descend"
+
+    #: If this is False, then during parsing, the `ElementFilter` is
+    #: only consulted about top-level markup; once a tag is kept,
+    #: everything inside it is kept. If this is True, it's consulted
+    #: about every tag in the document, no matter how deeply nested.
+    applies_at_every_depth: bool = False
+
     def __init__(self, match_function: Optional[_PageElementMatchFunction] = None):
         """Pass in a match function to easily customize the behavior of
         `ElementFilter.match` without needing to subclass.
@@ -169,6 +183,25 @@ class ElementFilter(object):
         """
         return True
 
+    def tag_decision(
+        self, nsprefix: Optional[str], name: str, attrs: Optional[_RawAttributeValues]
+    ) -> str:
+        """Based on the name and attributes of a tag, decide what should
+        happen to it during parsing.
+
+        By default, a tag is kept if `ElementFilter.allow_tag_creation`
+        allows it, and otherwise Beautiful Soup descends into it
+        without keeping it.
+
+        :param name: The name of the prospective tag.
+        :param attrs: The attributes of the prospective tag.
+        :return: `ElementFilter.KEEP`, `ElementFilter.SKIP`, or
+            `ElementFilter.DESCEND`.
+        """
+        if self.allow_tag_creation(nsprefix, name, attrs):
+            return self.KEEP
+        return self.DESCEND
+
     def allow_string_creation(self, string: str) -> bool:
         """Based on the content of a string, see whether this
         `ElementFilter` will allow a `NavigableString` object based on
@@ -680,3 +713,84 @@ class SoupStrainer(ElementFilter):
         :meta private:
         """
         return element if self.match(element) else None
+
+
+class PruningStrainer(ElementFilter):
+    """An `ElementFilter` that prunes the parse tree at every depth,
+    not just at the top level.
+
+    Pass one in as ``parse_only`` to the `BeautifulSoup` constructor
+    when you only want to extract part of a document. Unwanted tags
+    and strings are never turned into `PageElement` objects, which
+    saves both time and memory::
+
+     strainer = PruningStrainer(
+         keep=SoupStrainer(["p", "a"]),
+         skip=SoupStrainer(["script", "style", "nav"]),
+     )
+     soup = BeautifulSoup(markup, "html.parser", parse_only=strainer)
+
+    Each tag in the document gets one of three decisions:
+
+    * If it matches ``skip``, the tag and everything inside it is
+      ignored.
+    * If it matches ``keep`` (or ``keep`` is None), the tag is kept.
+    * Otherwise, the tag itself is dropped but its contents are
+      considered as though they'd been found in its parent.
+
+    Strings inside a kept tag are kept. Strings outside any kept tag
+    are only kept if ``keep`` is None.
+
+    :param keep: An `ElementFilter` (usually a `SoupStrainer`)
+      describing the tags to keep. Only the name and attributes of a
+      tag are considered, so string rules have no effect.
+    :param skip: An `ElementFilter` describing the tags whose entire
+      subtrees should be ignored.
+    """
+
+    applies_at_every_depth: bool = True
+
+    keep: Optional[ElementFilter]
+    skip: Optional[ElementFilter]
+
+    def __init__(
+        self,
+        keep: Optional[ElementFilter] = None,
+        skip: Optional[ElementFilter] = None,
+    ):
+        super(PruningStrainer, self).__init__()
+        self.keep = keep
+        self.skip = skip
+
+    def __repr__(self) -> str:
+        return f"<{self.__class__.__name__} keep={self.keep} skip={self.skip}>"
+
+    def tag_decision(
+        self, nsprefix: Optional[str], name: str, attrs: Optional[_RawAttributeValues]
+    ) -> str:
+        """See `ElementFilter.tag_decision`."""
+        if self.skip is not None and self.skip.allow_tag_creation(
+            nsprefix, name, attrs
+        ):
+            return self.SKIP
+        if self.keep is None or self.keep.allow_tag_creation(nsprefix, name, attrs):
+            return self.KEEP
+        return self.DESCEND
+
+    def allow_tag_creation(
+        self, nsprefix: Optional[str], name: str, attrs: Optional[_RawAttributeValues]
+    ) -> bool:
+        """See `ElementFilter.allow_tag_creation`."""
+        return self.tag_decision(nsprefix, name, attrs) == self.KEEP
+
+    def allow_string_creation(self, string: str) -> bool:
+        """Strings outside of any kept tag are only kept if there are
+        no rules about which tags to keep.
+        """
+        return self.keep is None
+
+    def match(self, element: PageElement) -> bool:
+        """Would this element have been kept during parsing?"""
+        if isinstance(element, Tag):
+            return self.allow_tag_creation(element.prefix, element.name, element.attrs)
+        return self.keep is None
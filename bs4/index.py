@@ -0,0 +1,600 @@
+"""Indexes that let a `BeautifulSoup` object answer common queries
+without walking the entire parse tree.
+
+Indexing is turned on by passing ``indexed=True`` into the
+`BeautifulSoup` constructor. You don't normally need to use anything
+in this module directly; `Tag.find_all`, `Tag.find` (and so shortcuts
+like ``soup.title``) and `Tag.select` consult the index automatically
+when the query allows it.
+"""
+
+from __future__ import annotations
+
+import re
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Tuple,
+    TYPE_CHECKING,
+)
+
+from bs4.element import (
+    PageElement,
+    ResultSet,
+    Tag,
+    _watch_names_and_attrs,
+)
+from bs4.filter import SoupStrainer
+
+if TYPE_CHECKING:
+    from bs4.element import _FindMethodName
+    from bs4._typing import (
+        _StrainableAttribute,
+        _StrainableAttributes,
+    )
+
+
+def _name_keys(tag: Tag) -> List[str]:
+    return [tag.name]
+
+
+def _name_matches(tag: Tag, key: str) -> bool:
+    return tag.name == key
+
+
+def _attribute_keys(tag: Tag, attribute: str, split: bool) -> List[str]:
+    """The keys under which a `Tag` is filed in an attribute index.
+
+    :param split: If the attribute has a single string value, split
+        it on whitespace. This is how CSS treats the 'class' attribute
+        of an XML document, where it's not a multi-valued attribute.
+    """
+    value = tag.attrs.get(attribute)
+    if value is None:
+        return []
+    if isinstance(value, list):
+        return [x for x in value if x]
+    if split:
+        return value.split()
+    return [value] if value else []
+
+
+def _attribute_matches(tag: Tag, attribute: str, key: str) -> bool:
+    """Would a query for the single string ``key`` as the value of an
+    attribute match a `Tag`? This is how `SoupStrainer` answers that
+    question.
+    """
+    value = tag.attrs.get(attribute)
+    if isinstance(value, list):
+        return key in value
+    return value == key
+
+
+def _id_keys(tag: Tag) -> List[str]:
+    return _attribute_keys(tag, "id", False)
+
+
+def _id_matches(tag: Tag, key: str) -> bool:
+    return _attribute_matches(tag, "id", key)
+
+
+def _class_keys(tag: Tag) -> List[str]:
+    return _attribute_keys(tag, "class", True)
+
+
+def _class_matches(tag: Tag, key: str) -> bool:
+    return _attribute_matches(tag, "class", key)
+
+
+class _TagMap(object):
+    """Maps keys to the `Tag` objects filed under them, in document
+    order.
+    """
+
+    #: Finds the keys to file a `Tag` under.
+    keys: Callable[[Tag], List[str]]
+
+    #: Checks whether a query for nothing but a given key matches a
+    #: `Tag`. This is normally true of every tag filed under the key,
+    #: but not of a tag whose attributes changed behind the index's
+    #: back.
+    matches: Callable[[Tag, str], bool]
+
+    # Key -> {id(tag): tag}. A dict is used as an ordered set so that
+    # a tag can be removed without a linear search.
+    tags: Dict[str, Dict[int, Tag]]
+
+    def __init__(
+        self, keys: Callable[[Tag], List[str]], matches: Callable[[Tag, str], bool]
+    ):
+        self.keys = keys
+        self.matches = matches
+        self.tags = {}
+
+    def add(self, tags: List[Tag], in_order: bool) -> None:
+        """File some tags.
+
+        :param tags: Tags in document order. If there's more than one,
+            they must be a `Tag` and the tags beneath it.
+        :param in_order: Whether these tags come after every tag
+            already in the map.
+        """
+        if in_order:
+            for tag in tags:
+                for key in self.keys(tag):
+                    bucket = self.tags.get(key)
+                    if bucket is None:
+                        bucket = self.tags[key] = {}
+                    bucket[id(tag)] = tag
+            return
+
+        new: Dict[str, List[Tag]] = {}
+        for tag in tags:
+            for key in self.keys(tag):
+                new.setdefault(key, []).append(tag)
+        for key, new_tags in new.items():
+            bucket = self.tags.get(key)
+            if bucket is None:
+                self.tags[key] = {id(tag): tag for tag in new_tags}
+                continue
+            # A tag that's renamed while a SoupReplacer is changing it
+            # is filed once by the name setter and again afterwards.
+            new_tags = [tag for tag in new_tags if id(tag) not in bucket]
+            if new_tags:
+                self.tags[key] = self._insert(bucket, new_tags)
+
+    @classmethod
+    def _insert(cls, bucket: Dict[int, Tag], new_tags: List[Tag]) -> Dict[int, Tag]:
+        """Put some tags into their place in document order.
+
+        :return: A new bucket.
+        """
+        # Look outwards from the new tags for the nearest tag that's
+        # already in the bucket, in either direction.
+        before = new_tags[0].previous_element
+        after = new_tags[-1].next_element
+        position = len(bucket)
+        while before is not None or after is not None:
+            if before is not None:
+                if id(before) in bucket:
+                    position = list(bucket).index(id(before)) + 1
+                    break
+                before = before.previous_element
+            if after is not None:
+                if id(after) in bucket:
+                    position = list(bucket).index(id(after))
+                    break
+                after = after.next_element
+        items = list(bucket.items())
+        items[position:position] = [(id(tag), tag) for tag in new_tags]
+        return dict(items)
+
+    def remove(self, tags: List[Tag]) -> None:
+        """Take some tags out of the map."""
+        for tag in tags:
+            for key in self.keys(tag):
+                bucket = self.tags.get(key)
+                if bucket is not None:
+                    bucket.pop(id(tag), None)
+                    if not bucket:
+                        del self.tags[key]
+
+
+class _IndexStamp(object):
+    """Connects the `Tag` objects in an indexed tree to the `TreeIndex`.
+
+    Every `Tag` filed in the index is given the index's current stamp
+    as `PageElement._index_stamp`. When the index is thrown away, its
+    stamp is cleared, so every tag stamped with it stops notifying the
+    index at once.
+    """
+
+    __slots__ = ("index",)
+
+    index: Optional[TreeIndex]
+
+    def __init__(self, index: Optional[TreeIndex]):
+        self.index = index
+
+    def __reduce__(self) -> Tuple[Any, ...]:
+        # An index refers to tags by identity, so it's never pickled.
+        # A Tag unpickled on its own isn't part of an indexed tree.
+        return (_IndexStamp, (None,))
+
+
+class TreeIndex(object):
+    """Indexes of the `Tag` objects in a document.
+
+    There are three indexes, each of which maps a key to the tags
+    filed under it in document order: by tag name, by 'id' attribute,
+    and by the individual tokens of the 'class' attribute.
+
+    The name index is filled in as the document is parsed. The 'id'
+    and 'class' indexes are built the first time they're needed. Once
+    built, an index is kept up to date as elements are inserted into
+    or extracted from the tree, and as 'id' and 'class' are changed
+    through `Tag.__setitem__` and `Tag.__delitem__`. A tag that turns
+    up in the middle of the document is filed next to its nearest
+    neighbor under the same key. Anything the index can't keep up
+    with cheaply (e.g. a tree builder that rearranges
+    the tree behind Beautiful Soup's back) just causes the index to be
+    rebuilt the next time it's needed.
+
+    While any index has been built, every `Tag` in the tree carries
+    a stamp that leads back to this object, so a change to the tree
+    can be reported without looking for the root. Changing `Tag.name`
+    is reported the same way.
+
+    Reassigning `Tag.attrs` is reported too, but changes made inside
+    the ``attrs`` dictionary or one of its value lists aren't. So
+    every candidate from the 'id' or 'class' index is checked against
+    the tag's current attributes. If one of them no longer has the
+    value it was filed under, that index is thrown away and the query
+    is answered by searching the tree. The same happens if the 'id'
+    or 'class' index turns up nothing: a value added in place could
+    be missing from it. A value added in place to one tag, when other
+    tags already have it, is only found once the index is rebuilt,
+    so call `BeautifulSoup.reindex` after changes like that.
+    """
+
+    #: The attributes that have their own index.
+    ATTRIBUTES = ("id", "class")
+
+    # Simple CSS selectors that can be answered from an index: a
+    # single ID or class, with no escapes or non-ASCII characters.
+    SIMPLE_SELECTOR = re.compile(r"\s*([#.])(-?[A-Za-z_][A-Za-z0-9_-]*)\s*$")
+
+    #: The `Tag` (normally a `BeautifulSoup` object) at the root of
+    #: the indexed tree.
+    root: Tag
+
+    # Each of these is None if the corresponding index hasn't been
+    # built yet.
+    _by_name: Optional[_TagMap]
+    _by_id: Optional[_TagMap]
+    _by_class: Optional[_TagMap]
+
+    # The stamp given to each tag filed in the indexes. It's replaced
+    # whenever the indexes are thrown away.
+    _stamp: _IndexStamp
+
+    def __init__(self, root: Tag, built: bool = False):
+        """Constructor.
+
+        :param root: The root of the tree to index.
+        :param built: If True, ``root`` is known to be empty, so the
+            name index starts out complete rather than being built from
+            scratch the first time it's used.
+        """
+        _watch_names_and_attrs()
+        self.root = root
+        self._by_name = _TagMap(_name_keys, _name_matches) if built else None
+        self._by_id = None
+        self._by_class = None
+        self._stamp = _IndexStamp(self)
+
+    @property
+    def built(self) -> bool:
+        """Is the name index currently holding any information?"""
+        return self._by_name is not None
+
+    def invalidate(self) -> None:
+        """Throw away everything the index knows. Each index will be
+        rebuilt the next time it's needed.
+        """
+        self._by_name = self._by_id = self._by_class = None
+        self._stamp.index = None
+        self._stamp = _IndexStamp(self)
+
+    def _maps(self) -> List[_TagMap]:
+        """The indexes that have been built."""
+        return [x for x in (self._by_name, self._by_id, self._by_class) if x is not None]
+
+    def tag_added(self, tag: Tag) -> None:
+        """Record a `Tag` that has just become the last element in
+        the document. This is how tags are registered during parsing.
+        """
+        maps = self._maps()
+        if not maps:
+            return
+        tag._index_stamp = self._stamp
+        for tag_map in maps:
+            tag_map.add([tag], True)
+
+    def element_inserted(self, element: PageElement, at_end: bool) -> None:
+        """Record an element (and everything beneath it) that was just
+        inserted into the tree.
+
+        :param at_end: Whether the inserted subtree is at the very end
+            of the document. If so, the new tags can be appended to the
+            index without disturbing document order.
+        """
+        maps = self._maps()
+        if not maps or not isinstance(element, Tag):
+            return
+        tags = self._tags_in(element)
+        stamp = self._stamp
+        for tag in tags:
+            tag._index_stamp = stamp
+        for tag_map in maps:
+            tag_map.add(tags, at_end)
+
+    def element_removed(self, element: PageElement) -> None:
+        """Forget an element (and everything beneath it) that was just
+        taken out of the tree.
+        """
+        maps = self._maps()
+        if not maps or not isinstance(element, Tag):
+            return
+        tags = self._tags_in(element)
+        for tag in tags:
+            tag._index_stamp = None
+        for tag_map in maps:
+            tag_map.remove(tags)
+
+    def attribute_changing(self, tag: Tag, attribute: str) -> None:
+        """Called just before one of a `Tag`'s attributes is set or
+        removed.
+        """
+        tag_map = self._attribute_map(attribute, build=False)
+        if tag_map is not None:
+            tag_map.remove([tag])
+
+    def attribute_changed(self, tag: Tag, attribute: str) -> None:
+        """Called just after one of a `Tag`'s attributes is set or
+        removed.
+        """
+        tag_map = self._attribute_map(attribute, build=False)
+        if tag_map is not None:
+            tag_map.add([tag], False)
+
+    def name_changing(self, tag: Tag) -> None:
+        """Called just before `Tag.name` is set."""
+        if self._by_name is not None:
+            self._by_name.remove([tag])
+
+    def name_changed(self, tag: Tag) -> None:
+        """Called just after `Tag.name` is set."""
+        if self._by_name is not None:
+            self._by_name.add([tag], False)
+
+    def attrs_replacing(self, tag: Tag) -> None:
+        """Called just before `Tag.attrs` is replaced."""
+        for attribute in self.ATTRIBUTES:
+            self.attribute_changing(tag, attribute)
+
+    def attrs_replaced(self, tag: Tag) -> None:
+        """Called just after `Tag.attrs` is replaced."""
+        for attribute in self.ATTRIBUTES:
+            self.attribute_changed(tag, attribute)
+
+    def tag_changing(self, tag: Tag) -> None:
+        """Called just before a `Tag`'s attributes are changed in ways
+        the index can't see, such as by a `SoupReplacer`.
+        """
+        for tag_map in self._maps():
+            tag_map.remove([tag])
+
+    def tag_changed(self, tag: Tag) -> None:
+        """Called just after a change announced by `TreeIndex.tag_changing`."""
+        for tag_map in self._maps():
+            tag_map.add([tag], False)
+
+    def find_all(
+        self,
+        scope: Tag,
+        name: _FindMethodName,
+        attrs: _StrainableAttributes,
+        limit: Optional[int],
+        kwargs: Dict[str, _StrainableAttribute],
+    ) -> Optional[ResultSet[Tag]]:
+        """Find the tags beneath ``scope`` that match a `Tag.find_all`
+        query with no ``string`` argument.
+
+        :return: A `ResultSet`, or None if the question can't be
+            answered from the index and the caller needs to search the
+            tree itself.
+        """
+        if scope is not self.root:
+            # The index covers the whole document; searching the
+            # part beneath ``scope`` is quicker than filtering it.
+            return None
+        if not (name is None or name is True or isinstance(name, str)):
+            # Lists, regular expressions, functions and ElementFilters
+            # need the full search.
+            return None
+        if "text" in kwargs or "_class" in kwargs:
+            # These produce warnings, which the regular code path
+            # will take care of.
+            return None
+
+        # Gather the values the query wants for each attribute, the
+        # same way SoupStrainer does.
+        wanted: Dict[str, List[Any]] = {}
+        if not attrs:
+            # As in the find_all() shortcut, an empty or missing attrs
+            # argument doesn't filter anything.
+            attrs = {}
+        elif not isinstance(attrs, dict):
+            attrs = {"class": attrs}
+        for attrdict in attrs, kwargs:
+            for attr, value in attrdict.items():
+                if attr == "class_" and attrdict is kwargs:
+                    attr = "class"
+                wanted.setdefault(attr, []).append(value)
+
+        lookups: List[Tuple[Optional[_TagMap], str]] = []
+        if isinstance(name, str) and name and ":" not in name:
+            # A prefixed name may match either the full name or
+            # the local name plus the prefix, so it's not a simple
+            # lookup.
+            lookups.append((self._name_map(), name))
+        for attribute in self.ATTRIBUTES:
+            values = wanted.get(attribute)
+            if values is None or len(values) != 1:
+                continue
+            value = values[0]
+            if isinstance(value, str) and value and value.split() == [value]:
+                lookups.append((self._attribute_map(attribute), value))
+        if not lookups:
+            return None
+
+        # Use whichever index gives the fewest candidates.
+        tag_map, key = lookups[0]
+        bucket = self._bucket(tag_map, key)
+        for other_map, other_key in lookups[1:]:
+            other_bucket = self._bucket(other_map, other_key)
+            if len(other_bucket) < len(bucket):
+                tag_map, key, bucket = other_map, other_key, other_bucket
+
+        # The name index hears about every change to a tag's name,
+        # but an attribute index can't see a value changed in place.
+        # If a candidate no longer has the key it was filed under, or
+        # there are no results at all, search the tree instead.
+        assert tag_map is not None
+        trusted = tag_map is self._by_name
+        keys = tag_map.keys
+        results: List[Tag] = []
+        # The SoupStrainer becomes the ResultSet's source, just as it
+        # would if the tree had been searched.
+        matcher = SoupStrainer(name, attrs, None, **kwargs)
+        if len(lookups) == 1 and (
+            not wanted
+            if trusted
+            else len(wanted) == 1 and (name is None or name is True)
+        ):
+            # The query is nothing but the key that was looked up, so
+            # there's no need to run the SoupStrainer.
+            matches = tag_map.matches
+            for tag in bucket.values():
+                if not trusted and key not in keys(tag):
+                    self._forget(tag_map)
+                    return None
+                if matches(tag, key):
+                    results.append(tag)
+                    if limit and len(results) >= limit:
+                        break
+            if not results and not trusted:
+                return None
+            return ResultSet(matcher, results)
+
+        for tag in bucket.values():
+            if not trusted and key not in keys(tag):
+                self._forget(tag_map)
+                return None
+            if matcher.match(tag):
+                results.append(tag)
+                if limit and len(results) >= limit:
+                    break
+        if not results and not trusted:
+            return None
+        return ResultSet(matcher, results)
+
+    def select(
+        self, scope: Tag, selector: str, limit: Optional[int] = None
+    ) -> Optional[List[Tag]]:
+        """Answer a CSS selector of the form ``#id`` or ``.class``,
+        applied to the descendants of ``scope``.
+
+        :return: A list of tags, or None if the selector is more
+            complicated than that.
+        """
+        match = self.SIMPLE_SELECTOR.match(selector)
+        if match is None:
+            return None
+        symbol, key = match.groups()
+        attribute = "id" if symbol == "#" else "class"
+        results: List[Tag] = []
+        if scope is self.root:
+            # As with find_all, a candidate that's been changed behind
+            # the index's back, or a lack of results, means the tree
+            # has to be searched.
+            tag_map = self._attribute_map(attribute)
+            assert tag_map is not None
+            for tag in self._bucket(tag_map, key).values():
+                if key not in tag_map.keys(tag):
+                    self._forget(tag_map)
+                    return None
+                results.append(tag)
+                if limit and len(results) >= limit:
+                    break
+            return results or None
+
+        # As with find_all, it's quicker to search the part of the
+        # tree beneath ``scope``.
+        keys = _id_keys if attribute == "id" else _class_keys
+        for x in scope.descendants:
+            if isinstance(x, Tag) and key in keys(x):
+                results.append(x)
+                if limit and len(results) >= limit:
+                    break
+        return results
+
+    def _name_map(self) -> _TagMap:
+        if self._by_name is None:
+            self._by_name = self._collect(_name_keys, _name_matches)
+        return self._by_name
+
+    def _attribute_map(self, attribute: str, build: bool = True) -> Optional[_TagMap]:
+        """Find the index for an attribute, building it if necessary.
+
+        :param build: If this is False, an index that hasn't been
+            built yet is not built now.
+        """
+        if attribute == "id":
+            if self._by_id is None and build:
+                self._by_id = self._collect(_id_keys, _id_matches)
+            return self._by_id
+        elif attribute == "class":
+            if self._by_class is None and build:
+                self._by_class = self._collect(_class_keys, _class_matches)
+            return self._by_class
+        return None
+
+    def _forget(self, tag_map: _TagMap) -> None:
+        """Throw away an attribute index that's out of date. It will
+        be rebuilt the next time it's needed.
+        """
+        if tag_map is self._by_id:
+            self._by_id = None
+        elif tag_map is self._by_class:
+            self._by_class = None
+        if not self._maps():
+            # Nothing is keeping the stamps up to date any more.
+            self.invalidate()
+
+    @classmethod
+    def _bucket(cls, tag_map: Optional[_TagMap], key: str) -> Dict[int, Tag]:
+        """Find the tags filed under ``key``, in document order.
+
+        Some of them may not belong there any more, if they were
+        changed behind the index's back.
+        """
+        if tag_map is None:
+            return {}
+        return tag_map.tags.get(key, {})
+
+    def _collect(
+        self, keys: Callable[[Tag], List[str]], matches: Callable[[Tag, str], bool]
+    ) -> _TagMap:
+        """Walk the tree, filing tags in document order."""
+        tag_map = _TagMap(keys, matches)
+        stamp = self._stamp
+        for element in self.root.descendants:
+            if not isinstance(element, Tag):
+                continue
+            element._index_stamp = stamp
+            for key in keys(element):
+                tag_map.tags.setdefault(key, {})[id(element)] = element
+        return tag_map
+
+    @classmethod
+    def _tags_in(cls, tag: Tag) -> List[Tag]:
+        """Return ``tag`` and every `Tag` beneath it, in document order."""
+        tags = [tag]
+        tags.extend(x for x in tag.descendants if isinstance(x, Tag))
+        return tags
@@ -0,0 +1,581 @@
+"""Parse a lot of markup at once, using every CPU.
+
+Use `bs4.parse_many` to parse documents in a pool of worker processes
+and bring back something small from each one::
+
+ from bs4 import parse_many
+
+ def title(soup):
+     return soup.title.string if soup.title else None
+
+ for t in parse_many(pages, "html.parser", transform=title):
+     print(t)
+
+Sending a whole `BeautifulSoup` object from one process to another
+means pickling the entire tree and rebuilding it on the other side,
+which can take a good fraction of the time it took to parse the
+document. The ``transform`` callable runs inside the worker process,
+so only its result has to be sent back.
+
+Use `bs4.parse_split` to parse one huge document whose bulk is a long
+run of sibling tags, by parsing pieces of it in worker processes and
+joining the results into a single tree.
+"""
+
+from __future__ import annotations
+
+from collections import deque
+import re
+from typing import (
+    Any,
+    Callable,
+    Deque,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Pattern,
+    Sequence,
+    Set,
+    Tuple,
+    TYPE_CHECKING,
+    Union,
+)
+
+# This module is imported at the end of bs4/__init__.py, once
+# BeautifulSoup has been defined.
+from bs4 import (
+    _binary,
+    BeautifulSoup,
+)
+from bs4.builder import builder_registry
+from bs4.builder._htmlparser import HTMLParserTreeBuilder
+from bs4.element import NavigableString, Tag
+from bs4.exceptions import FeatureNotFound
+
+if TYPE_CHECKING:
+    from concurrent.futures import Future, ProcessPoolExecutor
+    from bs4 import ParserSession
+    from bs4._typing import _RawMarkup
+
+#: A function that's run on each `BeautifulSoup` object inside the
+#: worker process. Its return value must be picklable.
+_Transform = Callable[["BeautifulSoup"], Any]
+
+# The state of a worker process, set up by _initialize_worker.
+_session: Optional[ParserSession] = None
+_transform: Optional[_Transform] = None
+
+
+def parse_many(
+    documents: Iterable[_RawMarkup],
+    features: Optional[Union[str, Sequence[str]]] = None,
+    transform: Optional[_Transform] = None,
+    workers: Optional[int] = None,
+    chunksize: int = 1,
+    ordered: bool = True,
+    max_pending: Optional[int] = None,
+    **kwargs: Any,
+) -> Iterator[Any]:
+    """Parse documents in a pool of worker processes.
+
+    Each worker process parses documents with its own `ParserSession`,
+    runs ``transform`` on each one, and sends back the result.
+
+    The documents are read from ``documents`` as they're needed: no
+    more than ``max_pending`` chunks are waiting to be parsed, or
+    waiting for the caller to take their results, at any one time.
+    This means ``documents`` can be a generator that reads from disk,
+    and the results can be used as they come in.
+
+    :param documents: Strings or bytestrings containing markup. (File
+        objects can't be sent to another process.)
+    :param features: Passed into the `BeautifulSoup` constructor.
+    :param transform: A function to call on each `BeautifulSoup`
+        object. It must be picklable (for instance, a function defined
+        at the top level of a module), and so must its return value.
+        If this is None, the `BeautifulSoup` objects themselves are
+        sent back, which is much slower.
+    :param workers: The number of worker processes. If this is None,
+        one per CPU is used. If this is 0, the documents are parsed in
+        this process, with no pool.
+    :param chunksize: The number of documents to send to a worker
+        process at a time. If the documents are small, it's worth
+        sending several at once.
+    :param ordered: If this is True, results are yielded in the same
+        order as the documents. If it's False, they're yielded as soon
+        as they're ready, which keeps the workers busier if some
+        documents take much longer than others.
+    :param max_pending: The maximum number of chunks that are being
+        parsed or waiting to be picked up. The default is twice the
+        number of workers.
+    :param kwargs: Passed into the `BeautifulSoup` constructor.
+    :yield: The result of ``transform`` for each document.
+    """
+    if chunksize < 1:
+        raise ValueError("chunksize must be at least 1.")
+    if workers == 0:
+        yield from _parse_in_this_process(documents, features, transform, kwargs)
+        return
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    # Check the arguments here, rather than in every worker process.
+    _new_session(features, kwargs)
+
+    workers = _worker_count(workers)
+    if max_pending is None:
+        max_pending = workers * 2
+    max_pending = max(max_pending, 1)
+
+    with ProcessPoolExecutor(
+        workers,
+        initializer=_initialize_worker,
+        initargs=(features, transform, kwargs),
+    ) as executor:
+        futures = (
+            executor.submit(_parse_chunk, chunk)
+            for chunk in _chunks(documents, chunksize)
+        )
+        if ordered:
+            yield from _ordered_results(futures, max_pending)
+        else:
+            yield from _unordered_results(futures, max_pending)
+
+
+def _worker_count(workers: Optional[int]) -> int:
+    if workers is None:
+        import os
+
+        return os.cpu_count() or 1
+    return workers
+
+
+def _ordered_results(
+    futures: Iterator[Future[List[Any]]], max_pending: int
+) -> Iterator[Any]:
+    """Yield the results of some futures, in the order the futures
+    were created, creating no more than ``max_pending`` at a time.
+    """
+    pending: Deque[Future[List[Any]]] = deque()
+    try:
+        for future in futures:
+            pending.append(future)
+            if len(pending) >= max_pending:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+    finally:
+        # If the caller stopped early, don't parse any more documents.
+        for future in pending:
+            future.cancel()
+
+
+def _unordered_results(
+    futures: Iterator[Future[List[Any]]], max_pending: int
+) -> Iterator[Any]:
+    """Yield the results of some futures as soon as they're ready,
+    creating no more than ``max_pending`` at a time.
+    """
+    from concurrent.futures import FIRST_COMPLETED, wait
+
+    pending: Set[Future[List[Any]]] = set()
+    try:
+        for future in futures:
+            pending.add(future)
+            if len(pending) >= max_pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for finished in done:
+                    yield from finished.result()
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for finished in done:
+                yield from finished.result()
+    finally:
+        for future in pending:
+            future.cancel()
+
+
+def _chunks(
+    documents: Iterable[_RawMarkup], chunksize: int
+) -> Iterator[List[_RawMarkup]]:
+    chunk: List[_RawMarkup] = []
+    for document in documents:
+        chunk.append(document)
+        if len(chunk) >= chunksize:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _new_session(
+    features: Optional[Union[str, Sequence[str]]], kwargs: Dict[str, Any]
+) -> ParserSession:
+    from bs4 import ParserSession
+
+    return ParserSession(features, **kwargs)
+
+
+def _parse_in_this_process(
+    documents: Iterable[_RawMarkup],
+    features: Optional[Union[str, Sequence[str]]],
+    transform: Optional[_Transform],
+    kwargs: Dict[str, Any],
+) -> Iterator[Any]:
+    session = _new_session(features, kwargs)
+    for markup in documents:
+        soup = session.parse(markup)
+        yield soup if transform is None else transform(soup)
+
+
+def _initialize_worker(
+    features: Optional[Union[str, Sequence[str]]],
+    transform: Optional[_Transform],
+    kwargs: Dict[str, Any],
+) -> None:
+    """Set up a worker process to parse documents."""
+    global _session, _transform
+    _session = _new_session(features, kwargs)
+    _transform = transform
+
+
+def _parse_chunk(documents: List[_RawMarkup]) -> List[Any]:
+    """Parse some documents in a worker process."""
+    assert _session is not None
+    results = []
+    for markup in documents:
+        soup = _session.parse(markup)
+        results.append(soup if _transform is None else _transform(soup))
+    return results
+
+
+def parse_split(
+    markup: _RawMarkup,
+    features: Union[str, Sequence[str]] = "html.parser",
+    container: str = "body",
+    workers: Optional[int] = None,
+    segments: Optional[int] = None,
+    **kwargs: Any,
+) -> BeautifulSoup:
+    """Parse one huge document in a pool of worker processes.
+
+    This is for documents where almost everything is a long run of
+    sibling tags inside one container, such as a <body> holding
+    millions of <div> records. The container's contents are split
+    between two of those sibling tags, the pieces are parsed in
+    worker processes, and the results are joined together into one
+    tree, the same tree the `BeautifulSoup` constructor would build.
+
+    A split point is only chosen between an end tag and a start tag
+    with the same name as the container's first child tag, and never
+    inside a comment or a <script> or <style> tag. If a piece turns
+    out not to be self-contained--it has an end tag with no start
+    tag, or (unless it's the last piece) a tag that's never
+    closed--it's joined to its neighbors and parsed again. If the
+    document can't be split at all, it's parsed in this process.
+
+    Each worker process sends back its part of the tree in the format
+    used by `BeautifulSoup.dumps`, but this process still has to turn
+    that back into objects, so this won't be as many times faster as
+    there are workers.
+
+    Only html.parser is supported. Other parsers restructure the
+    document in ways that depend on what came before, so pieces of a
+    document can't be parsed on their own.
+
+    :param markup: A string or bytestring.
+    :param features: Passed into the `BeautifulSoup` constructor. This
+        must pick html.parser.
+    :param container: The name of the tag whose contents will be split.
+    :param workers: The number of worker processes. If this is None,
+        one per CPU is used. If this is 0 or 1 (including None on a
+        machine with one CPU), the document is parsed in this process,
+        since a single worker would only add overhead.
+    :param segments: How many pieces to split the document into. The
+        default is four per worker.
+    :param kwargs: Passed into the `BeautifulSoup` constructor.
+    """
+    wanted = [features] if isinstance(features, str) else features
+    builder_class = builder_registry.lookup(*wanted)
+    if builder_class is None:
+        raise FeatureNotFound(
+            "Couldn't find a tree builder with the features you "
+            "requested: %s. Do you need to install a parser library?"
+            % ",".join(wanted)
+        )
+    if builder_class is not HTMLParserTreeBuilder:
+        raise ValueError("parse_split only works with html.parser.")
+
+    workers = _worker_count(workers)
+    if workers <= 1:
+        return BeautifulSoup(markup, features, **kwargs)
+
+    from_encoding = kwargs.pop("from_encoding", None)
+    exclude_encodings = kwargs.pop("exclude_encodings", None)
+    text, original_encoding, declared_html_encoding, replaced = next(
+        iter(
+            HTMLParserTreeBuilder().prepare_markup(
+                markup, from_encoding, exclude_encodings=exclude_encodings
+            )
+        )
+    )
+
+    bounds = _split_points(text, container, segments or workers * 4)
+    if bounds is None:
+        return BeautifulSoup(text, features, **kwargs)
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    with ProcessPoolExecutor(workers) as executor:
+        soup = _parse_and_stitch(executor, text, container, bounds, kwargs)
+    if soup is None:
+        soup = BeautifulSoup(text, features, **kwargs)
+    soup.original_encoding = original_encoding
+    soup.declared_html_encoding = declared_html_encoding
+    soup.contains_replacement_characters = replaced
+    return soup
+
+
+#: The result of parsing one piece of a document: the piece in the
+#: format used by `BeautifulSoup.dumps`, whether it contained an end
+#: tag with no start tag, and whether it left a tag open.
+_Segment = Tuple[bytes, bool, bool]
+
+# An opening that starts a part of an HTML document in which tags
+# aren't recognized.
+_raw_text_start: Pattern[str] = re.compile(
+    r"<!--|<!\[CDATA\[|<(script|style)(?=[\s/>])", re.I
+)
+_first_tag: Pattern[str] = re.compile(r"<([a-zA-Z][^\s/>]*)")
+
+
+def _last_match(
+    pattern: Pattern[str], string: str, pos: int, endpos: int
+) -> Optional[re.Match[str]]:
+    match = None
+    for match in pattern.finditer(string, pos, endpos):
+        pass
+    return match
+
+
+def _inside_raw_text(markup: str, start: int, pos: int) -> bool:
+    """Is ``pos`` inside a comment, a CDATA section, or a <script> or
+    <style> tag that began after ``start``?
+    """
+    opening = _last_match(_raw_text_start, markup, start, pos)
+    if opening is None:
+        return False
+    if opening.group(1):
+        end = re.compile("</%s" % opening.group(1), re.I)
+        return end.search(markup, opening.end(), pos) is None
+    closing = "-->" if opening.group(0) == "<!--" else "]]>"
+    return markup.find(closing, opening.end(), pos) == -1
+
+
+def _split_points(markup: str, container: str, segments: int) -> Optional[List[int]]:
+    """Find places to split the contents of the container tag.
+
+    :return: A list of positions in ``markup``, starting with the
+        start of the container's contents and ending with the end of
+        its contents, or None if there's no way to split the document
+        in two.
+    """
+    start_tag = re.compile(r"<%s(?=[\s/>])[^>]*>" % re.escape(container), re.I)
+    match = start_tag.search(markup)
+    if match is None:
+        return None
+    start = match.end()
+    end_tag = _last_match(
+        re.compile(r"</%s\s*>" % re.escape(container), re.I), markup, start, len(markup)
+    )
+    end = len(markup) if end_tag is None else end_tag.start()
+
+    child = _first_tag.search(markup, start, end)
+    if child is None:
+        return None
+    name = re.escape(child.group(1))
+    boundary = re.compile(r"</%s\s*>\s*(?=<%s[\s/>])" % (name, name), re.I)
+
+    points = [start]
+    for i in range(1, segments):
+        pos = max(start + (end - start) * i // segments, points[-1])
+        while True:
+            match = boundary.search(markup, pos, end)
+            if match is None:
+                break
+            pos = match.end()
+            if not _inside_raw_text(markup, points[-1], pos):
+                break
+        if match is None:
+            break
+        if pos > points[-1]:
+            points.append(pos)
+    if len(points) == 1:
+        return None
+    points.append(end)
+    return points
+
+
+def _parse_and_stitch(
+    executor: ProcessPoolExecutor,
+    markup: str,
+    container: str,
+    bounds: List[int],
+    kwargs: Dict[str, Any],
+) -> Optional[BeautifulSoup]:
+    """Parse the pieces of a document in worker processes, and the
+    rest of the document in this process, and join them together.
+
+    :return: A `BeautifulSoup` object, or None if the document
+        couldn't be split after all.
+    """
+    # Work out where each piece starts, so the pieces know the line
+    # numbers and positions of their tags in the whole document.
+    positions = {}
+    line, previous = 1, 0
+    for bound in bounds:
+        line += markup.count("\n", previous, bound)
+        positions[bound] = (line, bound - (markup.rfind("\n", 0, bound) + 1))
+        previous = bound
+
+    results: Dict[Tuple[int, int], _Segment] = {}
+    outside: Optional[Tuple[BeautifulSoup, Tag]] = None
+    while True:
+        spans = list(zip(bounds, bounds[1:]))
+        futures = [
+            (
+                span,
+                executor.submit(
+                    _parse_segment, markup[span[0] : span[1]], positions[span[0]], kwargs
+                ),
+            )
+            for span in spans
+            if span not in results
+        ]
+        if outside is None:
+            # Parse everything outside the container while the
+            # workers are busy.
+            outside = _parse_outside(markup, container, bounds[0], bounds[-1], kwargs)
+            if outside is None:
+                return None
+        for span, future in futures:
+            results[span] = future.result()
+
+        bad = [
+            i
+            for i, span in enumerate(spans)
+            if results[span][1] or (results[span][2] and i < len(spans) - 1)
+        ]
+        if not bad:
+            break
+        if len(spans) == 1:
+            return None
+        # Join each bad piece to its neighbors.
+        remove = set()
+        for i in bad:
+            if i > 0:
+                remove.add(bounds[i])
+            if i < len(spans) - 1:
+                remove.add(bounds[i + 1])
+        bounds = [x for x in bounds if x not in remove]
+
+    soup, target = outside
+    for span in spans:
+        _binary.read(results[span][0]).tree.decode_children(
+            target, soup, soup.builder
+        )
+    target.invalidate_digest()
+    soup._most_recent_element = soup._last_descendant()
+    if soup._index is not None:
+        soup._index.invalidate()
+    return soup
+
+
+def _parse_outside(
+    markup: str, container: str, start: int, end: int, kwargs: Dict[str, Any]
+) -> Optional[Tuple[BeautifulSoup, Tag]]:
+    """Parse a document with the contents of its container tag
+    taken out.
+
+    :return: The `BeautifulSoup` object and the (empty) container
+        tag, or None if the container didn't end up where expected.
+    """
+    # The contents are replaced with whitespace, so that tags after
+    # the container get the right line numbers and positions.
+    lines = markup.count("\n", start, end)
+    if lines:
+        filler = "\n" * lines + " " * (end - (markup.rfind("\n", start, end) + 1))
+    else:
+        filler = " " * (end - start)
+    soup = BeautifulSoup(
+        markup[:start] + filler + markup[end:], builder=HTMLParserTreeBuilder, **kwargs
+    )
+    target = soup.find(container.lower())
+    if not isinstance(target, Tag):
+        return None
+    if target.contents:
+        if len(target.contents) > 1 or not isinstance(
+            target.contents[0], NavigableString
+        ):
+            return None
+        target.contents[0].extract()
+    return soup, target
+
+
+class _SegmentTreeBuilder(HTMLParserTreeBuilder):
+    """An `HTMLParserTreeBuilder` for a piece of a larger document,
+    which gives tags their line numbers and positions in the whole
+    document.
+    """
+
+    start_position: Tuple[int, int]
+
+    def __init__(self, start_position: Tuple[int, int] = (1, 0), **kwargs: Any):
+        super(_SegmentTreeBuilder, self).__init__(**kwargs)
+        self.start_position = start_position
+
+    def _new_parser(self) -> Any:
+        parser = super(_SegmentTreeBuilder, self)._new_parser()
+        parser.lineno, parser.offset = self.start_position
+        return parser
+
+
+class _SegmentSoup(BeautifulSoup):
+    """A `BeautifulSoup` for a piece of a larger document, which
+    notices whether the piece can stand on its own.
+    """
+
+    _unmatched_end_tag: bool
+    _open_at_end: bool
+
+    def reset(self) -> None:
+        super(_SegmentSoup, self).reset()
+        self._unmatched_end_tag = False
+        self._open_at_end = False
+
+    def _popToTag(
+        self, name: str, nsprefix: Optional[str] = None, inclusivePop: bool = True
+    ) -> Optional[Tag]:
+        if name != self.ROOT_TAG_NAME and not self.open_tag_counter.get(name):
+            # In the whole document, this might close a tag from an
+            # earlier piece.
+            self._unmatched_end_tag = True
+        return super(_SegmentSoup, self)._popToTag(name, nsprefix, inclusivePop)
+
+    def _close_open_tags(self) -> None:
+        # In the whole document, a tag that's still open might
+        # contain part of the next piece.
+        self._open_at_end = len(self.tagStack) > 1
+        super(_SegmentSoup, self)._close_open_tags()
+
+
+def _parse_segment(
+    markup: str, start_position: Tuple[int, int], kwargs: Dict[str, Any]
+) -> _Segment:
+    """Parse a piece of a document in a worker process."""
+    soup = _SegmentSoup(
+        markup, builder=_SegmentTreeBuilder, start_position=start_position, **kwargs
+    )
+    return (soup.dumps(), soup._unmatched_end_tag, soup._open_at_end)
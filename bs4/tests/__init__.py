@@ -22,7 +22,7 @@ from bs4.element import (
     Stylesheet,
     Tag,
 )
-from bs4.filter import SoupStrainer
+from bs4.filter import PruningStrainer, SoupStrainer
 from bs4.builder import (
     XMLParsedAsHTMLWarning,
 )
@@ -380,6 +380,45 @@ class TreeBuilderSmokeTest(SoupTest):
         assert tag["attr2"] == ["val2", "extra"]
         assert isinstance(tag["attr2"], MyCustomAttributeValueList)
 
+    def test_feed_in_chunks(self):
+        # Feeding a document in small pieces gives the same tree as
+        # parsing it all at once, even if the pieces split up tags,
+        # attributes and entities.
+        markup = '<root><a id="1" class="x y">foo &amp; bar</a><b>baz</b><!--comment--></root>'
+        soup = self.soup("")
+        for i in range(0, len(markup), 3):
+            soup.feed(markup[i : i + 3])
+        soup.close()
+        assert soup.decode() == self.soup(markup).decode()
+        assert soup.builder.soup is None
+
+    def test_feed_bytestring_in_chunks(self):
+        # A multi-byte character can be split across two chunks.
+        markup = "<root><a>caf\N{LATIN SMALL LETTER E WITH ACUTE}</a></root>".encode("utf8")
+        soup = self.soup(b"", from_encoding="utf8")
+        for i in range(len(markup)):
+            soup.feed(markup[i : i + 1])
+        soup.close()
+        assert soup.a.string == "caf\N{LATIN SMALL LETTER E WITH ACUTE}"
+
+    def test_feed_starts_a_new_document(self):
+        soup = self.soup("<root><a>old</a></root>")
+        soup.feed("<root><b>new</b></root>")
+        soup.close()
+        assert soup.a is None
+        assert soup.b.string == "new"
+
+        # close() without a feed() in progress does nothing.
+        soup.close()
+        assert soup.b.string == "new"
+
+    def test_feed_unclosed_tags_closed(self):
+        soup = self.soup("")
+        soup.feed("<root><a>text")
+        soup.close()
+        assert soup.a.string == "text"
+        assert soup.currentTag is soup
+
 
 class HTMLTreeBuilderSmokeTest(TreeBuilderSmokeTest):
     """A basic test of a treebuilder's competence.
@@ -548,6 +587,7 @@ class HTMLTreeBuilderSmokeTest(TreeBuilderSmokeTest):
         [warning] = w
         assert isinstance(warning.message, XMLParsedAsHTMLWarning)
         assert str(warning.message) == XMLParsedAsHTMLWarning.MESSAGE
+        assert warning.filename == __file__
 
         # NOTE: the warning is not issued if the document appears to
         # be XHTML (tested with test_real_xhtml_document in the
@@ -868,6 +908,17 @@ Hello, world!
         soup = self.soup("A <b>bold</b> <meta/> <i>statement</i>", parse_only=strainer)
         assert soup.decode() == "<b>bold</b>"
 
+    def test_pruning_strainer(self):
+        """Parsers should be able to prune the tree at every depth,
+        even when empty-element tags are involved.
+        """
+        strainer = PruningStrainer(
+            keep=SoupStrainer(["p", "br"]), skip=SoupStrainer(["i", "img"])
+        )
+        markup = "<div><p>A <img src='x'><b>bold</b><br> <i>state<br>ment</i></p></div>"
+        soup = self.soup(markup, parse_only=strainer)
+        assert soup.decode() == "<p>A bold<br/> </p>"
+
     def test_single_quote_attribute_values_become_double_quotes(self):
         self.assert_soup("<foo attr='bar'></foo>", '<foo attr="bar"></foo>')
 
@@ -1284,6 +1335,21 @@ class HTML5TreeBuilderSmokeTest(HTMLTreeBuilderSmokeTest):
         # XHTML documents in any particular way.
         pass
 
+    def test_pruning_strainer(self):
+        # HTML5 parsers don't support parse_only, so the whole
+        # document is parsed and a warning is issued.
+        strainer = PruningStrainer(
+            keep=SoupStrainer(["p", "br"]), skip=SoupStrainer(["i", "img"])
+        )
+        markup = "<div><p>A <img src='x'><b>bold</b><br> <i>state<br>ment</i></p></div>"
+        with warnings.catch_warnings(record=True) as w:
+            soup = self.soup(markup, parse_only=strainer)
+        assert soup.decode() == self.soup(markup).decode()
+
+        [warning] = w
+        assert warning.filename == __file__
+        assert "doesn't support parse_only" in str(warning.message)
+
     def test_html_tags_have_namespace(self):
         markup = "<a>"
         soup = self.soup(markup)
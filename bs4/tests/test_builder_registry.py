@@ -1,10 +1,13 @@
 """Tests of the builder registry."""
 
 import pytest
+import subprocess
+import sys
 import warnings
 from typing import Type
 
 from bs4 import BeautifulSoup
+from bs4 import builder
 from bs4.builder import (
     builder_registry as registry,
     TreeBuilder,
@@ -77,6 +80,67 @@ class TestBuiltInRegistry(object):
             BeautifulSoup("", features="no-such-feature")
 
 
+    def test_lazy_registrations_match_builder_features(self):
+        # The features registered for each builder, before its module
+        # was imported, must be the ones the builder class advertises.
+        for cls in registry.builders:
+            for feature in cls.features:
+                assert cls in registry.builders_for_feature[feature]
+        for feature, classes in registry.builders_for_feature.items():
+            for cls in classes:
+                assert feature in cls.features
+
+    def test_import_does_not_import_parsers(self):
+        code = (
+            "import sys, warnings; warnings.simplefilter('ignore'); import bs4; "
+            "print(' '.join(x for x in sys.modules if x.startswith('bs4.builder.')))"
+        )
+        output = subprocess.run(
+            [sys.executable, "-c", code], capture_output=True, text=True, check=True
+        ).stdout.split()
+        assert "bs4.builder._lxml" not in output
+        assert "bs4.builder._html5lib" not in output
+
+    def test_import_does_not_import_optional_modules(self):
+        code = (
+            "import sys, warnings; warnings.simplefilter('ignore'); import bs4; "
+            "print(' '.join(sys.modules))"
+        )
+        output = subprocess.run(
+            [sys.executable, "-c", code], capture_output=True, text=True, check=True
+        ).stdout.split()
+        for module in (
+            "soupsieve",
+            "bs4.css",
+            "bs4._binary",
+            "bs4.index",
+            "bs4.treediff",
+            "bs4.parallel",
+        ):
+            assert module not in output
+
+        # They're imported when they're used.
+        from bs4 import CSS, diff, parse_many
+        from bs4.css import CSS as real_css
+
+        assert CSS is real_css
+        assert callable(diff)
+        assert callable(parse_many)
+
+    def test_builders_can_be_imported_from_builder_module(self):
+        assert builder.HTMLParserTreeBuilder is HTMLParserTreeBuilder
+        assert "HTMLParserTreeBuilder" in builder.__all__
+        if LXML_PRESENT:
+            assert builder.LXMLTreeBuilder is LXMLTreeBuilder
+            # An imported builder is listed in __all__, as it was
+            # before builders were registered lazily.
+            assert "LXMLTreeBuilder" in builder.__all__
+        else:
+            assert not hasattr(builder, "LXMLTreeBuilder")
+        with pytest.raises(AttributeError):
+            builder.NoSuchTreeBuilder
+
+
 class TestRegistry(object):
     """Test the TreeBuilderRegistry class in general."""
 
@@ -137,3 +201,36 @@ class TestRegistry(object):
         self.builder_for_features("foo", "bar")
         self.builder_for_features("foo", "baz")
         assert self.registry.lookup("bar", "baz") is None
+
+    def test_lazy_registration(self):
+        early = self.builder_for_features("foo", "bar")
+        self.registry.register_lazy(
+            "bs4.builder._htmlparser", "HTMLParserTreeBuilder", ["foo", "baz"]
+        )
+        assert isinstance(self.registry._builders[0], builder._LazyTreeBuilder)
+
+        # The module isn't imported until the lazy builder is chosen.
+        assert self.registry.lookup("bar") is early
+        assert isinstance(self.registry._builders[0], builder._LazyTreeBuilder)
+        assert self.registry.lookup("foo") is HTMLParserTreeBuilder
+        assert self.registry._builders == [HTMLParserTreeBuilder, early]
+        assert self.registry.lookup("baz") is HTMLParserTreeBuilder
+
+    def test_lazy_registration_of_missing_module(self):
+        early = self.builder_for_features("foo")
+        self.registry.register_lazy("bs4.builder._nosuchparser", "Builder1", ["foo"])
+        self.registry.register_lazy("bs4.builder._nosuchparser", "Builder2", ["bar"])
+
+        # The module can't be imported, so every builder that
+        # depends on it is forgotten, and the lookup carries on.
+        assert self.registry.lookup("foo") is early
+        assert self.registry.lookup("bar") is None
+        assert self.registry.lookup() is early
+        assert self.registry.builders == [early]
+
+    def test_builders_resolves_lazy_registrations(self):
+        self.registry.register_lazy(
+            "bs4.builder._htmlparser", "HTMLParserTreeBuilder", ["foo"]
+        )
+        assert self.registry.builders == [HTMLParserTreeBuilder]
+        assert self.registry.builders_for_feature["foo"] == [HTMLParserTreeBuilder]
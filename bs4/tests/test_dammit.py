@@ -1,12 +1,16 @@
 # encoding: utf-8
 import pytest
 import logging
+import random
+import subprocess
+import sys
 import warnings
 import bs4
 from bs4 import BeautifulSoup
 from bs4.dammit import (
     EntitySubstitution,
     EncodingDetector,
+    IncrementalUnicodeDammit,
     UnicodeDammit,
 )
 
@@ -82,6 +86,80 @@ class TestUnicodeDammit(object):
         assert dammit.original_encoding is None
 
 
+class TestIncrementalUnicodeDammit(object):
+    """Tests of IncrementalUnicodeDammit, which decodes a bytestring
+    that arrives in chunks.
+    """
+
+    def decode(self, dammit, data, chunk_size):
+        pieces = [
+            dammit.decode(data[i : i + chunk_size])
+            for i in range(0, len(data), chunk_size)
+        ]
+        pieces.append(dammit.decode(b"", final=True))
+        return "".join(pieces)
+
+    def test_multibyte_characters_split_across_chunks(self):
+        text = "<p>" + "caf\N{LATIN SMALL LETTER E WITH ACUTE} \N{SNOWMAN} " * 500
+        for encoding, data in (
+            ("utf-8", text.encode("utf8")),
+            ("utf-16le", b"\xff\xfe" + text.encode("utf-16le")),
+        ):
+            for chunk_size in (1, 3, 1000):
+                dammit = IncrementalUnicodeDammit()
+                assert text == self.decode(dammit, data, chunk_size)
+                assert encoding == dammit.original_encoding
+                assert not dammit.contains_replacement_characters
+
+    def test_encoding_chosen_from_start_of_document(self):
+        data = b'<meta charset="euc-jp">' + " ".encode("euc-jp") * 2000
+        dammit = IncrementalUnicodeDammit(is_html=True)
+
+        # Nothing comes out until there's enough data to sniff.
+        assert "" == dammit.decode(data[:100])
+        assert dammit.original_encoding is None
+
+        assert len(dammit.decode(data[100:])) > 0
+        assert "euc-jp" == dammit.original_encoding
+        assert "euc-jp" == dammit.declared_html_encoding
+        assert "declared" == dammit.encoding_strategy
+
+    def test_short_document(self):
+        dammit = IncrementalUnicodeDammit(known_definite_encodings=["utf-8"])
+        assert "" == dammit.decode(b"<p>caf\xc3")
+        assert "<p>caf\N{LATIN SMALL LETTER E WITH ACUTE}" == dammit.decode(
+            b"\xa9", final=True
+        )
+        assert "known_definite" == dammit.encoding_strategy
+
+        dammit = IncrementalUnicodeDammit()
+        assert "" == dammit.decode(b"", final=True)
+        assert dammit.original_encoding is None
+
+    def test_invalid_bytes_after_encoding_is_chosen(self):
+        dammit = IncrementalUnicodeDammit()
+        text = dammit.decode(b"a" * 2000)
+        assert "utf-8" == dammit.original_encoding
+        text += dammit.decode(b"\xff", final=True)
+        assert "a" * 2000 + "\N{REPLACEMENT CHARACTER}" == text
+        assert dammit.contains_replacement_characters
+
+    def test_smart_quotes_converted_in_each_chunk(self):
+        data = b"<p>\x93Hi\x94</p>" * 200
+        dammit = IncrementalUnicodeDammit(
+            known_definite_encodings=["windows-1252"], smart_quotes_to="html"
+        )
+        assert "<p>&ldquo;Hi&rdquo;</p>" * 200 == self.decode(dammit, data, 7)
+
+        dammit = UnicodeDammit(
+            data, known_definite_encodings=["windows-1252"], smart_quotes_to="xml"
+        )
+        incremental = IncrementalUnicodeDammit(
+            known_definite_encodings=["windows-1252"], smart_quotes_to="xml"
+        )
+        assert dammit.unicode_markup == self.decode(incremental, data, 5)
+
+
 class TestEncodingDetector(object):
     def test_encoding_detector_replaces_junk_in_encoding_name_with_replacement_character(
         self,
@@ -100,6 +178,98 @@ class TestEncodingDetector(object):
             dammit = UnicodeDammit(data, is_html=True)
             assert "euc-jp" == dammit.original_encoding
 
+    @pytest.mark.parametrize(
+        "data,encoding",
+        [
+            (b'<meta charset="euc-jp">', "euc-jp"),
+            (b"<!DOCTYPE html><META CHARSET=WINDOWS-1251>", "windows-1251"),
+            # Comments, and the attributes of other tags, are skipped.
+            (b'<!-- <meta charset="koi8-r"> --><meta charset="utf-8">', "utf-8"),
+            (b'<p title="<meta charset=koi8-r>"><meta charset=big5>', "big5"),
+            # An encoding in the content attribute needs http-equiv.
+            (
+                b'<meta content="text/html; charset=shift_jis" '
+                b'http-equiv="Content-Type">',
+                "shift_jis",
+            ),
+            (b'<meta content="text/html; charset=shift_jis">', None),
+            # A document that could be read as ASCII isn't UTF-16.
+            (b'<meta charset="utf-16le">', "utf-8"),
+            # The document can't end in the middle of a tag.
+            (b'<meta charset="ascii', None),
+            (b"<meta charset=>", None),
+        ],
+    )
+    def test_prescan(self, data, encoding):
+        assert encoding == EncodingDetector.prescan(data)
+
+    def test_sniffing_window(self):
+        meta = b'<meta charset="euc-jp">'
+        spacer = b"<p>" + b" " * 5000 + b"</p>"
+        data = spacer + meta
+
+        detector = EncodingDetector(data, is_html=True, sniff_bytes=1024)
+        assert "euc-jp" not in list(detector.encodings)
+        assert detector.declared_encoding is None
+
+        detector = EncodingDetector(data, is_html=True, sniff_bytes=0)
+        assert "euc-jp" == next(detector.encodings)
+        assert "declared" == detector.strategy
+
+        # By default, much more than the first few kilobytes are
+        # sniffed, but not the whole document.
+        assert "euc-jp" == UnicodeDammit(data, is_html=True).original_encoding
+        data = b" " * (EncodingDetector.DEFAULT_SNIFF_BYTES + 1) + meta
+        assert "euc-jp" != UnicodeDammit(data, is_html=True).original_encoding
+
+    def test_chardet_only_sees_sniffed_bytes(self):
+        seen = []
+
+        def fake_chardet(data):
+            seen.append(data)
+            return None
+
+        chardet = bs4.dammit._chardet_dammit
+        bs4.dammit._chardet_dammit = fake_chardet
+        try:
+            UnicodeDammit(b"a" * 5000, sniff_bytes=100)
+        finally:
+            bs4.dammit._chardet_dammit = chardet
+        assert [b"a" * 100] == seen
+
+    def test_encoding_strategy(self):
+        data = '<meta charset="euc-jp">\N{HIRAGANA LETTER A}'
+        dammit = UnicodeDammit(data.encode("euc-jp"), is_html=True)
+        assert "declared" == dammit.encoding_strategy
+
+        dammit = UnicodeDammit(
+            data.encode("utf8"), known_definite_encodings=["utf8"], is_html=True
+        )
+        assert "known_definite" == dammit.encoding_strategy
+
+        dammit = UnicodeDammit(b"\xef\xbb\xbf" + data.encode("utf8"))
+        assert "byte_order_mark" == dammit.encoding_strategy
+
+        assert UnicodeDammit(data).encoding_strategy is None
+
+    def test_byte_order_mark_is_not_copied(self):
+        data = "<p>\N{SNOWMAN}</p>"
+        markup = b"\xff\xfe" + data.encode("utf-16le")
+        dammit = UnicodeDammit(markup)
+        assert data == dammit.unicode_markup
+        assert "utf-16le" == dammit.original_encoding
+
+        # The markup was decoded without first making a copy of it
+        # that leaves out the byte-order mark.
+        detector = dammit.detector
+        assert markup is detector.raw_markup
+        assert 2 == detector.byte_order_mark_length
+        assert detector._markup is None
+
+        # But the copy can still be had.
+        assert markup[2:] == dammit.markup
+        assert markup[2:] == detector.markup_buffer
+
     def test_last_ditch_entity_replacement(self):
         # This is a UTF-8 document that contains bytestrings
         # completely incompatible with UTF-8 (ie. encoded with some other
@@ -238,6 +408,32 @@ class TestEncodingDetector(object):
             output = UnicodeDammit.detwingle(input)
             assert output == input
 
+    def test_detwingle_matches_bytewise_implementation(self):
+        # detwingle() uses a regular expression to skip over the
+        # parts of the document that don't need fixing. It gives the
+        # same results as going through the document a byte at a time.
+        pieces = [bytes([x]) for x in range(256)] + [
+            "\N{SNOWMAN}".encode("utf8"),
+            "\N{MUSICAL SYMBOL G CLEF}".encode("utf8"),
+            b"plain text",
+        ]
+        rng = random.Random(0)
+        for i in range(2000):
+            data = b"".join(rng.choice(pieces) for j in range(rng.randint(0, 20)))
+            assert UnicodeDammit._detwingle_bytewise(data) == UnicodeDammit.detwingle(
+                data
+            )
+
+        # A multibyte character cut off at the end is left alone.
+        for data in (b"\x93\xe2", b"\x93\xe2\x98", b"\x93\xf0\x93"):
+            assert UnicodeDammit._detwingle_bytewise(data) == UnicodeDammit.detwingle(
+                data
+            )
+
+    def test_detwingle_leaves_utf8_alone(self):
+        data = ("\N{SNOWMAN}" * 3).encode("utf8")
+        assert data is UnicodeDammit.detwingle(data)
+
     def test_find_declared_encoding(self):
         # Test our ability to find a declared encoding inside an
         # XML or HTML document.
@@ -338,6 +534,49 @@ class TestEntitySubstitution(object):
         markup = "fjords &sqcups; penguins"
         assert self.sub.substitute_html(data) == markup
 
+    def test_tables_are_built_on_first_use(self):
+        # Parsing a document and getting its text doesn't build the
+        # entity tables or regular expressions. Outputting HTML does.
+        code = (
+            "import warnings; warnings.simplefilter('ignore')\n"
+            "from bs4 import BeautifulSoup\n"
+            "from bs4.dammit import EntitySubstitution\n"
+            "def built(): return sorted(x for x in ("
+            "'CHARACTER_TO_HTML_ENTITY', 'CHARACTER_TO_HTML_ENTITY_RE') "
+            "if not hasattr(EntitySubstitution.__dict__[x], 'populate'))\n"
+            "BeautifulSoup('<p>caf\\xe9</p>', 'html.parser').get_text()\n"
+            "print(built())\n"
+            "EntitySubstitution.HTML_ENTITY_TO_CHARACTER\n"
+            "print(built())\n"
+            "EntitySubstitution.substitute_html('caf\\xe9')\n"
+            "print(built())\n"
+        )
+        output = subprocess.run(
+            [sys.executable, "-c", code], capture_output=True, text=True, check=True
+        ).stdout.splitlines()
+        assert output == [
+            "[]",
+            "['CHARACTER_TO_HTML_ENTITY']",
+            "['CHARACTER_TO_HTML_ENTITY', 'CHARACTER_TO_HTML_ENTITY_RE']",
+        ]
+
+    def test_tables_are_built_once_when_first_used_by_subclass(self):
+        # Looking a table up through a subclass builds it on
+        # EntitySubstitution, where every other class can see it.
+        code = (
+            "from bs4.dammit import EntitySubstitution\n"
+            "from bs4.formatter import HTMLFormatter\n"
+            "table = HTMLFormatter.CHARACTER_TO_HTML_ENTITY\n"
+            "regex = HTMLFormatter.CHARACTER_TO_HTML_ENTITY_RE\n"
+            "print(EntitySubstitution.__dict__['CHARACTER_TO_HTML_ENTITY'] is table)\n"
+            "print(EntitySubstitution.__dict__['CHARACTER_TO_HTML_ENTITY_RE'] is regex)\n"
+            "print('CHARACTER_TO_HTML_ENTITY' in HTMLFormatter.__dict__)\n"
+        )
+        output = subprocess.run(
+            [sys.executable, "-c", code], capture_output=True, text=True, check=True
+        ).stdout.splitlines()
+        assert output == ["True", "True", "False"]
+
     def test_xml_converstion_includes_no_quotes_if_make_quoted_attribute_is_false(self):
         s = 'Welcome to "my bar"'
         assert self.sub.substitute_xml(s, False) == s
@@ -15,6 +15,7 @@ from bs4.filter import (
     AttributeValueMatchRule,
     ElementFilter,
     MatchRule,
+    PruningStrainer,
     SoupStrainer,
     StringMatchRule,
     TagNameMatchRule,
@@ -655,3 +656,76 @@ and they lived at the bottom of a well.</p>
         )
         string_soup = self.soup(html_doc, parse_only=only_short_strings)
         assert "\n\n\nElsie,\nLacie and\nTillie\n...\n" == string_soup.decode()
+
+
+class TestPruningStrainer(SoupTest):
+    markup = (
+        "<html><head><script>var x = '<p>no</p>';</script></head><body>"
+        '<nav><p>menu</p></nav><div class="content">top'
+        "<p>One <b>bold</b><br> <a href='x'>link</a></p>"
+        "<div><p>Two</p></div></div>tail</body></html>"
+    )
+
+    def test_default_tag_decision(self):
+        # An ElementFilter that only says whether tags can be created
+        # either keeps a tag or descends into it.
+        strainer = SoupStrainer("p")
+        assert not strainer.applies_at_every_depth
+        assert strainer.tag_decision(None, "p", {}) == ElementFilter.KEEP
+        assert strainer.tag_decision(None, "b", {}) == ElementFilter.DESCEND
+
+    def test_tag_decision(self):
+        strainer = PruningStrainer(keep=SoupStrainer("p"), skip=SoupStrainer("nav"))
+        assert strainer.applies_at_every_depth
+        assert strainer.tag_decision(None, "p", {}) == ElementFilter.KEEP
+        assert strainer.tag_decision(None, "nav", {}) == ElementFilter.SKIP
+        assert strainer.tag_decision(None, "div", {}) == ElementFilter.DESCEND
+
+        soup = self.soup("<p>a</p><nav>b</nav>")
+        assert strainer.match(soup.p)
+        assert not strainer.match(soup.nav)
+        assert not strainer.match(soup.p.string)
+
+    def test_keep_and_skip(self):
+        strainer = PruningStrainer(
+            keep=SoupStrainer(["p", "b", "a", "br"]),
+            skip=SoupStrainer(["script", "nav"]),
+        )
+        soup = self.soup(self.markup, parse_only=strainer)
+        assert (
+            soup.decode()
+            == '<p>One <b>bold</b><br/> <a href="x">link</a></p><p>Two</p>'
+        )
+
+    def test_skip_only(self):
+        strainer = PruningStrainer(skip=SoupStrainer(["head", "nav"]))
+        soup = self.soup(self.markup, parse_only=strainer)
+        assert soup.head is None
+        assert soup.nav is None
+        assert soup.div.contents[0] == "top"
+        assert soup.body.contents[-1] == "tail"
+
+    def test_nested_tag_pruned_inside_kept_tag(self):
+        # Unlike a plain SoupStrainer, a PruningStrainer can remove
+        # tags inside a tag that was kept.
+        strainer = PruningStrainer(
+            keep=SoupStrainer(class_="content"), skip=SoupStrainer("a")
+        )
+        soup = self.soup(self.markup, parse_only=strainer)
+        # The <div> is kept, the <a> tag is skipped along with its
+        # contents, and everything else is flattened into the <div>.
+        assert soup.a is None
+        assert soup.decode() == '<div class="content">topOne bold Two</div>'
+
+    def test_end_tag_of_dropped_tag_does_not_close_kept_tag(self):
+        strainer = PruningStrainer(keep=SoupStrainer(class_="keep"))
+        soup = self.soup(
+            '<div class="keep">a<div>b</div>c</div><div class="keep">d</div>',
+            parse_only=strainer,
+        )
+        assert soup.decode() == '<div class="keep">abc</div><div class="keep">d</div>'
+
+    def test_end_tag_of_dropped_tag_closes_kept_tags_inside_it(self):
+        strainer = PruningStrainer(keep=SoupStrainer("p"))
+        soup = self.soup("<p>a<div>b<p>c</div>d</p>e", parse_only=strainer)
+        assert soup.decode() == "<p>ab<p>c</p>d</p>"
@@ -1,7 +1,10 @@
 """Tests to ensure that the html.parser tree builder generates good
 trees."""
 
+import gc
 import pickle
+import warnings
+import weakref
 import pytest
 from bs4.builder._htmlparser import (
     _DuplicateAttributeHandler,
@@ -9,6 +12,7 @@ from bs4.builder._htmlparser import (
     HTMLParserTreeBuilder,
 )
 from bs4.exceptions import ParserRejectedMarkup
+from bs4._warnings import XMLParsedAsHTMLWarning
 from typing import Any
 from . import HTMLTreeBuilderSmokeTest
 
@@ -159,3 +163,42 @@ class TestHTMLParserTreeBuilder(HTMLTreeBuilderSmokeTest):
         markup = "<p>a &nosuchentity; b</p>"
         soup = self.soup(markup)
         assert "<p>a &amp;nosuchentity b</p>" == soup.p.decode()
+
+    def test_parser_is_reused(self):
+        # A TreeBuilder that parses several documents resets its
+        # parser rather than creating a new one, and nothing carries
+        # over from one document to the next.
+        builder = HTMLParserTreeBuilder()
+        soup = self.soup("<p>one<script>if (a < b)", builder=builder)
+        parser = builder._idle_parser
+        assert parser is not None
+        assert soup.script is not None
+
+        soup = self.soup("<p>two</p>\n<b>bold</b>", builder=builder)
+        assert builder._idle_parser is parser
+        assert soup.decode() == "<p>two</p>\n<b>bold</b>"
+        assert soup.b.sourceline == 2
+
+        # The idle parser isn't pickled along with the TreeBuilder.
+        assert pickle.loads(pickle.dumps(builder))._idle_parser is None
+
+    def test_idle_parser_does_not_keep_document_alive(self):
+        builder = HTMLParserTreeBuilder()
+        soup = self.soup("<p>one</p>", builder=builder)
+        assert builder._idle_parser is not None
+        ref = weakref.ref(soup)
+        del soup
+        gc.collect()
+        assert ref() is None
+
+    def test_detect_xml_parsed_as_html_while_feeding(self):
+        # The warning points at the caller's code whether the document
+        # comes in through the constructor or through feed().
+        markup = """<?xml version="1.0" encoding="utf-8"?><tag>string</tag>"""
+        soup = self.soup("")
+        with warnings.catch_warnings(record=True) as w:
+            soup.feed(markup)
+            soup.close()
+        [warning] = w
+        assert isinstance(warning.message, XMLParsedAsHTMLWarning)
+        assert warning.filename == __file__
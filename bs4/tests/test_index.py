@@ -0,0 +1,369 @@
+import copy
+import pickle
+import pytest
+import subprocess
+import sys
+
+from . import (
+    SoupTest,
+    SOUP_SIEVE_PRESENT,
+)
+from bs4.index import TreeIndex
+
+
+class TestTreeIndex(SoupTest):
+    markup = (
+        "<html><head><title>The title</title></head><body>"
+        '<p id="1"><a href="a1">1</a><b>bold</b></p>'
+        '<p id="2"><a href="a2">2</a></p>'
+        '<p id="3"><a href="a3">3</a><a href="a4">4</a></p>'
+        "</body></html>"
+    )
+
+    def indexed_soup(self, markup=None):
+        return self.soup(markup or self.markup, indexed=True)
+
+    def hrefs(self, soup):
+        return [a["href"] for a in soup.find_all("a")]
+
+    def test_index_is_optional(self):
+        assert self.soup(self.markup)._index is None
+        soup = self.indexed_soup()
+        assert isinstance(soup._index, TreeIndex)
+
+        # The index is filled in during the parse.
+        assert soup._index.built
+
+    def test_lookups_match_tree_search(self):
+        soup = self.indexed_soup()
+        plain = self.soup(self.markup)
+        for name in ("a", "p", "b", "title", "nosuchtag"):
+            assert [str(x) for x in soup.find_all(name)] == [
+                str(x) for x in plain.find_all(name)
+            ]
+        assert soup.title.string == "The title"
+        assert soup.find("p")["id"] == "1"
+        assert ["a1", "a2"] == [a["href"] for a in soup.find_all("a", limit=2)]
+        assert soup.nosuchtag is None
+
+        # An empty attrs argument doesn't filter anything.
+        soup.a["class"] = "link"
+        plain.a["class"] = "link"
+        for attrs in (None, {}):
+            assert self.hrefs(plain) == [
+                a["href"] for a in soup.find_all("a", attrs)
+            ]
+            assert len(plain.find_all("a", attrs)) == 4
+
+    def test_results_have_a_source(self):
+        soup = self.indexed_soup()
+        for query in (dict(name="a"), dict(name="a", href="a2")):
+            found = soup.find_all(**query)
+            assert found.source.name_rules[0].string == "a"
+            assert found == self.soup(self.markup).find_all(**query)
+
+    def test_lookup_scoped_to_tag(self):
+        soup = self.indexed_soup()
+        third = soup.find_all("p")[2]
+        assert ["a3", "a4"] == [a["href"] for a in third.find_all("a")]
+        assert third.b is None
+
+        # A non-recursive search doesn't use the index, but still works.
+        assert [] == soup.find_all("a", recursive=False)
+
+    def test_scoped_lookup_searches_the_tree(self):
+        soup = self.indexed_soup()
+        third = soup.find_all("p")[2]
+        assert None is soup._index.find_all(third, "a", {}, None, {})
+
+    def test_tags_are_stamped_with_the_index(self):
+        soup = self.indexed_soup()
+        a = soup.a
+        assert a._tree_index() is soup._index
+        assert a.string._tree_index() is soup._index
+        assert soup._tree_index() is soup._index
+
+        # An unindexed tree has nothing to find.
+        plain = self.soup(self.markup)
+        assert plain.a._index_stamp is None
+        assert plain.a._tree_index() is None
+
+        # An extracted tag is no longer stamped.
+        a.extract()
+        assert a._index_stamp is None
+        assert a._tree_index() is None
+
+        # Throwing the index away unstamps every tag at once.
+        b = soup.b
+        soup.reindex()
+        assert b._tree_index() is None
+        assert soup.b is b
+        assert b._tree_index() is soup._index
+
+    def test_pickled_tag_is_not_stamped(self):
+        soup = self.indexed_soup()
+        loaded = pickle.loads(pickle.dumps(soup.b))
+        assert loaded._tree_index() is None
+        loaded["class"] = "x"
+        assert soup.find(class_="x") is None
+
+    def test_other_queries_still_work(self):
+        soup = self.indexed_soup()
+        assert ["a3"] == [a["href"] for a in soup.find_all("a", href="a3")]
+        assert ["3"] == [a.string for a in soup.find_all("a", string="3")]
+
+    def test_insert_at_end(self):
+        soup = self.indexed_soup()
+        new_a = soup.new_tag("a", href="a5")
+        soup.body.append(new_a)
+        assert ["a1", "a2", "a3", "a4", "a5"] == self.hrefs(soup)
+
+    def test_insert_in_middle(self):
+        soup = self.indexed_soup()
+        p = soup.new_tag("p")
+        p.append(soup.new_tag("a", href="new"))
+        soup.find_all("p")[1].insert_before(p)
+        assert ["a1", "new", "a2", "a3", "a4"] == self.hrefs(soup)
+        assert ["1", None, "2", "3"] == [p.get("id") for p in soup.find_all("p")]
+
+    def test_extract_and_decompose(self):
+        soup = self.indexed_soup()
+        first_p = soup.p.extract()
+        assert ["a2", "a3", "a4"] == self.hrefs(soup)
+        assert soup.b is None
+
+        # The extracted tag is no longer part of the document, but
+        # it can still be searched on its own.
+        assert ["a1"] == [a["href"] for a in first_p.find_all("a")]
+
+        soup.find("a", href="a3").decompose()
+        assert ["a2", "a4"] == self.hrefs(soup)
+
+    def test_replace_with_and_unwrap(self):
+        soup = self.indexed_soup()
+        soup.b.replace_with(soup.new_tag("i"))
+        assert soup.b is None
+        assert soup.i is not None
+
+        soup.p.unwrap()
+        assert ["2", "3"] == [p["id"] for p in soup.find_all("p")]
+        assert ["a1", "a2", "a3", "a4"] == self.hrefs(soup)
+
+    def test_move_within_document(self):
+        soup = self.indexed_soup()
+        last_a = soup.find_all("a")[-1]
+        soup.p.insert(0, last_a)
+        assert ["a4", "a1", "a2", "a3"] == self.hrefs(soup)
+
+    def test_clear_and_string_setter(self):
+        soup = self.indexed_soup()
+        soup.find_all("p")[2].clear()
+        assert ["a1", "a2"] == self.hrefs(soup)
+
+        soup.body.string = "nothing left"
+        assert [] == soup.find_all("a")
+        assert [] == soup.find_all("p")
+        assert soup.title is not None
+
+    def test_rename(self):
+        soup = self.indexed_soup()
+        soup.b.name = "strong"
+        assert soup.b is None
+        assert soup.strong.string == "bold"
+
+        # A renamed tag is filed in document order.
+        soup.find_all("a")[2].name = "strong"
+        assert ["bold", "3"] == [x.string for x in soup.find_all("strong")]
+        assert ["a1", "a2", "a4"] == self.hrefs(soup)
+
+    def test_unindexed_trees_use_plain_attributes(self):
+        # Tag.name and Tag.attrs only become properties once an index
+        # (or a digest) needs to hear about changes to them.
+        code = (
+            "from bs4 import BeautifulSoup; from bs4.element import Tag; "
+            "soup = BeautifulSoup('<b>x</b>', 'html.parser'); "
+            "soup.b.name = 'i'; soup.find_all('i'); before = 'name' in vars(Tag); "
+            "soup = BeautifulSoup('<b>x</b>', 'html.parser', indexed=True); "
+            "soup.b.name = 'i'; print(before, 'name' in vars(Tag), soup.i.string)"
+        )
+        output = subprocess.run(
+            [sys.executable, "-c", code], capture_output=True, text=True, check=True
+        ).stdout.split()
+        assert output == ["False", "True", "x"]
+
+    def test_copy_and_pickle(self):
+        soup = self.indexed_soup()
+        for clone in copy.copy(soup), pickle.loads(pickle.dumps(soup)):
+            assert clone._index is not None
+            assert self.hrefs(clone) == self.hrefs(soup)
+            assert all(
+                a is not b for a, b in zip(clone.find_all("a"), soup.find_all("a"))
+            )
+
+    def test_feed(self):
+        soup = self.soup("", indexed=True)
+        soup.feed("<p><a href='x'>1</a>")
+        soup.feed("<a href='y'>2</a></p>")
+        soup.close()
+        assert ["x", "y"] == self.hrefs(soup)
+
+
+class TestAttributeIndex(SoupTest):
+    markup = (
+        '<div id="main" class="box">'
+        '<p id="first" class="note big">1</p>'
+        '<p class="note">2</p>'
+        '<section class="big"><p id="last" class="big">3</p></section>'
+        "</div>"
+    )
+
+    def indexed_soup(self, markup=None):
+        return self.soup(markup or self.markup, indexed=True)
+
+    def strings(self, results):
+        return [x.get_text() for x in results]
+
+    def test_attribute_indexes_are_lazy(self):
+        soup = self.indexed_soup()
+        assert soup._index._by_id is None
+        assert soup._index._by_class is None
+
+        assert soup.find(id="first").string == "1"
+        assert soup._index._by_id is not None
+        assert soup._index._by_class is None
+
+    def test_lookups_match_tree_search(self):
+        soup = self.indexed_soup()
+        plain = self.soup(self.markup)
+        queries = [
+            dict(id="first"),
+            dict(id="nosuchid"),
+            dict(class_="big"),
+            dict(class_="note big"),
+            dict(name="p", class_="big"),
+            dict(name="section", class_="note"),
+            dict(attrs={"class": "note"}, id="first"),
+            dict(attrs="note"),
+            dict(class_=["note", "box"]),
+            dict(id=True),
+        ]
+        for query in queries:
+            assert [str(x) for x in soup.find_all(**query)] == [
+                str(x) for x in plain.find_all(**query)
+            ]
+
+    def test_lookup_scoped_to_tag(self):
+        soup = self.indexed_soup()
+        assert ["3"] == self.strings(soup.section.find_all(class_="big"))
+        assert soup.section.find(id="first") is None
+
+    def test_setitem_and_delitem(self):
+        soup = self.indexed_soup()
+        assert ["1", "2"] == self.strings(soup.find_all(class_="note"))
+
+        soup.find(id="last")["class"] = ["note"]
+        assert ["1", "2", "3"] == self.strings(soup.find_all(class_="note"))
+        assert ["1", "3"] == self.strings(soup.find_all(class_="big"))
+
+        # A tag that gains a class in the middle of the document is
+        # filed in document order.
+        soup.find(string="2").parent["class"] = ["note", "big"]
+        assert ["1", "2", "3"] == self.strings(
+            soup._index._bucket(soup._index._by_class, "big").values()
+        )
+
+        del soup.find(id="first")["class"]
+        assert ["2", "3"] == self.strings(soup.find_all(class_="note"))
+
+        soup.find(id="first")["id"] = "renamed"
+        assert soup.find(id="first") is None
+        assert soup.find(id="renamed").string == "1"
+
+    def test_tree_mutations(self):
+        soup = self.indexed_soup()
+        assert ["1", "3", "3"] == self.strings(soup.find_all(class_="big"))
+
+        new_tag = soup.new_tag("b", attrs={"class": "big"}, string="new")
+        soup.div.insert(0, new_tag)
+        assert ["new", "1", "3", "3"] == self.strings(soup.find_all(class_="big"))
+
+        soup.section.decompose()
+        assert ["new", "1"] == self.strings(soup.find_all(class_="big"))
+        assert soup.find(id="last") is None
+
+    def test_reassigned_attrs(self):
+        soup = self.indexed_soup()
+        assert soup.find(id="first") is not None
+        assert ["1", "2"] == self.strings(soup.find_all(class_="note"))
+        tag = soup.find(string="2").parent
+        tag.attrs = {"id": "z", "class": ["y"]}
+        assert [tag] == soup.find_all(id="z")
+        assert [tag] == soup.find_all(class_="y")
+        assert ["1"] == self.strings(soup.find_all(class_="note"))
+        assert [tag] == soup._index.select(soup, "#z")
+
+    def test_attrs_changed_in_place(self):
+        soup = self.indexed_soup()
+        plain = self.soup(self.markup)
+        queries = [
+            dict(class_="note"),
+            dict(class_="w"),
+            dict(name="p", class_="w"),
+            dict(id="first"),
+            dict(id="new"),
+        ]
+        for s in soup, plain:
+            s.find_all(class_="note")
+            s.find_all(id="first")
+            tag = s.find(string="2").parent
+            tag["class"].append("w")
+            s.find(id="first")["class"].remove("note")
+            s.find(id="first").attrs["id"] = "new"
+
+        for query in queries:
+            assert [str(x) for x in soup.find_all(**query)] == [
+                str(x) for x in plain.find_all(**query)
+            ]
+        assert ["2"] == self.strings(soup._index.select(soup, ".w"))
+
+        # A stale index was thrown away, and is rebuilt when needed.
+        assert ["2"] == self.strings(soup.find_all(class_="note"))
+        assert soup._index._by_class is not None
+
+    def test_simple_selectors(self):
+        soup = self.indexed_soup()
+        index = soup._index
+        assert ["1", "3", "3"] == self.strings(index.select(soup, ".big"))
+        assert ["1"] == self.strings(index.select(soup, ".big", 1))
+        assert ["3"] == self.strings(index.select(soup, " #last "))
+        assert ["3"] == self.strings(index.select(soup.section, ".big"))
+        # No results from the index means Soup Sieve has to check.
+        assert index.select(soup, "#nosuchid") is None
+
+        # Anything more complicated has to go to Soup Sieve.
+        for selector in ("p.big", "#a, #b", ".a .b", "p", "#1a", "*"):
+            assert index.select(soup, selector) is None
+
+    @pytest.mark.skipif(not SOUP_SIEVE_PRESENT, reason="Soup Sieve not installed")
+    def test_select_uses_index(self):
+        soup = self.indexed_soup()
+        plain = self.soup(self.markup)
+        for selector in (".big", "#last", ".nosuchclass", "p.note", "section .big"):
+            assert [str(x) for x in soup.select(selector)] == [
+                str(x) for x in plain.select(selector)
+            ]
+        assert soup.select_one("#first").string == "1"
+        assert soup.section.select_one(".note") is None
+
+    def test_class_tokens_in_xml_document(self):
+        # In an XML document, 'class' isn't a multi-valued attribute,
+        # so find_all() matches the whole value but CSS matches the
+        # individual tokens.
+        soup = self.soup(
+            '<doc><item class="a b"/><item class="a"/></doc>',
+            builder=self.default_builder().__class__,
+            indexed=True,
+            multi_valued_attributes=None,
+        )
+        assert 1 == len(soup.find_all(class_="a"))
+        assert 2 == len(soup._index.select(soup, ".a"))
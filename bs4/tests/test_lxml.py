@@ -194,3 +194,18 @@ class TestLXMLXMLTreeBuilder(XMLTreeBuilderSmokeTest):
         assert "some markup" == unpickled.a.string
         assert unpickled.builder != soup.builder
         assert isinstance(unpickled.builder, self.default_builder)
+
+    def test_utf16_document_is_not_copied(self):
+        # A document with a byte-order mark is given to the parser
+        # as a view of the original bytestring, not as a copy.
+        data = '<?xml version="1.0" encoding="UTF-16"?><root>\N{SNOWMAN}</root>'
+        markup = b"\xff\xfe" + data.encode("utf-16le")
+        strategies = list(self.default_builder().prepare_markup(markup))
+        buffer, encoding = strategies[0][:2]
+        assert isinstance(buffer, memoryview)
+        assert "utf-16le" == encoding
+        assert buffer.obj is markup
+
+        soup = self.soup(markup)
+        assert "\N{SNOWMAN}" == soup.root.string
+        assert "utf-16le" == soup.original_encoding
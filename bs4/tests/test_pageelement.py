@@ -1,6 +1,11 @@
 """Tests of the bs4.element.PageElement class"""
 
+import codecs
 import copy
+from io import (
+    BytesIO,
+    StringIO,
+)
 import pickle
 import pytest
 import sys
@@ -10,6 +15,8 @@ from bs4 import BeautifulSoup
 from bs4.element import (
     AttributeValueList,
     Comment,
+    Tag,
+    _ChunkedWriter,
 )
 from bs4.filter import SoupStrainer
 from . import (
@@ -79,6 +86,86 @@ class TestEncoding(SoupTest):
         soup = self.soup(html)
         assert html == repr(soup)
 
+    write_to_markup = (
+        '<html><head><meta content="text/html; charset=x-sjis" '
+        'http-equiv="Content-type"/></head>'
+        "<body><p>\N{SNOWMAN} &amp; <b>bold</b></p><pre> x </pre></body></html>"
+    )
+
+    @pytest.mark.parametrize("encoding", ["utf-8", "utf-16", "latin-1", "ascii"])
+    def test_write_to_binary_stream(self, encoding):
+        soup = self.soup(self.write_to_markup)
+        fp = BytesIO()
+        soup.write_to(fp, encoding=encoding)
+        assert fp.getvalue() == soup.encode(encoding)
+
+        fp = BytesIO()
+        soup.p.write_to(fp, encoding=encoding, formatter="html", pretty=True)
+        assert fp.getvalue() == soup.p.prettify(encoding, formatter="html")
+
+    def test_write_to_text_stream(self):
+        soup = self.soup(self.write_to_markup)
+        fp = StringIO()
+        soup.write_to(fp)
+        assert fp.getvalue() == soup.decode()
+
+    def test_write_to_other_text_streams(self):
+        soup = self.soup(self.write_to_markup)
+
+        # An object with nothing but a write() method is given strings.
+        class Writer(object):
+            def __init__(self):
+                self.pieces = []
+
+            def write(self, data):
+                assert isinstance(data, str)
+                self.pieces.append(data)
+
+        fp = Writer()
+        soup.write_to(fp)
+        assert "".join(fp.pieces) == soup.decode()
+
+        # So is a codecs.StreamWriter, which does its own encoding.
+        data = BytesIO()
+        soup.write_to(codecs.getwriter("utf-16")(data))
+        assert data.getvalue().decode("utf-16") == soup.decode()
+
+        # An encoding of None means the stream is a text stream.
+        fp = Writer()
+        soup.write_to(fp, encoding=None)
+        assert "".join(fp.pieces) == soup.decode(eventual_encoding=None)
+
+    def test_write_to_stream_with_binary_mode(self):
+        soup = self.soup(self.write_to_markup)
+
+        class Writer(object):
+            mode = "wb"
+
+            def __init__(self):
+                self.data = b""
+
+            def write(self, data):
+                self.data += data
+
+        fp = Writer()
+        soup.write_to(fp)
+        assert fp.data == soup.encode()
+
+    def test_write_to_writes_in_chunks(self, monkeypatch):
+        soup = self.soup("<p>\N{SNOWMAN}</p>" * 100)
+        writes = []
+
+        class Stream(BytesIO):
+            def write(self, data):
+                writes.append(data)
+                return super(Stream, self).write(data)
+
+        monkeypatch.setattr(_ChunkedWriter, "CHUNK_SIZE", 50)
+        fp = Stream()
+        soup.write_to(fp, encoding="utf-16")
+        assert len(writes) > 1
+        assert fp.getvalue() == soup.encode("utf-16")
+
 
 class TestFormatters(SoupTest):
     """Test the formatting feature, used by methods like decode() and
@@ -268,6 +355,65 @@ class TestFormatters(SoupTest):
         soup = self.soup(markup, parse_only=strainer)
         assert soup.contents[0].name == "pre"
 
+    @pytest.mark.parametrize("formatter", ["minimal", "html", "html5", None])
+    def test_fast_output_matches_general_output(self, formatter):
+        # When there's no pretty-printing, decode() takes a shortcut.
+        # Passing in an iterator forces it to go the long way around.
+        markup = (
+            '<html><head><meta content="text/html; charset=x-sjis" '
+            'http-equiv="Content-type"/><title>T&amp;C</title></head>'
+            '<body class="a b" data-x="">'
+            '<p id="1">&lt;Sacr\N{LATIN SMALL LETTER E WITH ACUTE}&gt;'
+            "<br><img src=\"a&amp;b\"><!--a comment--></p>"
+            "<script>if (a < b) {}</script><pre> x </pre><empty></empty>"
+            "</body></html>"
+        )
+        soup = self.soup(markup)
+        for tag in (soup, soup.body, soup.p, soup.br):
+            general = tag.decode(
+                formatter=formatter, iterator=tag.self_and_descendants
+            )
+            assert tag.decode(formatter=formatter) == general
+            assert tag.decode(eventual_encoding="utf-8", formatter=formatter) == (
+                tag.decode(
+                    eventual_encoding="utf-8",
+                    formatter=formatter,
+                    iterator=tag.self_and_descendants,
+                )
+            )
+            assert tag.decode_contents(formatter=formatter) == tag.decode(
+                formatter=formatter, iterator=tag.descendants
+            )
+
+    def test_fast_output_of_xml_document(self):
+        # The XML declaration at the start of an XML document comes
+        # out of both paths, including when only the document's
+        # contents are rendered.
+        soup = self.soup("<root><item id='1'>a &amp; b</item><empty/></root>")
+        soup.is_xml = True
+        for encoding in (None, "utf-8"):
+            general = soup.decode(
+                eventual_encoding=encoding, iterator=soup.self_and_descendants
+            )
+            assert general.startswith('<?xml version="1.0"')
+            assert soup.decode(eventual_encoding=encoding) == general
+            assert soup.decode_contents(eventual_encoding=encoding) == (
+                soup.decode(eventual_encoding=encoding, iterator=soup.descendants)
+            )
+        assert soup.encode_contents().startswith(b'<?xml version="1.0"')
+
+    def test_fast_output_with_prefixes_and_hidden_tags(self):
+        soup = self.soup("<p>text</p>")
+        tag = Tag(None, soup.builder, "item", "urn:x", "ns")
+        tag.append("value")
+        soup.p.append(tag)
+        hidden = soup.new_tag("hidden")
+        hidden.hidden = True
+        hidden.append(soup.new_tag("b"))
+        soup.p.append(hidden)
+        assert soup.p.decode() == "<p>text<ns:item>value</ns:item><b></b></p>"
+        assert soup.p.decode() == soup.p.decode(iterator=soup.p.self_and_descendants)
+
 
 class TestPersistence(SoupTest):
     "Testing features like pickle and deepcopy."
@@ -0,0 +1,198 @@
+import pytest
+from unittest import mock
+
+from bs4 import (
+    BeautifulSoup,
+    parse_many,
+    parse_split,
+)
+from bs4.exceptions import FeatureNotFound
+from bs4.filter import SoupStrainer
+from . import SoupTest
+
+
+# Transforms have to be defined at the top level of a module, so they
+# can be sent to the worker processes.
+def text(soup):
+    return soup.get_text()
+
+
+def tag_names(soup):
+    return [tag.name for tag in soup.find_all(True)]
+
+
+def fail(soup):
+    raise ValueError("Can't handle %s" % soup.get_text())
+
+
+class TestParseMany(SoupTest):
+    documents = ["<p>%d</p>" % i for i in range(20)]
+
+    def test_ordered(self):
+        expect = [str(i) for i in range(20)]
+        for chunksize in (1, 3, 50):
+            assert expect == list(
+                parse_many(
+                    self.documents, "html.parser", transform=text, workers=2,
+                    chunksize=chunksize,
+                )
+            )
+
+    def test_unordered(self):
+        results = parse_many(
+            self.documents, "html.parser", transform=text, workers=2,
+            chunksize=3, ordered=False,
+        )
+        assert sorted(str(i) for i in range(20)) == sorted(results)
+
+    def test_in_this_process(self):
+        assert ["0", "1"] == list(
+            parse_many(self.documents[:2], "html.parser", transform=text, workers=0)
+        )
+
+    def test_without_transform(self):
+        for workers in (0, 1):
+            soups = list(
+                parse_many(["<b>bold</b>", b"<i>x</i>"], "html.parser", workers=workers)
+            )
+            assert all(isinstance(soup, BeautifulSoup) for soup in soups)
+            assert ["<b>bold</b>", "<i>x</i>"] == [soup.decode() for soup in soups]
+
+    def test_arguments_are_passed_into_constructor(self):
+        results = parse_many(
+            ["<a>1</a><b>2</b>"], "html.parser", transform=tag_names,
+            workers=1, parse_only=SoupStrainer("b"),
+        )
+        assert [["b"]] == list(results)
+
+    def test_bad_arguments(self):
+        with pytest.raises(FeatureNotFound):
+            list(parse_many(self.documents, "no-such-feature", workers=1))
+        with pytest.raises(ValueError):
+            list(parse_many(self.documents, "html.parser", chunksize=0))
+
+    def test_exception_in_worker(self):
+        with pytest.raises(ValueError) as e:
+            list(parse_many(self.documents, "html.parser", transform=fail, workers=1))
+        assert "Can't handle 0" == str(e.value)
+
+    def test_documents_are_read_as_needed(self):
+        read = []
+
+        def documents():
+            for i in range(100):
+                read.append(i)
+                yield "<p>%d</p>" % i
+
+        results = parse_many(
+            documents(), "html.parser", transform=text, workers=1, max_pending=2
+        )
+        assert "0" == next(results)
+        assert len(read) <= 3
+        results.close()
+
+
+class TestParseSplit(SoupTest):
+    records = "".join(
+        '<div class="record" id="r%d">\n  <p>Record <b>%d</b></p>\n</div>\n' % (i, i)
+        for i in range(12)
+    )
+
+    def document(self, body):
+        return (
+            "<!DOCTYPE html>\n<html><head><title>Records</title></head>\n<body>\n"
+            + body
+            + "</body>\n<!--end-->\n<p>after</p></html>"
+        )
+
+    def assert_same_as_serial(self, markup, **kwargs):
+        expect = BeautifulSoup(markup, "html.parser")
+        soup = parse_split(markup, workers=2, segments=4, **kwargs)
+        assert expect.decode() == soup.decode()
+
+        expect_elements = list(expect.descendants)
+        elements = list(soup.descendants)
+        assert [str(x) for x in expect_elements] == [str(x) for x in elements]
+        previous = None
+        for element in elements:
+            assert element.previous_element is previous
+            if previous is not None:
+                assert previous.next_element is element
+            previous = element
+        assert elements[-1].next_element is None
+
+        for tag in [soup] + soup.find_all(True):
+            for i, child in enumerate(tag.contents):
+                assert child.parent is tag
+                assert child.previous_sibling is (tag.contents[i - 1] if i else None)
+                if i + 1 < len(tag.contents):
+                    assert child.next_sibling is tag.contents[i + 1]
+                else:
+                    assert child.next_sibling is None
+
+        assert [(x.sourceline, x.sourcepos) for x in expect.find_all(True)] == [
+            (x.sourceline, x.sourcepos) for x in soup.find_all(True)
+        ]
+        assert expect.digest() == soup.digest()
+        return soup
+
+    def test_same_as_serial_parse(self):
+        soup = self.assert_same_as_serial(self.document(self.records))
+        assert soup.find(id="r11").b.string == "11"
+        assert soup.find_all("p")[-1].string == "after"
+        soup.append(soup.new_tag("footer"))
+        assert soup.footer.previous_element.string == "after"
+
+    def test_split_like_markup_in_comments_and_scripts(self):
+        tricky = (
+            "<!-- </div>\n<div> -->\n"
+            "<script>var s = '</div><div>';</script>\n"
+            "<style>/* </div><div> */</style>\n"
+        )
+        half = self.records.count("\n") // 2
+        lines = self.records.splitlines(True)
+        body = "".join(lines[:half]) + tricky * 4 + "".join(lines[half:])
+        self.assert_same_as_serial(self.document(body))
+
+    def test_pieces_that_cannot_stand_alone(self):
+        # A record nested inside another record can't be parsed on
+        # its own, nor can a stray end tag.
+        nested = "<div>" + self.records + "</div>" + self.records
+        self.assert_same_as_serial(self.document(nested))
+        stray = self.records + "</span></div>" + self.records
+        self.assert_same_as_serial(self.document(stray))
+        unclosed = self.records + "<div><p>never closed\n" + self.records
+        self.assert_same_as_serial(self.document(unclosed))
+
+    def test_documents_that_cannot_be_split(self):
+        self.assert_same_as_serial("<p>No body</p>")
+        self.assert_same_as_serial("<body><p>One record</p></body>")
+        self.assert_same_as_serial("<html><body>" + self.records)
+
+    def test_other_container(self):
+        markup = self.document("<ul>%s</ul>" % "".join(
+            "<li>%d</li>" % i for i in range(20)
+        ))
+        self.assert_same_as_serial(markup, container="ul")
+
+    def test_bytes(self):
+        markup = self.document(self.records + "<p>caf\xe9</p>").encode("utf8")
+        soup = self.assert_same_as_serial(markup)
+        assert "utf-8" == soup.original_encoding
+
+    def test_in_this_process(self):
+        # With no more than one worker, the document isn't split at
+        # all, because a pool of one process is only overhead.
+        markup = self.document(self.records)
+        expect = BeautifulSoup(markup, "html.parser").decode()
+        with mock.patch("bs4.parallel._split_points", side_effect=AssertionError):
+            for workers in (0, 1):
+                assert parse_split(markup, workers=workers).decode() == expect
+            with mock.patch("os.cpu_count", return_value=1):
+                assert parse_split(markup).decode() == expect
+
+    def test_only_html_parser(self):
+        with pytest.raises(ValueError):
+            parse_split(self.document(self.records), "html5lib", workers=1)
+        with pytest.raises(FeatureNotFound):
+            parse_split(self.document(self.records), "no-such-feature", workers=1)
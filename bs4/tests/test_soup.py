@@ -1,6 +1,8 @@
 # -*- coding: utf-8 -*-
 """Tests of Beautiful Soup as a whole."""
 
+import copy
+import io
 import logging
 import pickle
 import pytest
@@ -9,7 +11,10 @@ from typing import Iterable
 from bs4 import (
     BeautifulSoup,
     GuessedAtParserWarning,
+    ParserSession,
     dammit,
+    iterparse,
+    _IterParseSoup,
 )
 from bs4.builder import (
     TreeBuilder,
@@ -24,6 +29,7 @@ from bs4.element import (
 )
 from bs4.filter import SoupStrainer
 from bs4.exceptions import (
+    FeatureNotFound,
     ParserRejectedMarkup,
 )
 from bs4._warnings import (
@@ -244,6 +250,204 @@ class TestConstructor(SoupTest):
         )
 
 
+class TestIncrementalFeed(SoupTest):
+    def test_builder_without_incremental_support(self):
+        # If a TreeBuilder can't parse a document a little at a time,
+        # the chunks are buffered and parsed when close() is called.
+        class BufferingBuilder(default_builder):
+            FEEDS_INCREMENTALLY = False
+
+        soup = self.soup("<p>old</p>", builder=BufferingBuilder)
+        soup.feed(b"<p>f")
+        # The old tree is gone as soon as feeding starts.
+        assert soup.p is None
+        soup.feed(b"oo</p>")
+        soup.close()
+        assert soup.decode() == "<p>foo</p>"
+
+    def test_cannot_mix_strings_and_bytestrings(self):
+        class BufferingBuilder(default_builder):
+            FEEDS_INCREMENTALLY = False
+
+        for builder in (default_builder, BufferingBuilder):
+            soup = self.soup("", builder=builder)
+            soup.feed(b"<p>")
+            with pytest.raises(TypeError):
+                soup.feed("</p>")
+
+            soup = self.soup("", builder=builder)
+            soup.feed("<p>a")
+            with pytest.raises(TypeError):
+                soup.feed(b"<b>\xc3\xa9</b>")
+
+    def test_encoding_detected_from_first_chunk(self):
+        soup = self.soup("")
+        soup.feed('<meta charset="windows-1252"><p>caf'.encode("cp1252"))
+        soup.feed("\N{LATIN SMALL LETTER E WITH ACUTE}</p>".encode("cp1252"))
+        soup.close()
+        assert soup.original_encoding == "windows-1252"
+        assert soup.p.string == "caf\N{LATIN SMALL LETTER E WITH ACUTE}"
+
+
+class TestParserSession(SoupTest):
+    def test_parse(self):
+        session = ParserSession(builder=default_builder)
+        documents = [
+            "<p>one</p>",
+            "<a href='x'>two</a><br>",
+            "<p>caf\N{LATIN SMALL LETTER E WITH ACUTE}</p>".encode("utf8"),
+            io.StringIO("<b>three</b>"),
+        ]
+        soups = [session.parse(document) for document in documents]
+        assert [soup.decode() for soup in soups] == [
+            '<p>one</p>',
+            '<a href="x">two</a><br/>',
+            "<p>caf\N{LATIN SMALL LETTER E WITH ACUTE}</p>",
+            "<b>three</b>",
+        ]
+        assert soups[2].original_encoding == "utf-8"
+        assert soups[0].original_encoding is None
+
+        # Each document is independent of the others, but they share
+        # a TreeBuilder.
+        assert soups[0].p is not soups[2].p
+        assert all(soup.builder is session.builder for soup in soups)
+        assert session.builder.soup is None
+
+    def test_same_result_as_constructor(self):
+        markup = "<html><p class='a b'>1<br>2</p><!--c--><script>x<y</script>"
+        session = ParserSession(builder=default_builder)
+        for i in range(2):
+            assert session.parse(markup) == self.soup(markup)
+
+    def test_settings_apply_to_every_document(self):
+        session = ParserSession(
+            builder=default_builder,
+            parse_only=SoupStrainer("b"),
+            indexed=True,
+            multi_valued_attributes=None,
+        )
+        for markup in ("<a>1</a><b class='x y'>2</b>", "<b class='z'>3</b>"):
+            soup = session.parse(markup)
+            assert soup.find_all("a") == []
+            assert soup.b["class"] in ("x y", "z")
+            assert soup._index is not None
+
+    def test_arguments_are_checked_once(self):
+        with pytest.raises(FeatureNotFound):
+            ParserSession("no-such-feature")
+
+        session = ParserSession(builder=default_builder)
+        with warnings.catch_warnings(record=True) as w:
+            session.parse("http://example.com/")
+        assert w == []
+        with pytest.raises(TypeError):
+            session.parse(object())
+
+    def test_rejected_markup_does_not_break_session(self):
+        session = ParserSession(builder=default_builder)
+        assert session.parse("<p>one</p>").p.string == "one"
+        with pytest.raises(ParserRejectedMarkup):
+            session.parse(b"\n<![\xff\xfe\xfe\xcd\x00")
+        assert session.parse("<p>two</p>").p.string == "two"
+
+
+class TestIterParse(SoupTest):
+    record = '<div class="record" id="r%d"><b>%d</b><br/></div>\n'
+
+    @property
+    def document(self):
+        records = "".join(self.record % (i, i) for i in range(10))
+        return "<html><body><h1>Records</h1>\n" + records + "</body></html>"
+
+    def test_yields_matching_tags_in_order(self):
+        records = iterparse(
+            self.document,
+            builder=default_builder,
+            match=SoupStrainer("div", class_="record"),
+            chunk_size=7,
+        )
+        seen = []
+        for i, record in enumerate(records):
+            assert record["id"] == "r%d" % i
+            assert record.decode() == (self.record % (i, i)).strip()
+            seen.append(record)
+        assert len(seen) == 10
+
+        # Each tag was taken out of the tree once the next one was
+        # requested.
+        for record in seen[:-1]:
+            assert record.parent is None
+            assert record.next_element.name == "b"
+
+    def test_earlier_siblings_are_released(self):
+        records = iterparse(
+            self.document,
+            builder=default_builder,
+            match=SoupStrainer("div"),
+            chunk_size=20,
+        )
+        first = next(records)
+        body = first.parent
+        assert body.name == "body"
+        next(records)
+        # The <h1> tag and the first record are gone.
+        assert body.h1 is None
+        assert first not in body.contents
+
+    def test_wrapped_records_are_released(self):
+        # Each record is inside a tag that doesn't match. Those tags
+        # are taken out of the tree too, once they're closed.
+        wrapped = "<article><p>intro</p>%s<p>outro</p></article>\n"
+        records = "".join(wrapped % (self.record % (i, i)) for i in range(50))
+        markup = "<html><body>" + records + "</body></html>"
+        found = iterparse(
+            markup,
+            builder=default_builder,
+            match=SoupStrainer("div", class_="record"),
+            chunk_size=30,
+        )
+        sizes = []
+        for i, record in enumerate(found):
+            assert record["id"] == "r%d" % i
+            assert record.parent.name == "article"
+            root = record
+            while root.parent is not None:
+                root = root.parent
+            sizes.append(len(list(root.descendants)))
+        assert len(sizes) == 50
+        assert max(sizes) < 30
+
+    def test_completed_tags_forgotten_when_parsing_again(self):
+        # If a document has to be parsed again with a different
+        # encoding, the tags found the first time are thrown away.
+        soup = _IterParseSoup(SoupStrainer("p"), "", builder=default_builder)
+        soup._parse_markup("<p>1</p>")
+        soup._parse_markup("<p>2</p>")
+        assert ["2"] == [x.string for x in soup._completed]
+
+    def test_sources(self):
+        strainer = SoupStrainer("div")
+        expect = [str(x) for x in self.soup(self.document).find_all("div")]
+        for source in (
+            self.document.encode("utf8"),
+            io.StringIO(self.document),
+            io.BytesIO(self.document.encode("utf8")),
+            [self.document[:50], self.document[50:]],
+        ):
+            found = iterparse(source, builder=default_builder, match=strainer)
+            assert [str(x) for x in found] == expect
+
+    def test_only_outermost_match_is_yielded(self):
+        markup = "<div>1<div>2</div></div><div>3</div>"
+        found = iterparse(markup, builder=default_builder, match=SoupStrainer("div"))
+        assert [str(x) for x in found] == ["<div>1<div>2</div></div>", "<div>3</div>"]
+
+    def test_no_match_yields_top_level_tags(self):
+        found = iterparse("<a>1</a>text<b>2<c/></b>", builder=default_builder)
+        assert [x.name for x in found] == ["a", "b"]
+
+
 class TestOutput(SoupTest):
     @pytest.mark.parametrize(
         "eventual_encoding,actual_encoding",
@@ -547,6 +751,113 @@ class TestPickle(SoupTest):
         unpickled = pickle.loads(pickled)
         assert "some markup" == unpickled.string
 
+    def test_pickle_stores_tree_not_markup(self):
+        soup = self.soup("<a>some markup</a>")
+        state = soup.__getstate__()
+        assert state["markup"] is None
+        assert state["_tree"] == soup.dumps()
+
+    def test_unpickle_markup_from_older_version(self):
+        # Older versions of Beautiful Soup pickled the document as
+        # markup, which has to be parsed again.
+        soup = self.soup("<a>some markup</a>")
+        state = soup.__getstate__()
+        del state["_tree"]
+        state["markup"] = soup.decode()
+        clone = BeautifulSoup.__new__(BeautifulSoup)
+        clone.__setstate__(state)
+        assert "some markup" == clone.a.string
+
+
+class TestBinarySerialization(SoupTest):
+    markup = (
+        "<!DOCTYPE html><html><head><title>A title</title>"
+        '<meta charset="utf-8"></head>'
+        '<body><p class="a b" id="p1">Some <b>bold</b> text<br>'
+        "<!--a comment--></p><script>if (a < b) {}</script>"
+        '<textarea> spaces </textarea><p class="">\ud800</p></body></html>'
+    )
+
+    def assert_same_tree(self, soup, clone):
+        assert clone.decode() == soup.decode()
+        original = list(soup.descendants)
+        copied = list(clone.descendants)
+        assert len(original) == len(copied)
+        for a, b in zip(original, copied):
+            assert a is not b
+            assert type(a) is type(b)
+            if isinstance(a, Tag):
+                assert a.attrs == b.attrs
+                assert a.sourceline == b.sourceline
+                assert a.sourcepos == b.sourcepos
+                assert a.can_be_empty_element == b.can_be_empty_element
+                assert len(a.contents) == len(b.contents)
+
+        # The linkage of the new tree is internally consistent.
+        in_order = []
+        pending = list(reversed(clone.contents))
+        while pending:
+            element = pending.pop()
+            in_order.append(element)
+            if isinstance(element, Tag):
+                pending.extend(reversed(element.contents))
+        assert all(a is b for a, b in zip(copied, in_order))
+        for element in copied:
+            if element.next_sibling is not None:
+                assert element.next_sibling.previous_sibling is element
+            if element.next_element is not None:
+                assert element.next_element.previous_element is element
+        assert copied[-1].next_element is None
+
+    def test_dumps_and_loads(self):
+        soup = self.soup(self.markup)
+        data = soup.dumps()
+        assert isinstance(data, bytes)
+        clone = BeautifulSoup.loads(data)
+        self.assert_same_tree(soup, clone)
+        assert isinstance(clone.builder, type(soup.builder))
+        assert clone.p["class"] == ["a", "b"]
+        assert isinstance(clone.p["class"], AttributeValueList)
+        assert clone.meta["charset"].original_value == "utf-8"
+
+        # The new tree can be modified like any other.
+        clone.b.replace_with(clone.new_tag("i"))
+        assert "<i></i>" in clone.p.decode()
+        assert "<b>bold</b>" in soup.p.decode()
+
+    def test_loads_bytestring_document(self):
+        soup = self.soup(b'<meta charset="windows-1252"><p>Sacr\xe9 bleu!</p>')
+        clone = BeautifulSoup.loads(soup.dumps())
+        assert clone.original_encoding == soup.original_encoding
+        assert clone.encode() == soup.encode()
+
+    def test_loads_with_builder(self):
+        soup = self.soup("<p>text</p>")
+        clone = BeautifulSoup.loads(soup.dumps(), builder=self.default_builder)
+        assert clone.p.string == "text"
+
+    def test_custom_element_classes(self):
+        soup = self.soup("<p>text</p>", element_classes={Tag: TagForSerialization})
+        clone = BeautifulSoup.loads(soup.dumps())
+        assert isinstance(clone.p, TagForSerialization)
+
+    def test_deepcopy(self):
+        soup = self.soup(self.markup)
+        clone = copy.deepcopy(soup)
+        self.assert_same_tree(soup, clone)
+        self.assert_same_tree(soup, copy.copy(soup))
+
+    def test_bad_data(self):
+        with pytest.raises(ValueError):
+            BeautifulSoup.loads(b"not a tree")
+        data = self.soup(self.markup).dumps()
+        with pytest.raises(ValueError):
+            BeautifulSoup.loads(data[:-10])
+
+
+class TagForSerialization(Tag):
+    pass
+
 
 class TestEncodingConversion(SoupTest):
     # Test Beautiful Soup's ability to decode and encode from various
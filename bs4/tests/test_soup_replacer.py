@@ -1,5 +1,9 @@
 import unittest
-from bs4 import BeautifulSoup, SoupReplacer
+from unittest import mock
+from bs4 import BeautifulSoup, ReplacerPipeline, SoupReplacer
+from bs4.builder import HTMLParserTreeBuilder
+from bs4.index import TreeIndex
+from . import HTML5LIB_PRESENT
 
 class TestSoupReplacer(unittest.TestCase):
     """
@@ -96,6 +100,356 @@ class TestSoupReplacer(unittest.TestCase):
         self.assertEqual(str(soup), '<a href="foo.com" target="_blank">link</a><p>text</p>')
         
 
+    # --- Rules Tests ---
+
+    def test_rules_rename(self):
+        html = "<p><b>Hello</b> <i>World</i></p>"
+        replacer = SoupReplacer.rules({"b": "blockquote"})
+        soup = BeautifulSoup(html, "html.parser", replacer=replacer)
+        self.assertEqual(
+            str(soup), "<p><blockquote>Hello</blockquote> <i>World</i></p>"
+        )
+
+    def test_rules_renames_are_applied_once(self):
+        # Swapping two names only works if each tag is renamed exactly once.
+        html = "<b>bold</b><i>italic</i>"
+        replacer = SoupReplacer.rules({"b": "i", "i": "b"})
+        soup = BeautifulSoup(html, "html.parser", replacer=replacer)
+        self.assertEqual(str(soup), "<i>bold</i><b>italic</b>")
+
+    @unittest.skipIf(not HTML5LIB_PRESENT, "html5lib seems not to be present")
+    def test_rename_with_html5lib(self):
+        # html5lib still sees the original name while it builds the
+        # tree, so a renamed formatting element is closed, and
+        # reconstructed, just like the original.
+        replacer = SoupReplacer("b", "i")
+        soup = BeautifulSoup("<b>x</b><p>y</p>", "html5lib", replacer=replacer)
+        self.assertEqual(soup.body.decode(), "<body><i>x</i><p>y</p></body>")
+
+        soup = BeautifulSoup("<p><b>x<p>y</b>z</p>", "html5lib", replacer=replacer)
+        self.assertEqual(
+            soup.body.decode(), "<body><p><i>x</i></p><p><i>y</i>z</p></body>"
+        )
+        self.assertIsNone(soup.b)
+
+    def test_rules_attributes(self):
+        html = (
+            '<p class="x" style="color: red" id="p1">'
+            '<a href="a.html" target="_blank" style="s">link</a>'
+            '<img src="i.jpg" alt="pic"></p>'
+        )
+        replacer = SoupReplacer.rules(
+            drop_attrs={"style"}, keep_attrs={"a": {"href", "style"}}
+        )
+        soup = BeautifulSoup(html, "html.parser", replacer=replacer)
+        self.assertEqual(soup.p.attrs, {"class": ["x"], "id": "p1"})
+        self.assertEqual(soup.a.attrs, {"href": "a.html"})
+        self.assertEqual(soup.img.attrs, {"src": "i.jpg", "alt": "pic"})
+
+    def test_rules_attribute_whitelist(self):
+        # The same whitelist as apps/m3/task7.py.
+        html = (
+            '<p class="x"><a href="a.html" class="y">link</a>'
+            '<img src="i.jpg" alt="pic"></p>'
+        )
+        replacer = SoupReplacer.rules(
+            keep_attrs={"a": {"href"}, "img": {"src"}, "*": ()}
+        )
+        soup = BeautifulSoup(html, "html.parser", replacer=replacer)
+        self.assertEqual(
+            str(soup), '<p><a href="a.html">link</a><img src="i.jpg"/></p>'
+        )
+
+    def test_keep_attrs_uses_new_name(self):
+        html = '<b id="1" class="x">Hello</b>'
+        replacer = SoupReplacer.rules({"b": "strong"}, keep_attrs={"strong": {"id"}})
+        soup = BeautifulSoup(html, "html.parser", replacer=replacer)
+        self.assertEqual(str(soup), '<strong id="1">Hello</strong>')
+
+    def test_xformer_called_once_per_tag(self):
+        seen = []
+        replacer = SoupReplacer(xformer=lambda tag: seen.append(tag.name))
+        BeautifulSoup("<p><b>x</b></p>", "html.parser", replacer=replacer)
+        self.assertEqual(seen, ["p", "b"])
+
+    def test_replacer_with_builder_instance(self):
+        replacer = SoupReplacer.rules({"b": "i"})
+        builder = HTMLParserTreeBuilder(replacer=replacer)
+        soup = BeautifulSoup("<b>x</b>", builder=builder)
+        self.assertIs(soup.replacer, replacer)
+        self.assertEqual(str(soup), "<i>x</i>")
+
+    # --- Pipeline Tests ---
+
+    def test_pipeline_applies_stages_in_order(self):
+        html = '<b class="x" style="s">Hello</b><i>World</i>'
+        calls = []
+
+        def record(tag):
+            calls.append((tag.name, sorted(tag.attrs)))
+
+        pipeline = ReplacerPipeline(
+            SoupReplacer.rules({"b": "strong"}),
+            SoupReplacer.rules(drop_attrs={"style"}),
+            SoupReplacer(xformer=record),
+        )
+        soup = BeautifulSoup(html, "html.parser", replacer=pipeline)
+        self.assertEqual(str(soup), '<strong class="x">Hello</strong><i>World</i>')
+
+        # The last stage saw each tag once, after the earlier stages.
+        self.assertEqual(calls, [("strong", ["class"]), ("i", [])])
+
+    def test_pipeline_renames_cascade(self):
+        pipeline = ReplacerPipeline(SoupReplacer("b", "i"), SoupReplacer("i", "em"))
+        soup = BeautifulSoup("<b>1</b><i>2</i>", "html.parser", replacer=pipeline)
+        self.assertEqual(str(soup), "<em>1</em><em>2</em>")
+
+    def test_pipeline_stage_names(self):
+        html = '<a href="x" class="c">link</a><p class="c">text</p><b>bold</b>'
+        pipeline = ReplacerPipeline()
+        pipeline.add(SoupReplacer("p", "div"), names=["p"])
+        pipeline.add(SoupReplacer("b", "p"), names=["b"])
+
+        # Renaming comes first, so this stage sees the renamed tag.
+        pipeline.add(SoupReplacer.rules(keep_attrs={"*": ()}), names={"div"})
+        soup = BeautifulSoup(html, "html.parser", replacer=pipeline)
+        self.assertEqual(
+            str(soup), '<a class="c" href="x">link</a><div>text</div><p>bold</p>'
+        )
+
+    def test_pipeline_stop(self):
+        html = '<p class="keep">1</p><p class="x">2</p>'
+
+        def keep_marked(tag):
+            if "keep" in tag.get("class", []):
+                return SoupReplacer.STOP
+
+        pipeline = ReplacerPipeline(
+            SoupReplacer(xformer=keep_marked),
+            SoupReplacer.rules(keep_attrs={"*": ()}),
+        )
+        soup = BeautifulSoup(html, "html.parser", replacer=pipeline)
+        self.assertEqual(str(soup), '<p class="keep">1</p><p>2</p>')
+
+        # A pipeline inside a pipeline stops the outer one, too.
+        outer = ReplacerPipeline(pipeline, SoupReplacer.rules(keep_attrs={"*": ()}))
+        soup = BeautifulSoup(html, "html.parser", replacer=outer)
+        self.assertEqual(str(soup), '<p class="keep">1</p><p>2</p>')
+
+    # --- String and Drop Tests ---
+
+    def test_string_xformer(self):
+        html = "<p>  Hello   <b>big</b>   world </p><!-- a   comment -->"
+        replacer = SoupReplacer(string_xformer=lambda text: " ".join(text.split()))
+        soup = BeautifulSoup(html, "html.parser", replacer=replacer)
+
+        # Comments aren't touched, and strings that end up empty are
+        # left out.
+        self.assertEqual(
+            str(soup), "<p>Hello<b>big</b>world</p><!-- a   comment -->"
+        )
+        self.assertEqual(len(soup.p.contents), 3)
+
+    def test_string_xformer_can_drop_strings(self):
+        html = "<p>keep</p><p>secret</p>"
+        replacer = SoupReplacer(
+            string_xformer=lambda text: None if text == "secret" else text
+        )
+        soup = BeautifulSoup(html, "html.parser", replacer=replacer)
+        self.assertEqual(str(soup), "<p>keep</p><p></p>")
+
+    def test_drop_by_name(self):
+        html = (
+            "<div><script>var x = '<p>';</script><p>text</p>"
+            "<style>p {}</style><br><span>more</span></div>"
+        )
+        replacer = SoupReplacer.rules(drop_tags={"script", "style", "br"})
+        soup = BeautifulSoup(html, "html.parser", replacer=replacer)
+        self.assertEqual(str(soup), "<div><p>text</p><span>more</span></div>")
+
+    def test_drop_by_function(self):
+        html = (
+            '<div class="ad"><p>Buy <b>now</b></p></div>'
+            '<div class="content"><p>Article</p></div>'
+        )
+
+        def is_ad(name, attrs):
+            return name == "div" and "ad" in attrs.get("class", "").split()
+
+        replacer = SoupReplacer(drop=is_ad)
+        soup = BeautifulSoup(html, "html.parser", replacer=replacer)
+        self.assertEqual(str(soup), '<div class="content"><p>Article</p></div>')
+        self.assertIsNone(soup.b)
+
+    def test_drop_uses_new_name(self):
+        html = "<b>bold</b><i>italic</i>"
+        replacer = ReplacerPipeline(
+            SoupReplacer("b", "i"), SoupReplacer.rules(drop_tags=["b"])
+        )
+        soup = BeautifulSoup(html, "html.parser", replacer=replacer)
+        self.assertEqual(str(soup), "<i>bold</i><i>italic</i>")
+
+    def test_pipeline_strings_and_drops(self):
+        pipeline = ReplacerPipeline()
+        pipeline.add(SoupReplacer(string_xformer=str.upper), names={"b"})
+        pipeline.add(SoupReplacer(string_xformer=lambda text: text + "!"))
+        pipeline.add(SoupReplacer(drop=["i"]), names={"i"})
+        soup = BeautifulSoup(
+            "<p>a<b>b</b><i>c</i></p>", "html.parser", replacer=pipeline
+        )
+        self.assertEqual(str(soup), "<p>a!<b>B!</b></p>")
+
+    def test_profiling_is_off_by_default(self):
+        replacer = SoupReplacer(name_xformer=str.lower)
+        BeautifulSoup("<p>x</p>", "html.parser", replacer=replacer)
+        self.assertIsNone(replacer.stats())
+        # Nothing is wrapped, so there's no overhead.
+        self.assertNotIn("rename", vars(replacer))
+        self.assertIs(str.lower, replacer.name_xformer)
+
+    def test_profiling(self):
+        html = (
+            '<div class="ad">ad</div><p style="x" id="1"><b>a</b><b>b</b></p>'
+            "<script>code</script>"
+        )
+        replacer = SoupReplacer(
+            name_xformer=lambda name: "strong" if name == "b" else name,
+            attrs_xformer=lambda tag: {},
+            drop=lambda name, attrs: name == "script",
+            profile=True,
+        )
+        BeautifulSoup(html, "html.parser", replacer=replacer)
+        stats = replacer.stats()
+        self.assertEqual(2, stats["tags_renamed"])
+        self.assertEqual(3, stats["attributes_removed"])
+        self.assertEqual(1, stats["tags_dropped"])
+        self.assertEqual(
+            {"name_xformer", "attrs_xformer", "drop"}, set(stats["callables"])
+        )
+        # End tags don't call name_xformer again.
+        name_xformer = stats["callables"]["name_xformer"]
+        self.assertEqual(5, name_xformer["calls"])
+        self.assertGreater(name_xformer["total_time"], 0)
+        self.assertGreaterEqual(name_xformer["total_time"], name_xformer["max_time"])
+        self.assertEqual(4, stats["callables"]["attrs_xformer"]["calls"])
+
+    def test_pipeline_profiling(self):
+        renamer = SoupReplacer("b", "strong")
+        pipeline = ReplacerPipeline(renamer).enable_profiling()
+        pipeline.add(SoupReplacer.rules(drop_attrs={"style"}), names={"p"})
+        BeautifulSoup(
+            '<p style="x"><b style="y">a</b></p>', "html.parser", replacer=pipeline
+        )
+        stats = pipeline.stats()
+        self.assertEqual(1, stats["tags_renamed"])
+        self.assertEqual(1, stats["attributes_removed"])
+        self.assertEqual(
+            [1, 0], [stage["tags_renamed"] for stage in stats["stages"]]
+        )
+        self.assertEqual(
+            [0, 1], [stage["attributes_removed"] for stage in stats["stages"]]
+        )
+
+    def test_stats_are_a_copy(self):
+        replacer = SoupReplacer("b", "strong", profile=True)
+        stats = replacer.stats()
+        BeautifulSoup("<b>a</b>", "html.parser", replacer=replacer)
+        self.assertEqual(0, stats["tags_renamed"])
+        self.assertEqual(1, replacer.stats()["tags_renamed"])
+
+
+
+class TestApplyReplacer(unittest.TestCase):
+    """
+    Tests for BeautifulSoup.apply_replacer, which must give the same
+    results as passing the replacer in while parsing.
+    """
+
+    html = (
+        '<div class="ad"><p>Buy <b>now</b></p></div>'
+        '<div id="main" style="x"><p class="a b">Text <b style="y">bold</b>'
+        '<!--comment--><script>code</script></p>'
+        '<a href="/x" onclick="go()">link</a><br><i>italic</i></div>'
+    )
+
+    def replacers(self):
+        def is_ad(name, attrs):
+            return name == "div" and "ad" in attrs.get("class", "").split()
+
+        def add_target(tag):
+            if tag.name == "a":
+                tag["target"] = "_blank"
+
+        pipeline = ReplacerPipeline(SoupReplacer("b", "strong"))
+        pipeline.add(SoupReplacer.rules(keep_attrs={"strong": set()}))
+        pipeline.add(SoupReplacer(xformer=add_target), names={"a"})
+        pipeline.add(SoupReplacer.rules(drop_tags={"i"}))
+        return [
+            SoupReplacer("b", "strong"),
+            SoupReplacer.rules({"i": "em"}, drop_attrs={"style"}),
+            SoupReplacer.rules(keep_attrs={"a": {"href"}, "*": {"id"}}),
+            SoupReplacer.rules(drop_tags={"script", "br"}),
+            SoupReplacer(drop=is_ad),
+            SoupReplacer(
+                name_xformer=lambda name: "em" if name == "i" else name,
+                xformer=add_target,
+            ),
+            SoupReplacer(attrs_xformer=lambda tag: {"seen": tag.name}),
+            SoupReplacer(string_xformer=lambda text: text.strip() or None),
+            pipeline,
+        ]
+
+    def test_matches_parse_time(self):
+        for replacer in self.replacers():
+            expect = str(BeautifulSoup(self.html, "html.parser", replacer=replacer))
+            for indexed in (False, True):
+                soup = BeautifulSoup(self.html, "html.parser", indexed=indexed)
+                soup.apply_replacer(replacer)
+                self.assertEqual(expect, str(soup))
+
+    def test_index_kept_up_to_date(self):
+        soup = BeautifulSoup(self.html, "html.parser", indexed=True)
+        soup.find(id="main")
+        soup.apply_replacer(
+            SoupReplacer.rules({"b": "strong", "div": "section"}, drop_tags={"i"})
+        )
+        self.assertEqual([], soup.find_all("b"))
+        self.assertEqual(["now", "bold"], [x.string for x in soup.find_all("strong")])
+        self.assertEqual("section", soup.find(id="main").name)
+        self.assertIsNone(soup.i)
+
+    def test_scope(self):
+        for indexed in (False, True):
+            soup = BeautifulSoup(self.html, "html.parser", indexed=indexed)
+            main = soup.find(id="main")
+            # Only a replacer applied to the whole document uses the
+            # index; a smaller scope is walked.
+            with mock.patch.object(TreeIndex, "find_all", side_effect=AssertionError):
+                soup.apply_replacer(
+                    SoupReplacer.rules({"div": "section", "b": "strong"}), main
+                )
+            self.assertEqual("div", soup.div.name)
+            self.assertEqual("now", soup.b.string)
+            self.assertEqual("section", main.name)
+            self.assertEqual("bold", main.strong.string)
+            if indexed:
+                self.assertEqual(["bold"], [x.string for x in soup.find_all("strong")])
+
+    def test_new_tag(self):
+        soup = BeautifulSoup("<p></p>", "html.parser")
+        tag = soup.new_tag("b", style="x")
+        soup.apply_replacer(SoupReplacer.rules({"b": "strong"}, drop_attrs={"style"}), tag)
+        self.assertEqual("<strong></strong>", str(tag))
+
+    def test_digests_are_updated(self):
+        soup = BeautifulSoup("<p><b>x</b></p>", "html.parser")
+        before = soup.digest()
+        soup.apply_replacer(SoupReplacer("b", "strong"))
+        self.assertNotEqual(before, soup.digest())
+        self.assertEqual(
+            BeautifulSoup("<p><strong>x</strong></p>", "html.parser").digest(),
+            soup.digest(),
+        )
 
 
 if __name__ == '__main__':
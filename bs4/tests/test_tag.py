@@ -239,3 +239,178 @@ class TestMultiValuedAttributes(SoupTest):
         soup = self.soup('<div id="1"><span id="2">a string</span></div>')
         soup.span.hidden = True
         assert '<div id="1">a string</div>' == str(soup.div)
+
+
+class TestDigest(SoupTest):
+    markup = '<div id="a"><p class="x y">One<b>two</b></p><p>three</p></div>'
+
+    def test_equal_tags_have_equal_digests(self):
+        soup = self.soup(self.markup + self.markup)
+        first, second = soup.find_all("div")
+        assert first is not second
+        assert first == second
+        assert first.digest() == second.digest()
+        assert hash(first) == hash(second)
+        assert len(first.digest()) == 16
+
+        # Different tags get different digests.
+        p1, p2 = first.find_all("p")
+        assert p1.digest() != p2.digest()
+
+        # The order of the attributes doesn't matter, just as it
+        # doesn't matter to __eq__.
+        a = self.soup('<a href="x" id="y"></a>').a
+        b = self.soup('<a id="y" href="x"></a>').a
+        assert a == b
+        assert a.digest() == b.digest()
+
+    def test_pieces_cannot_run_together(self):
+        a = self.soup('<a x="yz"></a>').a
+        b = self.soup('<a xy="z"></a>').a
+        assert a.digest() != b.digest()
+
+        a = self.soup("<p>ab<b></b></p>").p
+        b = self.soup("<p>a<b></b>b</p>").p
+        assert a.digest() != b.digest()
+
+    def test_digest_is_cached(self):
+        soup = self.soup(self.markup)
+        assert soup.div._digest is None
+        digest = soup.div.digest()
+
+        # Calculating one digest fills in the digests of all the
+        # tags beneath it.
+        assert soup.div._digest == digest
+        assert soup.b._digest is not None
+        assert soup._digest is None
+
+    def test_tree_modification_clears_cache(self):
+        soup = self.soup(self.markup)
+        original = soup.div.digest()
+        second_p = soup.find_all("p")[1]
+        second_p_digest = second_p.digest()
+
+        soup.b.append("!")
+        assert soup.b._digest is None
+        assert soup.p._digest is None
+        assert soup.div._digest is None
+
+        # Tags that weren't on the path to the root keep their digests.
+        assert second_p._digest == second_p_digest
+        assert soup.div.digest() != original
+
+        # Undoing the change brings back the original digest.
+        soup.b.contents[-1].extract()
+        soup.b.smooth()
+        assert soup.div.digest() == original
+
+        soup.b["id"] = "bold"
+        assert soup.div.digest() != original
+        del soup.b["id"]
+        assert soup.div.digest() == original
+
+        soup.b.string = "changed"
+        assert soup.div.digest() != original
+
+    def test_name_and_attrs_setters_clear_cache(self):
+        soup = self.soup(self.markup)
+        original = soup.div.digest()
+        soup.b.name = "i"
+        assert soup.div._digest is None
+        assert soup.div.digest() != original
+
+        soup.i.name = "b"
+        assert soup.div.digest() == original
+
+        soup.b.attrs = {"id": "bold"}
+        assert soup.div._digest is None
+        assert soup.div.digest() != original
+
+    def test_sets_and_dictionaries(self):
+        soup = self.soup(self.markup + self.markup)
+        first, second = soup.find_all("div")
+        assert len({first, second}) == 1
+        assert {first: 1}[second] == 1
+
+    def test_feed_clears_cache(self):
+        soup = self.soup("")
+        soup.feed("<div><p>one</p>")
+        before = soup.div.digest()
+        soup.feed("<p>two</p></div>")
+        soup.close()
+        assert soup.div.digest() != before
+        assert soup.div.digest() == self.soup("<div><p>one</p><p>two</p></div>").div.digest()
+
+    def test_changes_that_need_invalidate_digest(self):
+        soup = self.soup(self.markup)
+        p = soup.p
+        tags = {p}
+        before = p.digest()
+
+        # Modifying a multi-valued attribute in place isn't noticed...
+        p["class"].append("z")
+        assert p.digest() == before
+
+        # ...until the digest is invalidated.
+        p.invalidate_digest()
+        assert p.digest() != before
+
+        # The hash doesn't use the stale part of the cache, so it
+        # changes right away, along with equality.
+        soup = self.soup(self.markup + self.markup)
+        first, second = soup.find_all("div")
+        first.digest()
+        second.digest()
+        second.p["class"].append("z")
+        assert first != second
+        first.p["class"].append("z")
+        assert first == second
+        assert hash(first) == hash(second)
+        assert len({first, second}) == 1
+
+        first.attrs["id"] = "b"
+        assert first != second
+        assert len({first, second}) == 2
+
+    def test_eq_uses_cached_digests(self):
+        soup = self.soup(self.markup + self.markup)
+        first, second = soup.find_all("div")
+        assert first == second
+
+        # Once both tags have digests, a mismatch settles the question
+        # without comparing the tags' contents.
+        first.digest()
+        second.digest()
+        assert first == second
+        second._structure_digest = b"x" * 16
+        assert first != second
+
+        # If either digest is missing, the contents are compared.
+        second.invalidate_digest()
+        assert first == second
+
+    def test_eq_ignores_stale_digests(self):
+        # A digest can be out of date, so __eq__ always compares the
+        # tags themselves.
+        soup = self.soup(self.markup + self.markup)
+        first, second = soup.find_all("div")
+        first.digest()
+        second.digest()
+        assert first == second
+
+        # Both tags are changed the same way, but only one of them
+        # gets a new digest.
+        first.p["class"].append("z")
+        second.p["class"].append("z")
+        second.p.invalidate_digest()
+        assert first.digest() != second.digest()
+        assert first == second
+
+        first.attrs["lang"] = "en"
+        second.attrs["lang"] = "en"
+        second.invalidate_digest()
+        assert first.digest() != second.digest()
+        assert first == second
+
+        second.b.string = "changed"
+        assert first != second
@@ -0,0 +1,85 @@
+from bs4 import diff
+from bs4.treediff import DiffOperation
+from . import SoupTest
+
+
+class TestDiff(SoupTest):
+    def actions(self, old, new):
+        return [
+            (x.action, x.old_path, x.new_path)
+            for x in diff(self.soup(old), self.soup(new))
+        ]
+
+    def test_equal_documents(self):
+        markup = "<div><p>one</p><p>two</p></div>"
+        assert [] == diff(self.soup(markup), self.soup(markup))
+
+    def test_insert_and_delete(self):
+        assert [("insert", None, (0, 1))] == self.actions(
+            "<ul><li>1</li></ul>", "<ul><li>1</li><li>2</li></ul>"
+        )
+        assert [("delete", (0, 0), None)] == self.actions(
+            "<ul><li>1</li><li>2</li></ul>", "<ul><li>2</li></ul>"
+        )
+
+    def test_update(self):
+        # A changed attribute updates the tag; a changed string
+        # updates the string.
+        old = '<p class="a">text</p>'
+        new = '<p class="b">new text</p>'
+        operations = diff(self.soup(old), self.soup(new))
+        assert [("update", (0,), (0,)), ("update", (0, 0), (0, 0))] == [
+            (x.action, x.old_path, x.new_path) for x in operations
+        ]
+        assert operations[0].old["class"] == ["a"]
+        assert operations[0].new["class"] == ["b"]
+        assert operations[1].new == "new text"
+
+        # A tag with a different name is a different tag.
+        assert [("delete", (0,), None), ("insert", None, (0,))] == self.actions(
+            "<p>text</p>", "<div>text</div>"
+        )
+
+    def test_move(self):
+        # Within a parent.
+        assert [("move", (0, 1), (0, 0))] == self.actions(
+            "<ul><li>1</li><li>2</li></ul>", "<ul><li>2</li><li>1</li></ul>"
+        )
+
+        # Between parents.
+        old = "<div><p>one</p><b>moving</b></div><div><p>two</p></div>"
+        new = "<div><p>one</p></div><div><b>moving</b><p>two</p></div>"
+        assert [("move", (0, 1), (1, 0))] == self.actions(old, new)
+
+    def test_unchanged_subtrees_are_skipped(self):
+        old = self.soup("<div><p>one</p></div><div><p>two</p></div>")
+        new = self.soup("<div><p>one</p></div><div><p>three</p></div>")
+        [operation] = diff(old, new)
+        assert operation == DiffOperation("update", None, None, (1, 0, 0), (1, 0, 0))
+
+        # The digests of the unchanged subtree were compared, but the
+        # operation came from looking inside the changed one.
+        assert old.div.digest() == new.div.digest()
+
+    def test_operations_describe_the_change(self):
+        old = self.soup("<ul><li>a</li><li>b</li><li>c</li></ul><p>end</p>")
+        new = self.soup(
+            '<ul><li>c</li><li class="x">a</li><li>d</li></ul><p>end</p>'
+        )
+        operations = diff(old, new)
+        # The <li> tags are paired up in order, so "a" gets a new
+        # attribute and "b" is changed to "d".
+        assert [("update", (0, 0), (0, 1)), ("update", (0, 1, 0), (0, 2, 0))] == [
+            (x.action, x.old_path, x.new_path) for x in operations
+        ]
+        for operation in operations:
+            if operation.old_path is not None:
+                element = old
+                for index in operation.old_path:
+                    element = element.contents[index]
+                assert element is operation.old
+            if operation.new_path is not None:
+                element = new
+                for index in operation.new_path:
+                    element = element.contents[index]
+                assert element is operation.new
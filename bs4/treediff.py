@@ -0,0 +1,287 @@
+"""Find the differences between two parse trees.
+
+Use `bs4.diff` to compare two versions of a document::
+
+ from bs4 import BeautifulSoup, diff
+ for operation in diff(yesterday, today):
+     print(operation)
+
+The comparison is driven by `Tag.digest`: any subtree with the same
+digest in both documents is unchanged and isn't looked at any further,
+so the cost of a comparison depends mostly on how much of the
+document has changed, not on how big it is.
+"""
+
+from __future__ import annotations
+
+from difflib import SequenceMatcher
+from typing import (
+    Dict,
+    List,
+    Optional,
+    Tuple,
+    Union,
+)
+
+from bs4.element import (
+    PageElement,
+    Tag,
+)
+
+#: The location of a `PageElement`: the index of the element within
+#: its parent's `Tag.contents`, the index of the parent within its
+#: parent's contents, and so on, starting from the top of the tree.
+_Path = Tuple[int, ...]
+
+#: How two `PageElement` objects are compared. Elements with the same
+#: key are the same, as far as `Tag.__eq__` is concerned.
+_Key = Tuple[str, Union[bytes, str]]
+
+
+class DiffOperation(object):
+    """One change that turns the old version of a document into the
+    new version.
+
+    There are four kinds of change:
+
+    * "insert": `DiffOperation.new` was added to the new document
+      at `DiffOperation.new_path`.
+    * "delete": `DiffOperation.old` was removed from the old document.
+    * "update": `DiffOperation.old` and `DiffOperation.new` are the
+      same tag with different attributes, or a string with different
+      text. A change to a tag's contents is described by other
+      operations, not by an update.
+    * "move": `DiffOperation.old` and `DiffOperation.new` are the
+      same (unchanged) subtree, found in different places.
+
+    Paths are relative to the trees passed into `bs4.diff`.
+    """
+
+    #: The kind of change: "insert", "delete", "update" or "move".
+    action: str
+
+    #: The element in the old document, or None for an insert.
+    old: Optional[PageElement]
+
+    #: The element in the new document, or None for a delete.
+    new: Optional[PageElement]
+
+    #: Where `DiffOperation.old` is in the old document.
+    old_path: Optional[_Path]
+
+    #: Where `DiffOperation.new` is in the new document.
+    new_path: Optional[_Path]
+
+    def __init__(
+        self,
+        action: str,
+        old: Optional[PageElement],
+        new: Optional[PageElement],
+        old_path: Optional[_Path],
+        new_path: Optional[_Path],
+    ):
+        self.action = action
+        self.old = old
+        self.new = new
+        self.old_path = old_path
+        self.new_path = new_path
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, DiffOperation):
+            return NotImplemented
+        return (
+            self.action == other.action
+            and self.old_path == other.old_path
+            and self.new_path == other.new_path
+        )
+
+    def __repr__(self) -> str:
+        return "<DiffOperation %s old=%r new=%r>" % (
+            self.action,
+            self.old_path,
+            self.new_path,
+        )
+
+
+def diff(old: Tag, new: Tag) -> List[DiffOperation]:
+    """Find the changes that turn one tree into another.
+
+    Both trees are usually `BeautifulSoup` objects, but any two `Tag`
+    objects can be compared.
+
+    :param old: The old version of the document.
+    :param new: The new version of the document.
+    :return: A list of `DiffOperation` objects, describing the
+        changes from the top of the tree down. The list is empty if
+        the trees are equal.
+    """
+    return _Differ().diff(old, new)
+
+
+def _key(element: PageElement) -> _Key:
+    if isinstance(element, Tag):
+        return ("T", element.digest())
+    return ("S", str(element))
+
+
+class _Differ(object):
+    """Holds the operations found while comparing two trees."""
+
+    operations: List[DiffOperation]
+
+    def __init__(self) -> None:
+        self.operations = []
+
+    def diff(self, old: Tag, new: Tag) -> List[DiffOperation]:
+        if old.digest() == new.digest():
+            return []
+        if old.name != new.name or old.attrs != new.attrs:
+            self._add("update", old, new, (), ())
+        self._diff_contents(old, new, (), ())
+        self._find_moves()
+        return self.operations
+
+    def _diff_contents(
+        self, old: Tag, new: Tag, old_path: _Path, new_path: _Path
+    ) -> None:
+        """Compare the contents of two tags that are being treated as
+        the same tag.
+        """
+        # Work with an explicit stack rather than recursing, so that
+        # deeply nested documents can be compared.
+        stack: List[Tuple[Tag, Tag, _Path, _Path]] = [(old, new, old_path, new_path)]
+        while stack:
+            old, new, old_path, new_path = stack.pop()
+            old_keys = [_key(x) for x in old.contents]
+            new_keys = [_key(x) for x in new.contents]
+            matcher = SequenceMatcher(None, old_keys, new_keys, autojunk=False)
+            blocks = [
+                (list(range(i1, i2)), list(range(j1, j2)))
+                for action, i1, i2, j1, j2 in matcher.get_opcodes()
+                if action != "equal"
+            ]
+            if not blocks:
+                continue
+
+            # An element that's unchanged but not where it was before
+            # was moved within its parent.
+            available: Dict[_Key, List[int]] = {}
+            for old_block, _ in blocks:
+                for i in old_block:
+                    available.setdefault(old_keys[i], []).append(i)
+            moved_old = set()
+            moved_new = set()
+            for _, new_block in blocks:
+                for j in new_block:
+                    candidates = available.get(new_keys[j])
+                    if candidates:
+                        i = candidates.pop(0)
+                        moved_old.add(i)
+                        moved_new.add(j)
+                        self._add(
+                            "move", old.contents[i], new.contents[j],
+                            old_path + (i,), new_path + (j,),
+                        )
+
+            paired: List[Tuple[Tag, Tag, _Path, _Path]] = []
+            self._pair(
+                old.contents, new.contents,
+                [i for old_block, _ in blocks for i in old_block if i not in moved_old],
+                [j for _, new_block in blocks for j in new_block if j not in moved_new],
+                old_path, new_path, paired,
+            )
+            # Visit the paired tags in document order.
+            stack.extend(reversed(paired))
+
+    def _pair(
+        self,
+        old_contents: List[PageElement],
+        new_contents: List[PageElement],
+        old_indexes: List[int],
+        new_indexes: List[int],
+        old_path: _Path,
+        new_path: _Path,
+        paired: List[Tuple[Tag, Tag, _Path, _Path]],
+    ) -> None:
+        """Explain how some elements in one tag's contents turned into
+        some elements in another tag's contents.
+
+        A tag on one side may be the same as a tag with the same name
+        on the other side, and a string may have changed its text.
+        These are paired up in order; whatever's left over was deleted
+        or inserted.
+        """
+        by_name: Dict[Optional[str], List[int]] = {}
+        for i in old_indexes:
+            by_name.setdefault(_name(old_contents[i]), []).append(i)
+        inserted = []
+        for j in new_indexes:
+            candidates = by_name.get(_name(new_contents[j]))
+            if not candidates:
+                inserted.append(j)
+                continue
+            i = candidates.pop(0)
+            old_child, new_child = old_contents[i], new_contents[j]
+            old_child_path, new_child_path = old_path + (i,), new_path + (j,)
+            if isinstance(old_child, Tag) and isinstance(new_child, Tag):
+                if old_child.attrs != new_child.attrs:
+                    self._add(
+                        "update", old_child, new_child, old_child_path, new_child_path
+                    )
+                paired.append((old_child, new_child, old_child_path, new_child_path))
+            else:
+                self._add(
+                    "update", old_child, new_child, old_child_path, new_child_path
+                )
+
+        for i in sorted(i for candidates in by_name.values() for i in candidates):
+            self._add("delete", old_contents[i], None, old_path + (i,), None)
+        for j in inserted:
+            self._add("insert", None, new_contents[j], None, new_path + (j,))
+
+    def _add(
+        self,
+        action: str,
+        old: Optional[PageElement],
+        new: Optional[PageElement],
+        old_path: Optional[_Path],
+        new_path: Optional[_Path],
+    ) -> None:
+        self.operations.append(DiffOperation(action, old, new, old_path, new_path))
+
+    def _find_moves(self) -> None:
+        """Turn a delete and an insert of the same subtree into a move,
+        even if the subtree moved to a different parent.
+        """
+        deleted: Dict[_Key, List[int]] = {}
+        for index, operation in enumerate(self.operations):
+            if operation.action == "delete":
+                assert operation.old is not None
+                deleted.setdefault(_key(operation.old), []).append(index)
+        if not deleted:
+            return
+        removed = set()
+        for operation in self.operations:
+            if operation.action != "insert":
+                continue
+            assert operation.new is not None
+            candidates = deleted.get(_key(operation.new))
+            if not candidates:
+                continue
+            index = candidates.pop(0)
+            removed.add(index)
+            operation.action = "move"
+            operation.old = self.operations[index].old
+            operation.old_path = self.operations[index].old_path
+        self.operations = [
+            operation
+            for index, operation in enumerate(self.operations)
+            if index not in removed
+        ]
+
+
+def _name(element: PageElement) -> Optional[str]:
+    """The name of a `Tag`, or None for a string."""
+    if isinstance(element, Tag):
+        return element.name
+    return None